@@ -0,0 +1,34 @@
+# coding=utf-8
+"""
+压测用的 Django 配置：在 config.settings 的基础上切换数据库、关闭调试输出
+
+BENCH_DB=sqlite（默认）：使用 BENCH_SQLITE_PATH 指定的 SQLite 文件（WAL + IMMEDIATE 事务，减少写锁冲突）
+BENCH_DB=mysql：使用 config.settings 中由 DB_HOST / DB_NAME 等环境变量配置的 MySQL
+"""
+import os
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import DATABASES, LOGGING
+
+if os.environ.get('BENCH_DB', 'sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('BENCH_SQLITE_PATH', '/tmp/complaint-bench.sqlite3'),
+            'OPTIONS': {
+                'timeout': 30,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            },
+        }
+    }
+    DATABASE_ROUTERS = []
+    READ_REPLICA = {'ALIASES': []}
+
+DEBUG = False
+
+# 压测时不记录 SQL、不输出请求日志
+QUERY_BUDGET = {'SAMPLE_RATE': 0.0}
+LOGGING['root']['level'] = 'WARNING'
+for _logger in LOGGING.get('loggers', {}).values():
+    _logger['level'] = 'WARNING'
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+对比两次压测结果（run.py 输出的 JSON）
+
+    python benchmarks/compare.py bench-base.json bench-new.json [--threshold 10]
+
+延迟或吞吐量变差超过 --threshold 百分比的指标标记为 "!"，存在时返回码为 1，可用于 CI。
+"""
+import argparse
+import json
+import sys
+
+METRICS = (
+    # (名称, 取值, 越大越好)
+    ('rps', lambda result: result['throughput_rps'], True),
+    ('p50', lambda result: result['latency_ms']['p50'], False),
+    ('p95', lambda result: result['latency_ms']['p95'], False),
+    ('p99', lambda result: result['latency_ms']['p99'], False),
+    ('errors', lambda result: result['error_rate'] * 100, False),
+)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def describe(report):
+    git = report['meta'].get('git') or {}
+    commit = (git.get('commit') or '?')[:10]
+    return commit + (' (dirty)' if git.get('dirty') else '')
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比两次压测结果')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help='视为退化的变化百分比')
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f'base: {describe(base)}  new: {describe(new)}')
+    print('{:<10}{:<8}{:>12}{:>12}{:>10}'.format('场景', '指标', 'base', 'new', '变化%'))
+
+    regressions = 0
+    names = list(base['scenarios']) + ['overall']
+    for name in names:
+        old_result = base['overall'] if name == 'overall' else base['scenarios'].get(name)
+        new_result = new['overall'] if name == 'overall' else new['scenarios'].get(name)
+        if not old_result or not new_result:
+            continue
+        for metric, value, higher_is_better in METRICS:
+            old_value, new_value = value(old_result), value(new_result)
+            delta = change(old_value, new_value)
+            worse = delta is not None and (-delta if higher_is_better else delta) > args.threshold
+            regressions += worse
+            print('{:<10}{:<8}{:>12}{:>12}{:>10} {}'.format(
+                name, metric, round(old_value, 2) if old_value is not None else '-',
+                round(new_value, 2) if new_value is not None else '-',
+                f'{delta:+.1f}' if delta is not None else '-', '!' if worse else ''))
+
+    if regressions:
+        print(f'{regressions} 项指标退化超过 {args.threshold}%')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+投诉服务压测
+
+一次运行完成：启动 Nacos / 下游替身（stubs.py）→ 初始化数据库 → 启动服务 → 写入种子数据
+→ 预热 → 按比例混合请求压测 → 输出吞吐量与 p50/p95/p99 延迟到 JSON 文件。
+
+请求混合（--mix，权重）：
+    create   POST  /api/complaints/create/            用户提交举报
+    list     GET   /api/complaints/?status=..&...      管理员按条件查询举报列表
+    branch   PATCH /api/complaints/branch/<type>/<id>/ 管理员批量处理某个对象的举报
+    review   POST  /api/reviews/                       管理员创建审核记录
+
+示例：
+    python benchmarks/run.py --duration 30 --concurrency 16 --output bench-sqlite.json
+    BENCH_DB=mysql DB_HOST=127.0.0.1 python benchmarks/run.py --db mysql --server gunicorn --workers 4
+    python benchmarks/compare.py bench-main.json bench-branch.json
+
+相同的 --seed、数据规模和替身延迟下，不同提交的结果可以直接对比。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+import stubs
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SERVICE_DIR = os.path.join(REPO_DIR, 'complaint-service')
+
+DEFAULT_MIX = 'create=40,list=40,branch=10,review=10'
+
+
+# ---- 请求场景 ----
+
+class Workload:
+    """压测数据：被举报对象池与管理员ID"""
+
+    def __init__(self, targets, admin_id):
+        self.targets = targets
+        self.admin_id = admin_id
+
+    def admin_headers(self):
+        return {'UUID': self.admin_id}
+
+
+def scenario_create(client, workload, rng):
+    target_type, target_id = rng.choice(workload.targets)
+    return client.post('/api/complaints/create/', headers={'UUID': str(uuid.UUID(int=rng.getrandbits(128)))},
+                       json={'target_type': target_type, 'target_id': target_id, 'reason': 'bench'})
+
+
+def scenario_list(client, workload, rng):
+    target_type, target_id = rng.choice(workload.targets)
+    params = rng.choice([
+        {'status': 0, 'target_type': target_type},
+        {'target_id': target_id},
+        {'status': rng.choice([0, 1]), 'page': rng.randint(1, 3)},
+    ])
+    return client.get('/api/complaints/', params=params, headers=workload.admin_headers())
+
+
+def scenario_branch(client, workload, rng):
+    target_type, target_id = rng.choice(workload.targets)
+    return client.patch(f'/api/complaints/branch/{target_type}/{target_id}/', headers=workload.admin_headers(),
+                        json={'status': rng.choice([0, 1])})
+
+
+def scenario_review(client, workload, rng):
+    target_type, target_id = rng.choice(workload.targets)
+    return client.post('/api/reviews/', headers=workload.admin_headers(), json={
+        'target_id': target_id, 'target_type': target_type,
+        'result': 'bench', 'ban_type': 'none', 'ban_time': 0,
+    })
+
+
+SCENARIOS = {
+    'create': scenario_create,
+    'list': scenario_list,
+    'branch': scenario_branch,
+    'review': scenario_review,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'未知场景: {name}（可选 {", ".join(SCENARIOS)}）')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ---- 服务进程 ----
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def service_env(args, nacos_address, downstream_address, port):
+    env = dict(os.environ)
+    env.update({
+        'DJANGO_SETTINGS_MODULE': 'bench_settings',
+        'PYTHONPATH': os.pathsep.join(filter(None, [SERVICE_DIR, BENCH_DIR, env.get('PYTHONPATH')])),
+        'BENCH_DB': args.db,
+        'BENCH_SQLITE_PATH': args.sqlite_path,
+        'NACOS_SERVER_ADDRESSES': '{}:{}'.format(*nacos_address),
+        'NODE_IP': '127.0.0.1',
+        'NODE_PORT': str(port),
+        'NACOS_READY_CHECK_PORT': str(port),
+        'DEBUG': '',
+    })
+    if args.discovery == 'static':
+        # 不使用注册中心：下游地址直接来自配置，也不注册自己
+        downstream = 'http://{}:{}'.format(*downstream_address)
+        env.update({
+            'SERVICE_DISCOVERY_BACKEND': 'static',
+            'USER_SERVICE_URL': downstream,
+            'PRODUCT_SERVICE_URL': downstream,
+            'NACOS_REGISTER': 'never',
+        })
+    return env
+
+
+def server_command(args, port):
+    bind = f'127.0.0.1:{port}'
+    if args.server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', 'config.wsgi:application', '--bind', bind,
+                '--workers', str(args.workers), '--threads', str(args.threads), '--log-level', 'warning']
+    if args.server == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'config.asgi:application', '--host', '127.0.0.1',
+                '--port', str(port), '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log']
+    command = [sys.executable, 'manage.py', 'runserver', bind, '--noreload']
+    return command + ['--nothreading'] if args.threads <= 1 else command
+
+
+def prepare_database(args, env):
+    if args.db == 'sqlite' and not args.keep_db:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.sqlite_path + suffix):
+                os.remove(args.sqlite_path + suffix)
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                   cwd=SERVICE_DIR, env=env, check=True)
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'服务进程已退出（返回码 {process.returncode}）')
+        try:
+            if httpx.get(base_url + '/metrics', timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('服务启动超时')
+
+
+def stop_server(process):
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ---- 压测 ----
+
+def seed(base_url, workload, complaints):
+    """举报均匀分布到各被举报对象；每批内的对象不重复并使用不同的举报人，避免被去重"""
+    batch_size = min(500, len(workload.targets))
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        for start in range(0, complaints, batch_size):
+            count = len(workload.targets)
+            targets = [workload.targets[(start + i) % count] for i in range(min(batch_size, complaints - start))]
+            batch = [{'target_type': target_type, 'target_id': target_id, 'reason': 'seed'}
+                     for target_type, target_id in targets]
+            response = client.post('/api/complaints/create/', json=batch, headers={'UUID': str(uuid.uuid4())})
+            response.raise_for_status()
+
+
+def run_load(base_url, workload, mix, concurrency, duration, seed_value):
+    """
+    closed-loop 压测：concurrency 个线程各自不停地发请求，持续 duration 秒
+
+    Returns:
+        {场景: [(延迟秒数, 状态码或异常名), ...]}
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        local = defaultdict(list)
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = SCENARIOS[name](client, workload, rng).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                local[name].append((time.perf_counter() - started, status))
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def percentile(sorted_values, q):
+    """nearest-rank 分位数"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(values, duration):
+    latencies = sorted(latency for latency, _ in values)
+    statuses = defaultdict(int)
+    for _, status in values:
+        statuses[str(status)] += 1
+    errors = sum(count for status, count in statuses.items() if not (status.isdigit() and int(status) < 400))
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'error_rate': round(errors / len(values), 4) if values else 0,
+        'throughput_rps': round(len(values) / duration, 2),
+        'latency_ms': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1]) if latencies else None,
+        },
+        'status_codes': dict(sorted(statuses.items())),
+    }
+
+
+def git_info():
+    def git(*command):
+        result = subprocess.run(['git', *command], cwd=REPO_DIR, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'branch': git('rev-parse', '--abbrev-ref', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+    }
+
+
+def print_report(report):
+    print('{:<10}{:>10}{:>8}{:>10}{:>10}{:>10}{:>10}'.format('场景', '请求数', '错误', 'rps', 'p50ms', 'p95ms', 'p99ms'))
+    rows = list(report['scenarios'].items()) + [('overall', report['overall'])]
+    for name, result in rows:
+        latency = result['latency_ms']
+        print('{:<10}{:>10}{:>8}{:>10}{:>10}{:>10}{:>10}'.format(
+            name, result['requests'], result['errors'], result['throughput_rps'],
+            latency['p50'], latency['p95'], latency['p99']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='投诉服务压测')
+    parser.add_argument('--db', choices=['sqlite', 'mysql'], default=os.environ.get('BENCH_DB', 'sqlite'),
+                        help='mysql 时使用 DB_HOST / DB_NAME 等环境变量指定的本地 MySQL')
+    parser.add_argument('--sqlite-path', default='/tmp/complaint-bench.sqlite3')
+    parser.add_argument('--keep-db', action='store_true', help='保留已有的 SQLite 数据（默认每次重建）')
+    parser.add_argument('--server', choices=['gunicorn', 'uvicorn', 'runserver'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn 每个 worker 的线程数')
+    parser.add_argument('--discovery', choices=['nacos', 'static'], default='nacos',
+                        help='nacos: 通过 Nacos 替身发现下游; static: 直接配置下游地址，不使用注册中心')
+    parser.add_argument('--url', help='压测已经运行的服务（不启动替身、不初始化数据库）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发客户端数')
+    parser.add_argument('--duration', type=float, default=30, help='压测时长（秒）')
+    parser.add_argument('--warmup', type=float, default=5, help='预热时长（秒），不计入结果')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'场景权重，默认 {DEFAULT_MIX}')
+    parser.add_argument('--targets', type=int, default=200, help='被举报对象数')
+    parser.add_argument('--seed-complaints', type=int, default=5000, help='压测前写入的举报数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', default='bench-result.json')
+    stubs.add_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    targets = [(rng.choice([0, 1]), str(uuid.UUID(int=rng.getrandbits(128)))) for _ in range(args.targets)]
+    workload = Workload(targets, admin_id=str(uuid.UUID(int=rng.getrandbits(128))))
+
+    process = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        nacos, downstream = stubs.start_stubs(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                              error_rate=args.error_rate)
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        env = service_env(args, nacos.server_address, downstream.server_address, port)
+        prepare_database(args, env)
+        process = subprocess.Popen(server_command(args, port), cwd=SERVICE_DIR, env=env)
+
+    try:
+        if process is not None:
+            wait_until_ready(base_url, process)
+        print(f'写入种子数据: {args.seed_complaints} 条举报, {args.targets} 个被举报对象')
+        seed(base_url, workload, args.seed_complaints)
+        if args.warmup:
+            print(f'预热 {args.warmup} 秒')
+            run_load(base_url, workload, args.mix, args.concurrency, args.warmup, args.seed + 1)
+        print(f'压测 {args.duration} 秒, 并发 {args.concurrency}')
+        started = time.monotonic()
+        samples = run_load(base_url, workload, args.mix, args.concurrency, args.duration, args.seed)
+        elapsed = time.monotonic() - started
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git': git_info(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {key: value for key, value in vars(args).items() if key != 'mix'},
+            'mix': args.mix,
+        },
+        'overall': summarize([value for values in samples.values() for value in values], elapsed),
+        'scenarios': {name: summarize(samples.get(name, []), elapsed) for name in args.mix},
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report)
+    print(f'结果已写入 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+压测用的本地替身服务：Nacos 与 UserService / ProductService
+
+- Nacos 替身实现投诉服务用到的 OpenAPI（登录、注册 / 注销 / 心跳、实例列表），
+  UserService、ProductService 的实例指向本地的下游替身
+- 下游替身实现 /api/v1/user/<id>/、/api/v1/user/batch/、/api/v1/product/batch/，
+  响应前等待 latency ± jitter 毫秒，可按比例返回 500 模拟故障
+
+单独运行（手工压测时使用）：
+    python benchmarks/stubs.py --nacos-port 18848 --downstream-port 18080 --latency-ms 20 --jitter-ms 5
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DOWNSTREAM_SERVICES = ('UserService', 'ProductService')
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class NacosStub(ThreadingHTTPServer):
+    """Nacos 替身：内存中的服务实例表"""
+    daemon_threads = True
+
+    def __init__(self, address, downstream_address):
+        super().__init__(address, _NacosHandler)
+        self.lock = threading.Lock()
+        host, port = downstream_address
+        self.instances = {
+            name: {(host, port): {'ip': host, 'port': port, 'healthy': True, 'weight': 1.0, 'enabled': True}}
+            for name in DOWNSTREAM_SERVICES
+        }
+
+
+class _NacosHandler(_JsonHandler):
+
+    def _params(self):
+        params = parse_qs(urlparse(self.path).query)
+        return {key: values[0] for key, values in params.items()}
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/nacos/v1/ns/instance/list':
+            name = self._params().get('serviceName', '')
+            with self.server.lock:
+                hosts = list(self.server.instances.get(name, {}).values())
+            self.send_json({'name': name, 'hosts': hosts, 'cacheMillis': 10000})
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        self.read_body()
+        path = urlparse(self.path).path
+        if path == '/nacos/v1/auth/login':
+            self.send_json({'accessToken': 'bench-token', 'tokenTtl': 18000, 'globalAdmin': True})
+        elif path == '/nacos/v1/ns/instance':
+            params = self._params()
+            instance = {'ip': params.get('ip'), 'port': int(params.get('port', 0)), 'healthy': True,
+                        'weight': 1.0, 'enabled': True}
+            with self.server.lock:
+                self.server.instances.setdefault(params.get('serviceName', ''), {})[
+                    (instance['ip'], instance['port'])] = instance
+            self.send_json('ok')
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+    def do_PUT(self):
+        self.read_body()
+        # 心跳与实例更新
+        self.send_json({'clientBeatInterval': 5000, 'code': 10200, 'lightBeatEnabled': False})
+
+    def do_DELETE(self):
+        params = self._params()
+        with self.server.lock:
+            self.server.instances.get(params.get('serviceName', ''), {}).pop(
+                (params.get('ip'), int(params.get('port', 0))), None)
+        self.send_json('ok')
+
+
+class DownstreamStub(ThreadingHTTPServer):
+    """UserService / ProductService 替身"""
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=20.0, jitter_ms=5.0, error_rate=0.0, privilege=1):
+        super().__init__(address, _DownstreamHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.privilege = privilege
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def delay(self):
+        seconds = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if seconds:
+            time.sleep(seconds)
+
+
+class _DownstreamHandler(_JsonHandler):
+
+    def _begin(self):
+        with self.server.lock:
+            self.server.requests += 1
+        self.server.delay()
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self.send_json({'error': 'stub failure'}, 500)
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._begin():
+            return
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+        # /api/v1/user/<id>/
+        if len(parts) == 4 and parts[:3] == ['api', 'v1', 'user']:
+            self.send_json({'id': parts[3], 'username': f'user-{parts[3][:8]}', 'privilege': self.server.privilege})
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        body = self.read_body()
+        if not self._begin():
+            return
+        path = urlparse(self.path).path.rstrip('/')
+        try:
+            ids = json.loads(body or b'{}').get('ids', [])
+        except ValueError:
+            ids = []
+        if path == '/api/v1/user/batch':
+            self.send_json([{'id': object_id, 'username': f'user-{object_id[:8]}'} for object_id in ids])
+        elif path == '/api/v1/product/batch':
+            self.send_json([{'id': object_id, 'title': f'product-{object_id[:8]}'} for object_id in ids])
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+
+def start_stubs(host='127.0.0.1', nacos_port=0, downstream_port=0, **downstream_options):
+    """
+    在后台线程中启动替身服务，返回 (nacos, downstream)；端口为 0 时自动分配
+    """
+    downstream = DownstreamStub((host, downstream_port), **downstream_options)
+    nacos = NacosStub((host, nacos_port), downstream.server_address)
+    for server in (downstream, nacos):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return nacos, downstream
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='下游替身的平均响应延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help='下游替身的延迟抖动（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='下游替身返回 500 的比例')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动 Nacos / 下游服务替身')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--nacos-port', type=int, default=18848)
+    parser.add_argument('--downstream-port', type=int, default=18080)
+    add_arguments(parser)
+    args = parser.parse_args()
+    nacos, downstream = start_stubs(args.host, args.nacos_port, args.downstream_port,
+                                    latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    print('Nacos 替身: {}:{}  下游替身: {}:{}'.format(*nacos.server_address, *downstream.server_address))
+    print('NACOS_SERVER_ADDRESSES={}:{}'.format(*nacos.server_address))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,11 @@ class ComplaintConfig(AppConfig):
         """
         应用启动时执行的初始化代码
         """
+        from django.db.backends.signals import connection_created
+        from .metrics import install_query_tracker
+        connection_created.connect(install_query_tracker, dispatch_uid='complaint.metrics.query_tracker')
+
+        # 只在服务进程中注册，注册与心跳在后台线程中进行，不阻塞启动（见 config.nacos_heartbeat）
         from config.nacos_heartbeat import start_nacos_heartbeat
         start_nacos_heartbeat()
         # 如果需要在应用启动时执行定时任务或其他初始化操作，可以在这里添加
@@ -0,0 +1,152 @@
+"""
+冷数据归档
+
+complaint / transaction 表只增不减，列表查询按 -created_at 排序时要面对全部历史数据。
+archive_old_rows 命令把超过保留期的行分批迁移到 complaint_archive / transaction_archive：
+
+- 每批一个短事务：按 (created_at, pk) 取一批主键 → 写入归档表 → 按主键删除，
+  批与批之间暂停，避免长事务和长时间锁表
+- 只归档已处理的投诉（status != 0），待处理的投诉不受保留期影响
+- 写入归档表使用 ignore_conflicts，中断后重跑不会重复
+
+没有采用 MySQL 按月 RANGE 分区：分区键必须包含在所有唯一键（包括主键 complaint_id
+和 dedupe_key）中，需要修改主键，代价比归档表大。
+
+接口默认只查询在线表，列表接口带 ?include_archived=true 时合并归档数据。
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import models
+from . import response_cache
+from . import summary
+
+logger = logging.getLogger(__name__)
+
+
+def archivable_complaints(cutoff):
+    return models.Complaint.objects.filter(created_at__lt=cutoff).exclude(status=summary.STATUS_OPEN)
+
+
+def archivable_transactions(cutoff):
+    return models.Transaction.objects.filter(created_at__lt=cutoff)
+
+
+# 源模型 -> (归档模型, 可归档行的查询)
+ARCHIVES = {
+    'complaint': (models.Complaint, models.ComplaintArchive, archivable_complaints),
+    'transaction': (models.Transaction, models.TransactionArchive, archivable_transactions),
+}
+
+
+def _archive_fields(archive_model):
+    """归档表与在线表共有的字段（不含 archived_at）"""
+    return [field.attname for field in archive_model._meta.concrete_fields if field.name != 'archived_at']
+
+
+def archive_batch(source_model, archive_model, queryset, batch_size):
+    """
+    归档一批行，返回本批行数（0 表示没有可归档的行）
+    """
+    fields = _archive_fields(archive_model)
+    pk_name = source_model._meta.pk.attname
+    with transaction.atomic():
+        rows = list(
+            queryset.order_by('created_at', 'pk').select_for_update(skip_locked=True)
+            .values(*fields)[:batch_size]
+        )
+        if not rows:
+            return 0
+        archive_model.objects.bulk_create([archive_model(**row) for row in rows], ignore_conflicts=True)
+        source_model.objects.filter(pk__in=[row[pk_name] for row in rows]).delete()
+    response_cache.bump(source_model, archive_model)
+    return len(rows)
+
+
+def archive_table(name, older_than_days, batch_size=1000, sleep=0.1, max_batches=None, dry_run=False):
+    """
+    归档某张表中超过 older_than_days 天的行
+
+    Returns:
+        归档（dry_run 时为可归档）的行数
+    """
+    source_model, archive_model, archivable = ARCHIVES[name]
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    queryset = archivable(cutoff)
+    if dry_run:
+        return queryset.count()
+
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(source_model, archive_model, queryset, batch_size)
+        if not count:
+            break
+        total += count
+        batches += 1
+        logger.info("%s 已归档 %s 行", name, total)
+        if sleep:
+            time.sleep(sleep)
+    return total
+
+
+class ArchiveQueryMixin:
+    """
+    为 ViewSet 增加可选的归档数据查询
+
+    - list（及 archive_list_actions 中的其他列表接口）：?include_archived=true 时，在线表与归档表分别按相同条件过滤后 UNION ALL，
+      按 created_at 倒序分页（只支持页码分页）
+    - retrieve：?include_archived=true 时，在线表中找不到再查归档表
+    """
+    archive_model = None
+    archive_query_param = 'include_archived'
+    archive_list_actions = ('list',)
+
+    def include_archived(self):
+        value = self.request.query_params.get(self.archive_query_param, '')
+        return self.archive_model is not None and value.lower() in ('1', 'true', 'yes')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.archive_list_actions or not self.include_archived():
+            return queryset
+
+        paginator = self.paginator
+        if paginator is not None and getattr(paginator, 'use_keyset', lambda request: False)(self.request):
+            raise ValidationError({'detail': '包含归档数据的查询不支持游标分页'})
+
+        fields = _archive_fields(self.archive_model)
+        archived = super().filter_queryset(self.archive_model.objects.all())
+        pk_name = queryset.model._meta.pk.attname
+        return (
+            queryset.only(*fields).order_by()
+            .union(archived.only(*fields).order_by(), all=True)
+            .order_by('-created_at', f'-{pk_name}')
+        )
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if self.action != 'retrieve' or not self.include_archived():
+                raise
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return get_object_or_404(self.archive_model.objects.all(), **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+
+def archive_settings():
+    conf = getattr(settings, 'ARCHIVE', {})
+    return {
+        'complaint': conf.get('COMPLAINT_AGE_DAYS', 180),
+        'transaction': conf.get('TRANSACTION_AGE_DAYS', 90),
+        'batch_size': conf.get('BATCH_SIZE', 1000),
+        'sleep': conf.get('BATCH_SLEEP', 0.1),
+    }
@@ -0,0 +1,166 @@
+"""
+读写分离：列表 / 详情查询走只读副本，写入走主库
+
+- 副本由环境变量 DB_REPLICA_HOSTS 配置（见 settings.DATABASES），未配置时全部走主库
+- StandartView 的 list / retrieve 等只读接口在请求范围内开启副本读取（contextvar），
+  其他代码（写入、权限、后台线程）的读取仍然走主库
+- 客户端写入成功后的 STICKY_SECONDS 秒内，该客户端（UUID 请求头或 Cookie）的读取固定走主库，
+  避免读不到自己刚写入的数据
+- 定期检查副本延迟（MySQL SHOW REPLICA STATUS），延迟超过 MAX_LAG 或复制中断的副本被跳过
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'db_primary'
+
+# 当前请求范围内读取使用的数据库别名，None 表示主库
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def _conf():
+    return getattr(settings, 'READ_REPLICA', {})
+
+
+def replica_aliases() -> List[str]:
+    return list(_conf().get('ALIASES', []))
+
+
+# ---- 写后读主库 ----
+
+def _client_key(request) -> Optional[str]:
+    client_id = request.headers.get('UUID')
+    return f"db:primary:{client_id}" if client_id else None
+
+
+def mark_primary(request, response):
+    """客户端写入成功后，一段时间内的读取固定走主库"""
+    sticky_seconds = _conf().get('STICKY_SECONDS', 5)
+    if not replica_aliases() or sticky_seconds <= 0:
+        return
+    key = _client_key(request)
+    if key:
+        cache.set(key, 1, sticky_seconds)
+    response.set_cookie(STICKY_COOKIE, '1', max_age=sticky_seconds, httponly=True, samesite='Lax')
+
+
+def is_sticky(request) -> bool:
+    """该客户端最近是否写入过"""
+    if request.COOKIES.get(STICKY_COOKIE):
+        return True
+    key = _client_key(request)
+    return bool(key and cache.get(key))
+
+
+# ---- 副本延迟 ----
+
+class ReplicaHealth:
+    """
+    副本延迟检查结果（进程内缓存 CHECK_INTERVAL 秒）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at: Dict[str, float] = {}
+        self._lag: Dict[str, Optional[float]] = {}
+
+    @staticmethod
+    def measure_lag(alias: str) -> Optional[float]:
+        """
+        查询副本延迟（秒），复制中断或查询失败返回 None；非 MySQL 数据库视为无延迟
+        """
+        connection = connections[alias]
+        if connection.vendor != 'mysql':
+            return 0.0
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except Exception:
+                # MySQL 8.0.22 之前的版本
+                cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                # 不是副本（例如直接指向主库的只读账号）
+                return 0.0
+            columns = [column[0] for column in cursor.description]
+        status = dict(zip(columns, row))
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return float(lag) if lag is not None else None
+
+    def lag(self, alias: str) -> Optional[float]:
+        interval = _conf().get('CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        if now - self._checked_at.get(alias, float('-inf')) < interval:
+            return self._lag.get(alias)
+        with self._lock:
+            if now - self._checked_at.get(alias, float('-inf')) < interval:
+                return self._lag.get(alias)
+            try:
+                lag = self.measure_lag(alias)
+            except Exception as e:
+                logger.warning("检查副本 %s 延迟失败: %s", alias, e)
+                lag = None
+            if lag is None or lag > _conf().get('MAX_LAG', 5):
+                logger.warning("副本 %s 延迟过大或复制中断（%s），暂不读取", alias, lag)
+            self._lag[alias] = lag
+            self._checked_at[alias] = now
+        return lag
+
+    def healthy(self, alias: str) -> bool:
+        lag = self.lag(alias)
+        return lag is not None and lag <= _conf().get('MAX_LAG', 5)
+
+    def status(self) -> Dict[str, Optional[float]]:
+        return dict(self._lag)
+
+
+replica_health = ReplicaHealth()
+
+
+def choose_replica() -> str:
+    """随机选择一个延迟正常的副本，没有可用副本时返回主库"""
+    candidates = [alias for alias in replica_aliases() if replica_health.healthy(alias)]
+    return random.choice(candidates) if candidates else PRIMARY
+
+
+@contextmanager
+def read_from_replica():
+    """
+    在该范围内的查询读取同一个副本（同一请求的 COUNT 与分页查询看到一致的数据）
+    """
+    token = _read_alias.set(choose_replica() if replica_aliases() else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    数据库路由：只在 read_from_replica() 范围内把读取发往副本
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 只在主库执行迁移，副本通过复制同步
+        return db == PRIMARY
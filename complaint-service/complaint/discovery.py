@@ -0,0 +1,212 @@
+"""
+服务发现后端
+
+ServiceRegistry（实例本地缓存 + 负载均衡）通过发现后端拉取某个服务的实例列表，
+后端由 SERVICE_DISCOVERY['BACKEND'] 选择：
+
+- nacos：从 Nacos 拉取健康实例（默认）
+- static：使用 settings 中配置的地址（USER_SERVICE_URL 等），不依赖任何注册中心，适合本地开发、测试和压测
+- dns：Kubernetes Service / DNS 名称。默认直接使用 Service 的域名，由 kube-proxy 负载均衡，
+  不做任何查询；DNS_RESOLVE 开启时解析出全部地址（headless Service），由客户端负载均衡
+- file：从 JSON 文件读取，文件修改后在下一次刷新时生效（按修改时间判断，无变化不重新解析）
+
+实例格式与 Nacos 一致：{"ip": ..., "port": ..., "healthy": True, "scheme": "http"}。
+"""
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+Instance = Dict[str, Any]
+
+
+def parse_address(address: str, default_port: int = 80) -> Instance:
+    """
+    解析 "http://host:port"、"host:port" 或 "host" 形式的地址
+    """
+    if '://' not in address:
+        address = f'http://{address}'
+    parts = urlsplit(address)
+    port = parts.port or (443 if parts.scheme == 'https' else default_port)
+    return {'ip': parts.hostname, 'port': port, 'healthy': True, 'scheme': parts.scheme}
+
+
+def _parse_entry(entry, default_port: int = 80) -> Instance:
+    if isinstance(entry, str):
+        return parse_address(entry, default_port)
+    instance = dict(entry)
+    instance.setdefault('healthy', True)
+    return instance
+
+
+class DiscoveryBackend:
+    """
+    发现后端基类：fetch() 返回服务的实例列表，失败时抛出异常（ServiceRegistry 继续使用旧数据）
+    """
+    name = ''
+
+    def fetch(self, service_name: str) -> List[Instance]:
+        raise NotImplementedError
+
+    @classmethod
+    def from_settings(cls, conf: Dict[str, Any]) -> 'DiscoveryBackend':
+        return cls()
+
+
+class NacosDiscovery(DiscoveryBackend):
+    """从 Nacos 拉取服务的健康实例列表"""
+    name = 'nacos'
+
+    def fetch(self, service_name):
+        from config.nacos_heartbeat import get_client
+
+        started = time.monotonic()
+        outcome = 'error'
+        try:
+            instances = get_client().list_naming_instance(service_name=service_name)
+            outcome = 'ok'
+        finally:
+            metrics.observe_nacos_lookup(service_name, outcome, time.monotonic() - started)
+        return [host for host in instances.get('hosts') or [] if host.get('healthy', False)]
+
+
+class StaticDiscovery(DiscoveryBackend):
+    """
+    固定地址：{服务名: [地址, ...]}，地址为 "http://host:port" 或实例字典
+    """
+    name = 'static'
+
+    def __init__(self, services: Dict[str, Any]):
+        self.services = {
+            service_name: [_parse_entry(entry) for entry in ([entries] if isinstance(entries, str) else entries)]
+            for service_name, entries in services.items()
+        }
+
+    @classmethod
+    def from_settings(cls, conf):
+        return cls(conf.get('SERVICES', {}))
+
+    def fetch(self, service_name):
+        if service_name not in self.services:
+            raise LookupError(f"没有配置服务地址: {service_name}")
+        return self.services[service_name]
+
+
+def kebab_case(service_name: str) -> str:
+    """UserService -> user-service（Kubernetes Service 的常见命名）"""
+    return re.sub(r'(?<!^)(?=[A-Z])', '-', service_name).lower()
+
+
+class DnsDiscovery(DiscoveryBackend):
+    """
+    Kubernetes Service / DNS
+
+    Args:
+        hosts: {服务名: "host:port"}，未配置的服务按 template 生成域名
+        template: 域名模板，{name} 为 kebab-case 的服务名（UserService -> user-service）
+        port: 模板生成的地址使用的端口
+        resolve: 是否解析出全部 IP（headless Service），否则直接返回域名（由集群负载均衡）
+    """
+    name = 'dns'
+
+    def __init__(self, hosts: Optional[Dict[str, str]] = None, template: str = '{name}', port: int = 8000,
+                 resolve: bool = False):
+        self.hosts = hosts or {}
+        self.template = template
+        self.port = port
+        self.resolve = resolve
+
+    @classmethod
+    def from_settings(cls, conf):
+        return cls(
+            hosts=conf.get('DNS_HOSTS', {}),
+            template=conf.get('DNS_TEMPLATE', '{name}'),
+            port=conf.get('DNS_PORT', 8000),
+            resolve=conf.get('DNS_RESOLVE', False),
+        )
+
+    def address(self, service_name: str) -> Instance:
+        address = self.hosts.get(service_name) or self.template.format(name=kebab_case(service_name))
+        return parse_address(address, self.port)
+
+    def fetch(self, service_name):
+        instance = self.address(service_name)
+        if not self.resolve:
+            return [instance]
+        infos = socket.getaddrinfo(instance['ip'], instance['port'], type=socket.SOCK_STREAM)
+        addresses = sorted({info[4][0] for info in infos})
+        if not addresses:
+            raise LookupError(f"DNS 没有解析到地址: {instance['ip']}")
+        return [dict(instance, ip=address) for address in addresses]
+
+
+class FileDiscovery(DiscoveryBackend):
+    """
+    JSON 文件：{服务名: [地址或实例字典, ...]}
+
+    文件修改时间变化时重新读取；读取或解析失败时抛出异常，ServiceRegistry 继续使用上一次的实例
+    """
+    name = 'file'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._services: Dict[str, List[Instance]] = {}
+
+    @classmethod
+    def from_settings(cls, conf):
+        path = conf.get('FILE')
+        if not path:
+            raise ValueError("SERVICE_DISCOVERY['FILE'] 未配置")
+        return cls(path)
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._services = {
+                service_name: [_parse_entry(entry) for entry in entries]
+                for service_name, entries in data.items()
+            }
+            self._mtime = mtime
+        logger.info("已加载服务地址文件 %s: %s", self.path, ', '.join(self._services))
+
+    def fetch(self, service_name):
+        self._load()
+        if service_name not in self._services:
+            raise LookupError(f"服务地址文件中没有该服务: {service_name}")
+        return self._services[service_name]
+
+
+BACKENDS = {
+    NacosDiscovery.name: NacosDiscovery,
+    StaticDiscovery.name: StaticDiscovery,
+    DnsDiscovery.name: DnsDiscovery,
+    FileDiscovery.name: FileDiscovery,
+}
+
+
+def discovery_from_settings() -> DiscoveryBackend:
+    """根据 settings.SERVICE_DISCOVERY 创建发现后端"""
+    conf = getattr(settings, 'SERVICE_DISCOVERY', {})
+    name = conf.get('BACKEND', 'nacos')
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的服务发现后端: {name}")
+    return BACKENDS[name].from_settings(conf)
@@ -0,0 +1,168 @@
+"""
+详情列表的关联信息批量解析
+
+ComplaintDetailSerializer / ComplaintReviewDetailSerializer 需要的举报人、审核员、
+被举报对象信息来自 UserService 和 ProductService。逐行逐字段调用会让一页 100 行
+产生上百次跨服务调用，这里改为：
+
+1. 先收集一页中所有不重复的用户ID、商品ID
+2. 命中缓存的直接使用（跨请求缓存）
+3. 未命中的每个下游服务只发一次批量请求，多个服务的请求并发执行
+4. 下游超时或失败时对应字段返回 None，不影响列表本身
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .service_client import ServiceClient
+
+logger = logging.getLogger(__name__)
+
+# 举报目标类型: 0-商品, 1-用户
+TARGET_TYPE_PRODUCT = 0
+TARGET_TYPE_USER = 1
+
+USER = 'user'
+PRODUCT = 'product'
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='enrichment')
+
+
+class References:
+    """
+    一次请求中需要解析的关联对象ID，以及解析结果
+    """
+
+    def __init__(self):
+        self.ids = {USER: set(), PRODUCT: set()}
+        self.data: Dict[str, Dict[str, Any]] = {USER: {}, PRODUCT: {}}
+
+    def add_user(self, user_id):
+        if user_id:
+            self.ids[USER].add(str(user_id))
+
+    def add_target(self, target_type, target_id):
+        kind = _target_kind(target_type)
+        if kind and target_id:
+            self.ids[kind].add(str(target_id))
+
+    def user(self, user_id) -> Optional[Any]:
+        return self.data[USER].get(str(user_id))
+
+    def target(self, target_type, target_id) -> Optional[Any]:
+        kind = _target_kind(target_type)
+        return self.data[kind].get(str(target_id)) if kind else None
+
+
+def _target_kind(target_type):
+    try:
+        target_type = int(target_type)
+    except (TypeError, ValueError):
+        return None
+    if target_type == TARGET_TYPE_PRODUCT:
+        return PRODUCT
+    if target_type == TARGET_TYPE_USER:
+        return USER
+    return None
+
+
+def _index_by_id(payload: Any) -> Dict[str, Any]:
+    """
+    将批量接口的返回整理为 {id: info}
+
+    兼容 [{"id": ...}, ...]、{"data": [...]} 以及已经按ID组织的 {id: info} 三种格式
+    """
+    if isinstance(payload, dict) and 'data' in payload:
+        payload = payload['data']
+    if isinstance(payload, dict):
+        return {str(key): value for key, value in payload.items()}
+    result = {}
+    for item in payload or []:
+        if not isinstance(item, dict):
+            continue
+        for key in ('id', 'uuid', 'user_id', 'product_id'):
+            if item.get(key) is not None:
+                result[str(item[key])] = item
+                break
+    return result
+
+
+class ReferenceResolver:
+    """
+    批量解析用户 / 商品信息
+
+    Args:
+        endpoints: {kind: (服务名, 批量接口路径)}
+        timeout: 每个下游批量请求的超时时间（秒），超时的字段返回 None
+        cache_ttl: 解析结果的跨请求缓存时间（秒），0 表示不缓存
+    """
+
+    def __init__(self, endpoints: Dict[str, tuple], timeout: float = 1.0, cache_ttl: int = 60):
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+
+    @classmethod
+    def from_settings(cls) -> 'ReferenceResolver':
+        conf = getattr(settings, 'REFERENCE_ENRICHMENT', {})
+        return cls(
+            endpoints={
+                USER: ('UserService', conf.get('USER_BATCH_ENDPOINT', '/api/v1/user/batch/')),
+                PRODUCT: ('ProductService', conf.get('PRODUCT_BATCH_ENDPOINT', '/api/v1/product/batch/')),
+            },
+            timeout=conf.get('TIMEOUT', 1.0),
+            cache_ttl=conf.get('CACHE_TTL', 60),
+        )
+
+    @staticmethod
+    def cache_key(kind: str, object_id: str) -> str:
+        return f"ref:{kind}:{object_id}"
+
+    def _fetch(self, kind: str, ids: Iterable[str]) -> Dict[str, Any]:
+        service_name, endpoint = self.endpoints[kind]
+        result = ServiceClient.post(service_name, endpoint, json={'ids': sorted(ids)}, timeout=self.timeout)
+        if not result['success']:
+            logger.warning("批量获取%s信息失败: %s", kind, result.get('error'))
+            return {}
+        return _index_by_id(result['data'])
+
+    def resolve(self, refs: References) -> References:
+        """
+        解析 refs 中收集的全部ID，结果写入 refs.data
+        """
+        missing = {}
+        for kind, ids in refs.ids.items():
+            if not ids:
+                continue
+            keys = {self.cache_key(kind, object_id): object_id for object_id in ids}
+            cached = cache.get_many(keys) if self.cache_ttl else {}
+            for key, value in cached.items():
+                refs.data[kind][keys[key]] = value
+            missing[kind] = ids - set(refs.data[kind])
+
+        futures = {
+            _executor.submit(contextvars.copy_context().run, self._fetch, kind, ids): kind
+            for kind, ids in missing.items() if ids
+        }
+        if not futures:
+            return refs
+
+        done, not_done = wait(futures, timeout=self.timeout + 0.5)
+        for future in not_done:
+            logger.warning("批量获取%s信息超时", futures[future])
+        for future in done:
+            kind = futures[future]
+            try:
+                fetched = future.result()
+            except Exception as e:
+                logger.warning("批量获取%s信息失败: %s", kind, e)
+                continue
+            fetched = {object_id: info for object_id, info in fetched.items() if object_id in missing[kind]}
+            refs.data[kind].update(fetched)
+            if self.cache_ttl and fetched:
+                cache.set_many({self.cache_key(kind, k): v for k, v in fetched.items()}, self.cache_ttl)
+        return refs
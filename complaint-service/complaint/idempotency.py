@@ -0,0 +1,103 @@
+"""
+举报提交的幂等与重复举报抑制
+
+- Idempotency-Key：客户端网络不稳定时会重试 POST complaints/create/。同一举报人、同一 Key
+  的请求在 TTL 内直接重放第一次的成功响应（响应头 Idempotent-Replayed: true），
+  处理中的重复请求返回 409，Key 被用于不同请求体时返回 422
+- 去重窗口：同一举报人在同一时间窗口内对同一目标的举报只保留一条。窗口由
+  dedupe_key（举报人、目标、窗口序号的摘要）上的唯一索引保证，并发提交时由数据库拒绝
+  重复插入，而不是先查再写。最近的结果同时写入缓存，重复举报只需一次缓存读取
+
+缓存使用 CACHES['default']，多 worker 部署时应配置为共享缓存（Redis 等）。
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _conf():
+    return getattr(settings, 'COMPLAINT_IDEMPOTENCY', {})
+
+
+def dedupe_window() -> int:
+    """去重窗口长度（秒），0 表示不去重"""
+    return int(_conf().get('DEDUPE_WINDOW', 0))
+
+
+def make_dedupe_key(complainer_id, target_type, target_id, now=None):
+    """
+    计算举报的去重键，未开启去重时返回 None（NULL 不参与唯一约束）
+    """
+    window = dedupe_window()
+    if window <= 0:
+        return None
+    bucket = int((now if now is not None else time.time()) // window)
+    raw = f"{complainer_id}:{target_type}:{target_id}:{window}:{bucket}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def get_recent_duplicate(dedupe_key):
+    """去重窗口内已提交过的举报（序列化后的数据），没有则返回 None"""
+    if not dedupe_key:
+        return None
+    return cache.get(f"complaint:dedupe:{dedupe_key}")
+
+
+def remember_complaint(dedupe_key, data):
+    """缓存刚创建的举报，窗口内的重复提交直接返回（没有主键的数据不缓存，否则整个窗口内都会返回无ID的举报）"""
+    if dedupe_key and data and data.get('complaint_id') is not None:
+        cache.set(f"complaint:dedupe:{dedupe_key}", data, dedupe_window())
+
+
+def _fingerprint(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def run_idempotent(request, owner, handler):
+    """
+    按请求头 Idempotency-Key 执行 handler()，成功的响应缓存后在重试时重放
+
+    Args:
+        request: DRF 请求
+        owner: 请求方标识（举报人ID），不同请求方的 Key 互不影响
+        handler: 实际处理请求的函数，返回 Response
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return Response({'detail': f'{IDEMPOTENCY_HEADER} 过长'}, status=status.HTTP_400_BAD_REQUEST)
+
+    conf = _conf()
+    cache_key = f"complaint:idempotency:{owner}:{hashlib.sha256(key.encode()).hexdigest()}"
+    lock_key = cache_key + ':lock'
+    fingerprint = _fingerprint(request.data)
+
+    stored = cache.get(cache_key)
+    if stored is not None:
+        if stored['fingerprint'] != fingerprint:
+            return Response({'detail': f'{IDEMPOTENCY_HEADER} 已用于其他请求'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+    if not cache.add(lock_key, 1, conf.get('LOCK_TTL', 30)):
+        return Response({'detail': '相同的请求正在处理中'}, status=status.HTTP_409_CONFLICT)
+    try:
+        response = handler()
+        if 200 <= response.status_code < 300:
+            cache.set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            }, conf.get('TTL', 86400))
+        return response
+    finally:
+        cache.delete(lock_key)
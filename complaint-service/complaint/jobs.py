@@ -0,0 +1,344 @@
+"""
+数据库任务队列（不依赖外部消息中间件）
+
+审核创建后的后续处理（处理举报、通知用户 / 商品服务封禁、写审计日志）需要多次跨服务调用，
+在请求中同步执行会拖慢审核接口。请求只在同一事务中写入 Job 行，由 worker 进程
+（python manage.py run_jobs，可同时运行多个）异步执行：
+
+- 领取：SELECT ... FOR UPDATE SKIP LOCKED 取出到期任务并标记为执行中，多个 worker 互不阻塞；
+  不支持行锁的数据库（SQLite）由带条件的 UPDATE 保证同一任务只被一个 worker 领取
+- 批量：同一批领取的任务按类型交给处理函数，处理函数合并数据库写入和下游调用
+  （封禁通知按目标服务合并为一次请求）
+- 重试：失败的任务按指数退避（带随机抖动）推迟执行，超过 MAX_ATTEMPTS 次后移入死信表 DeadLetterJob
+- 超时：执行中超过 LOCK_TIMEOUT 秒的任务（worker 异常退出）可以被重新领取
+- 执行成功的任务直接删除。任务可能因 worker 退出而重复执行，处理函数需要幂等
+
+用法：
+    from complaint import jobs
+    jobs.enqueue_review_jobs(review)  # 与创建审核在同一事务中
+"""
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import models, response_cache, summary
+from .enrichment import TARGET_TYPE_PRODUCT, TARGET_TYPE_USER
+from .service_client import ServiceClient
+
+logger = logging.getLogger(__name__)
+
+KIND_AUDIT = 'review.audit'
+KIND_RESOLVE_COMPLAINTS = 'review.resolve_complaints'
+KIND_NOTIFY_BAN = 'review.notify_ban'
+
+
+def _conf():
+    return getattr(settings, 'JOB_QUEUE', {})
+
+
+# ---- 入队 ----
+
+def enqueue_many(jobs: Iterable[Tuple[str, dict]], delay: float = 0.0) -> List[models.Job]:
+    """
+    写入多个任务（一条 INSERT），在调用方的事务中执行时随事务一起提交或回滚
+
+    Args:
+        jobs: [(任务类型, 参数), ...]，参数需要可以 JSON 序列化
+        delay: 延迟执行的秒数
+    """
+    run_at = timezone.now() + timedelta(seconds=delay)
+    return models.Job.objects.bulk_create(
+        [models.Job(kind=kind, payload=payload, run_at=run_at) for kind, payload in jobs]
+    )
+
+
+def enqueue(kind: str, payload: dict, delay: float = 0.0) -> models.Job:
+    """写入一个任务"""
+    return enqueue_many([(kind, payload)], delay)[0]
+
+
+def enqueue_review_jobs(review: models.ComplaintReview, resolved_count: Optional[int] = None) -> List[models.Job]:
+    """
+    审核创建后的后续任务：审计日志、将审核前的举报标记为已处理，设置了封禁时通知目标所属的服务
+
+    Args:
+        resolved_count: 举报已在创建审核的事务中处理时为处理的条数（只记录审计日志），None 表示由任务处理
+    """
+    base = {'review_id': review.review_id, 'target_type': int(review.target_type), 'target_id': str(review.target_id)}
+    jobs = [
+        (KIND_AUDIT, dict(base, event=f"审核: {review.result} 封禁: {review.ban_type or '无'} {review.ban_time or 0}天"[:100])),
+    ]
+    if resolved_count is None:
+        jobs.append((KIND_RESOLVE_COMPLAINTS, dict(base, reviewed_at=review.created_at.isoformat())))
+    else:
+        jobs.append((KIND_AUDIT, dict(base, event=f"举报已处理: {resolved_count}条")))
+    if review.ban_type:
+        jobs.append((KIND_NOTIFY_BAN, dict(base, ban_type=review.ban_type, ban_time=review.ban_time or 0)))
+    return enqueue_many(jobs)
+
+
+# ---- 任务处理函数 ----
+# 参数为同一类型的一批任务，返回失败任务的 {job_id: 原因}；抛出异常时整批失败
+
+def _audit_logs(jobs, event=None):
+    return [
+        models.AuditLog(review_id=job.payload['review_id'], target_type=job.payload['target_type'],
+                        target_id=job.payload['target_id'], event=event or job.payload['event'])
+        for job in jobs
+    ]
+
+
+def handle_audit(jobs: List[models.Job]) -> Dict[int, str]:
+    """写入审计日志（一次 bulk_create）"""
+    models.AuditLog.objects.bulk_create(_audit_logs(jobs))
+    return {}
+
+
+def handle_resolve_complaints(jobs: List[models.Job]) -> Dict[int, str]:
+    """
+    将审核时间之前的待处理举报标记为已处理：整批合并为一条 UPDATE，与计数调整、审计日志在同一事务中
+    """
+    condition = Q()
+    for job in jobs:
+        condition |= Q(target_type=job.payload['target_type'], target_id=job.payload['target_id'],
+                       created_at__lte=parse_datetime(job.payload['reviewed_at']))
+    with transaction.atomic():
+        updated = summary.update_complaints(
+            models.Complaint.objects.filter(condition, status=summary.STATUS_OPEN), {'status': summary.STATUS_HANDLED}
+        )
+        models.AuditLog.objects.bulk_create(_audit_logs(jobs, '举报已处理'))
+    if updated:
+        # 默认的进程内缓存（LocMemCache）无法通知 Web 进程，列表缓存最迟在 RESPONSE_CACHE['TTL'] 后更新
+        response_cache.bump(models.Complaint)
+    return {}
+
+
+def _ban_endpoints():
+    conf = _conf()
+    return {
+        TARGET_TYPE_USER: ('UserService', conf.get('USER_BAN_ENDPOINT', '/api/v1/user/ban/batch/')),
+        TARGET_TYPE_PRODUCT: ('ProductService', conf.get('PRODUCT_BAN_ENDPOINT', '/api/v1/product/ban/batch/')),
+    }
+
+
+def handle_notify_ban(jobs: List[models.Job]) -> Dict[int, str]:
+    """
+    通知用户服务 / 商品服务封禁被举报对象，每个服务一次批量请求：
+    POST {"bans": [{"review_id", "target_id", "ban_type", "ban_time"}, ...]}
+
+    下游按 review_id 去重（任务失败重试时会再次发送）
+    """
+    endpoints = _ban_endpoints()
+    groups = defaultdict(list)
+    failures = {}
+    for job in jobs:
+        endpoint = endpoints.get(job.payload['target_type'])
+        if endpoint is None:
+            failures[job.job_id] = f"不支持的目标类型: {job.payload['target_type']}"
+        else:
+            groups[endpoint].append(job)
+
+    notified = []
+    for (service_name, endpoint), group in groups.items():
+        result = ServiceClient.post(service_name, endpoint, json={'bans': [
+            {key: job.payload[key] for key in ('review_id', 'target_id', 'ban_type', 'ban_time')} for job in group
+        ]}, timeout=_conf().get('NOTIFY_TIMEOUT', 5.0))
+        if result.get('success'):
+            notified.extend(group)
+        else:
+            failures.update({job.job_id: f"{service_name}: {result.get('error')}" for job in group})
+    if notified:
+        models.AuditLog.objects.bulk_create(_audit_logs(notified, '已通知封禁'))
+    return failures
+
+
+HANDLERS = {
+    KIND_AUDIT: handle_audit,
+    KIND_RESOLVE_COMPLAINTS: handle_resolve_complaints,
+    KIND_NOTIFY_BAN: handle_notify_ban,
+}
+
+
+# ---- 执行 ----
+
+class Worker:
+    """
+    领取并执行任务
+
+    Args:
+        batch_size: 每次领取的最大任务数
+        poll_interval: 没有任务时的轮询间隔（秒），连续空闲时逐步增加到 max_poll_interval
+        lock_timeout: 执行中的任务超过该时间（秒）未完成，视为 worker 已退出，可被重新领取
+        max_attempts: 最大执行次数，超过后移入死信表
+        retry_base / retry_max: 重试退避的初始 / 最大时间（秒）
+        kinds: 只执行这些类型的任务，None 表示全部
+    """
+
+    def __init__(self, batch_size: int = 100, poll_interval: float = 1.0, max_poll_interval: float = 5.0,
+                 lock_timeout: float = 300.0, max_attempts: int = 8, retry_base: float = 5.0,
+                 retry_max: float = 600.0, kinds: Optional[List[str]] = None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.lock_timeout = lock_timeout
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.kinds = kinds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {'succeeded': 0, 'retried': 0, 'dead': 0}
+        self._stopping = False
+
+    @classmethod
+    def from_settings(cls, **overrides) -> 'Worker':
+        conf = _conf()
+        options = {
+            'batch_size': conf.get('BATCH_SIZE', 100),
+            'poll_interval': conf.get('POLL_INTERVAL', 1.0),
+            'max_poll_interval': conf.get('MAX_POLL_INTERVAL', 5.0),
+            'lock_timeout': conf.get('LOCK_TIMEOUT', 300.0),
+            'max_attempts': conf.get('MAX_ATTEMPTS', 8),
+            'retry_base': conf.get('RETRY_BASE', 5.0),
+            'retry_max': conf.get('RETRY_MAX', 600.0),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def retry_delay(self, attempts: int) -> float:
+        """第 attempts 次失败后的退避时间：指数增长，乘以 0.5~1 的随机系数避免同时重试"""
+        return min(self.retry_base * 2 ** (attempts - 1), self.retry_max) * random.uniform(0.5, 1.0)
+
+    def claim(self) -> List[models.Job]:
+        """领取一批到期的任务（包括领取超时的任务）"""
+        now = timezone.now()
+        ready = (Q(status=models.Job.STATUS_PENDING, run_at__lte=now)
+                 | Q(status=models.Job.STATUS_RUNNING, locked_at__lt=now - timedelta(seconds=self.lock_timeout)))
+        queryset = models.Job.objects.filter(ready)
+        if self.kinds:
+            queryset = queryset.filter(kind__in=self.kinds)
+        token = f"{self.worker_id}:{uuid.uuid4().hex[:12]}"
+        with transaction.atomic():
+            ids = list(queryset.select_for_update(skip_locked=True).order_by('run_at', 'job_id')
+                       .values_list('job_id', flat=True)[:self.batch_size])
+            if not ids:
+                return []
+            # 条件与查询时相同：没有行锁的数据库上，已被其他 worker 领取的任务不会被再次更新
+            models.Job.objects.filter(ready, job_id__in=ids).update(
+                status=models.Job.STATUS_RUNNING, locked_by=token, locked_at=now, attempts=F('attempts') + 1,
+            )
+        return list(models.Job.objects.filter(locked_by=token, status=models.Job.STATUS_RUNNING))
+
+    def execute(self, jobs: List[models.Job]):
+        """按类型执行一批任务，并记录结果"""
+        by_kind = defaultdict(list)
+        for job in jobs:
+            by_kind[job.kind].append(job)
+        for kind, group in by_kind.items():
+            handler = HANDLERS.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"未知的任务类型: {kind}")
+                failures = handler(group) or {}
+            except Exception as e:
+                logger.exception("任务执行失败: %s（%s 个）", kind, len(group))
+                failures = {job.job_id: f"{type(e).__name__}: {e}" for job in group}
+            self.complete([job for job in group if job.job_id not in failures])
+            for job in group:
+                if job.job_id in failures:
+                    self.fail(job, failures[job.job_id])
+
+    def complete(self, jobs: List[models.Job]):
+        if not jobs:
+            return
+        # 只删除自己领取的任务：领取超时后被其他 worker 重新领取的任务由对方处理
+        models.Job.objects.filter(job_id__in=[job.job_id for job in jobs], locked_by=jobs[0].locked_by).delete()
+        self.stats['succeeded'] += len(jobs)
+
+    def fail(self, job: models.Job, error: str):
+        owned = models.Job.objects.filter(job_id=job.job_id, locked_by=job.locked_by)
+        if job.attempts >= self.max_attempts:
+            with transaction.atomic():
+                if owned.delete()[0]:
+                    models.DeadLetterJob.objects.create(
+                        job_id=job.job_id, kind=job.kind, payload=job.payload, attempts=job.attempts,
+                        last_error=error, created_at=job.created_at,
+                    )
+            logger.error("任务 %s（%s）执行 %s 次均失败，已移入死信表: %s", job.job_id, job.kind, job.attempts, error)
+            self.stats['dead'] += 1
+            return
+        delay = self.retry_delay(job.attempts)
+        owned.update(status=models.Job.STATUS_PENDING, run_at=timezone.now() + timedelta(seconds=delay),
+                     locked_by=None, locked_at=None, last_error=error)
+        logger.warning("任务 %s（%s）第 %s 次执行失败，%.0f 秒后重试: %s", job.job_id, job.kind, job.attempts, delay, error)
+        self.stats['retried'] += 1
+
+    def run_once(self) -> int:
+        """领取并执行一批任务，返回任务数"""
+        close_old_connections()
+        jobs = self.claim()
+        if jobs:
+            self.execute(jobs)
+        return len(jobs)
+
+    def run(self, until_empty: bool = False):
+        """持续执行任务直到 stop()；until_empty 为 True 时没有到期任务即返回"""
+        idle = self.poll_interval
+        while not self._stopping:
+            try:
+                count = self.run_once()
+            except Exception:
+                # 数据库不可用等：等待后重试，不退出进程
+                logger.exception("领取任务失败")
+                count = 0
+                close_old_connections()
+            if count:
+                idle = self.poll_interval
+                continue
+            if until_empty:
+                return
+            time.sleep(idle)
+            idle = min(idle * 2, self.max_poll_interval)
+
+    def stop(self):
+        """当前批次执行完后退出"""
+        self._stopping = True
+
+
+# ---- 管理 ----
+
+def queue_stats() -> Dict[str, Dict[str, int]]:
+    """各类型任务的等待 / 执行中 / 死信数量"""
+    stats = defaultdict(lambda: {'pending': 0, 'running': 0, 'dead': 0})
+    for kind, job_status, count in (models.Job.objects.order_by().values_list('kind', 'status')
+                                    .annotate(count=Count('job_id'))):
+        stats[kind]['running' if job_status == models.Job.STATUS_RUNNING else 'pending'] += count
+    for kind, count in (models.DeadLetterJob.objects.order_by().values_list('kind')
+                        .annotate(count=Count('job_id'))):
+        stats[kind]['dead'] += count
+    return dict(stats)
+
+
+def requeue_dead(kinds: Optional[List[str]] = None) -> int:
+    """把死信表中的任务重新放回队列（执行次数清零），返回任务数"""
+    queryset = models.DeadLetterJob.objects.all()
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    with transaction.atomic():
+        dead = list(queryset.select_for_update())
+        if not dead:
+            return 0
+        enqueue_many([(job.kind, job.payload) for job in dead])
+        models.DeadLetterJob.objects.filter(job_id__in=[job.job_id for job in dead]).delete()
+    return len(dead)
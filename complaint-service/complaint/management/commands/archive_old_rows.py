@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaint.archive import ARCHIVES, archive_settings, archive_table
+
+
+class Command(BaseCommand):
+    help = '将超过保留期的投诉（已处理）和事务日志分批迁移到归档表'
+
+    def add_arguments(self, parser):
+        defaults = archive_settings()
+        parser.add_argument('--tables', nargs='+', choices=sorted(ARCHIVES), default=sorted(ARCHIVES),
+                            help='需要归档的表')
+        parser.add_argument('--complaint-days', type=int, default=defaults['complaint'],
+                            help='投诉保留天数')
+        parser.add_argument('--transaction-days', type=int, default=defaults['transaction'],
+                            help='事务日志保留天数')
+        parser.add_argument('--batch-size', type=int, default=defaults['batch_size'], help='每批迁移的行数')
+        parser.add_argument('--sleep', type=float, default=defaults['sleep'], help='批与批之间的暂停时间（秒）')
+        parser.add_argument('--max-batches', type=int, default=None, help='本次最多迁移的批数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计可归档的行数')
+
+    def handle(self, *args, **options):
+        for name in options['tables']:
+            started = time.monotonic()
+            count = archive_table(
+                name,
+                older_than_days=options[f'{name}_days'],
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                max_batches=options['max_batches'],
+                dry_run=options['dry_run'],
+            )
+            action = '可归档' if options['dry_run'] else '已归档'
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {action} {count} 行, 耗时 {time.monotonic() - started:.1f} 秒'
+            ))
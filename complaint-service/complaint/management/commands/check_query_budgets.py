@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from complaint.query_budget import get_budget
+
+
+class Command(BaseCommand):
+    help = '检查 config/urls.py 路由中的每个接口都声明了查询预算（query_budget）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-list', action='store_true', help='列出所有接口的预算')
+
+    def handle(self, *args, **options):
+        from config.urls import router
+
+        missing = []
+        for pattern in router.urls:
+            callback = pattern.callback
+            view_class = getattr(callback, 'cls', None)
+            actions = getattr(callback, 'actions', None)
+            if view_class is None or not actions:
+                # API 根视图等
+                continue
+            for method, action in actions.items():
+                budget = get_budget(view_class, action)
+                label = f'{method.upper():6} {pattern.pattern} ({view_class.__name__}.{action})'
+                if budget is None or budget.queries is None:
+                    missing.append(label)
+                elif options['verbose_list']:
+                    self.stdout.write(f'{label}: 查询 {budget.queries}，跨服务调用 {budget.service_calls}')
+
+        if missing:
+            raise CommandError('以下接口没有声明查询预算:\n' + '\n'.join(missing))
+        self.stdout.write(self.style.SUCCESS('所有路由接口都已声明查询预算'))
@@ -0,0 +1,52 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from complaint import jobs
+
+
+class Command(BaseCommand):
+    help = '执行数据库任务队列中的后台任务（可同时运行多个 worker）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kinds', nargs='+', choices=sorted(jobs.HANDLERS), default=None,
+                            help='只执行这些类型的任务')
+        parser.add_argument('--batch-size', type=int, default=None, help='每次领取的最大任务数')
+        parser.add_argument('--poll-interval', type=float, default=None, help='没有任务时的轮询间隔（秒）')
+        parser.add_argument('--once', action='store_true', help='执行完当前到期的任务后退出')
+        parser.add_argument('--stats', action='store_true', help='只输出各类型任务的数量')
+        parser.add_argument('--requeue-dead', action='store_true', help='把死信表中的任务重新放回队列')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = jobs.queue_stats()
+            if not stats:
+                self.stdout.write('队列为空')
+            for kind, counts in sorted(stats.items()):
+                self.stdout.write(f"{kind}: 等待 {counts['pending']}, 执行中 {counts['running']}, 死信 {counts['dead']}")
+            return
+        if options['requeue_dead']:
+            count = jobs.requeue_dead(options['kinds'])
+            self.stdout.write(self.style.SUCCESS(f'已重新入队 {count} 个任务'))
+            return
+
+        worker = jobs.Worker.from_settings(
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+            kinds=options['kinds'],
+        )
+
+        # 收到 SIGTERM（k8s 停止 Pod）/ SIGINT 时执行完当前批次再退出
+        def stop(signum, frame):
+            self.stdout.write('正在停止，等待当前批次完成...')
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'任务 worker 已启动: {worker.worker_id}')
+        worker.run(until_empty=options['once'])
+        stats = worker.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"worker 已退出: 成功 {stats['succeeded']}, 重试 {stats['retried']}, 死信 {stats['dead']}"
+        ))
@@ -0,0 +1,282 @@
+"""
+Prometheus 指标
+
+- 请求：按视图、方法、状态码的延迟直方图，按视图的进行中请求数
+- 数据库：每个请求的查询次数与查询总耗时（直方图）
+- 跨服务调用：ServiceClient 每次实例调用的延迟与结果（success / client_error / failure），
+  熔断拒绝、无可用实例等调用级结果
+- Nacos：实例列表查询的耗时与结果
+- 自动扩缩容信号（k8s/hpa.yaml 通过 prometheus-adapter 使用）：每个 worker 进行中的请求数、
+  请求排队时间（反向代理设置的 X-Request-Start 请求头）、每个请求等待下游服务的时间
+
+多进程（gunicorn / uvicorn 多 worker）部署时设置环境变量 PROMETHEUS_MULTIPROC_DIR
+（每次启动前清空的可写目录），各 worker 把指标写入该目录，/metrics 汇总所有 worker 的数据。
+worker 退出后调用 mark_process_dead(pid) 清理其进行中请求数（gunicorn.conf.py 的 child_exit 钩子），
+目录由 docker-entrypoint.sh 在容器启动时清空。
+"""
+import contextvars
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+REQUEST_LATENCY = Histogram(
+    'complaint_http_request_duration_seconds', '请求处理耗时',
+    ['view', 'method', 'status'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'complaint_http_requests_in_progress', '进行中的请求数',
+    ['view'], multiprocess_mode='livesum',
+)
+DB_QUERIES = Histogram(
+    'complaint_db_queries_per_request', '每个请求执行的数据库查询次数',
+    ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_TIME = Histogram(
+    'complaint_db_query_seconds_per_request', '每个请求的数据库查询总耗时',
+    ['view'], buckets=LATENCY_BUCKETS,
+)
+SERVICE_CALL_LATENCY = Histogram(
+    'complaint_service_client_request_duration_seconds', '跨服务调用（单个实例）耗时',
+    ['service', 'outcome'], buckets=LATENCY_BUCKETS,
+)
+SERVICE_CALLS = Counter(
+    'complaint_service_client_calls_total', '跨服务调用次数（含重试后的最终结果）',
+    ['service', 'outcome'],
+)
+WORKER_INFLIGHT = Gauge(
+    'complaint_worker_inflight_requests', '每个 worker 进行中的请求数',
+    multiprocess_mode='liveall',
+)
+QUEUE_WAIT = Histogram(
+    'complaint_request_queue_seconds', '请求从反向代理接收到进入 worker 的排队时间',
+    buckets=LATENCY_BUCKETS,
+)
+DOWNSTREAM_WAIT = Histogram(
+    'complaint_downstream_wait_seconds_per_request', '每个请求等待跨服务调用的总时间',
+    ['view'], buckets=LATENCY_BUCKETS,
+)
+QUERY_BUDGET_EXCEEDED = Counter(
+    'complaint_query_budget_exceeded_total', '超出查询 / 跨服务调用预算的请求数',
+    ['view', 'kind'],
+)
+NACOS_LOOKUP_LATENCY = Histogram(
+    'complaint_nacos_lookup_duration_seconds', 'Nacos 实例列表查询耗时',
+    ['service', 'outcome'], buckets=LATENCY_BUCKETS,
+)
+
+
+# ---- 每个请求的数据库查询统计 ----
+
+# 每个请求最多记录的 SQL 条数
+MAX_RECORDED_STATEMENTS = 500
+
+# 事务控制语句：数量取决于数据库类型（SQLite 显式 BEGIN）和外层是否已有事务（嵌套时为保存点）
+TRANSACTION_CONTROL_PREFIXES = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryStats:
+    __slots__ = ('count', 'transaction_control', 'seconds', 'service_calls', 'service_seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.transaction_control = 0
+        self.seconds = 0.0
+        self.service_calls = 0
+        self.service_seconds = 0.0
+        # 需要记录 SQL 文本时（查询预算检查）设为列表
+        self.statements = None
+
+
+_query_stats = contextvars.ContextVar('query_stats', default=None)
+
+
+def start_query_stats() -> tuple:
+    """开始统计当前请求的数据库查询，返回 (统计对象, 用于恢复的 token)"""
+    stats = QueryStats()
+    return stats, _query_stats.set(stats)
+
+
+def stop_query_stats(token):
+    _query_stats.reset(token)
+
+
+def current_query_stats():
+    return _query_stats.get()
+
+
+def _track_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        if sql.startswith(TRANSACTION_CONTROL_PREFIXES):
+            stats.transaction_control += 1
+        stats.seconds += time.perf_counter() - started
+        if stats.statements is not None and len(stats.statements) < MAX_RECORDED_STATEMENTS:
+            stats.statements.append(sql)
+
+
+def install_query_tracker(sender, connection, **kwargs):
+    """
+    connection_created 信号处理：为每个数据库连接安装查询统计钩子
+
+    统计对象保存在 contextvar 中，ASGI 下在线程中执行的同步视图同样计入所属请求
+    """
+    if _track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_track_query)
+
+
+class _StatsStream:
+    """
+    流式响应内容的包装：中间件返回后才逐块输出，输出每一块时把查询继续计入请求的统计对象
+
+    每输出一块（包括发现已经输出完毕的最后一步）调用 on_step()，
+    输出完毕、出错或响应关闭（客户端断开）时调用一次 on_close()
+    """
+
+    def __init__(self, content, stats, on_step=None, on_close=None):
+        self._content = content
+        self._stats = stats
+        self._on_step = on_step
+        self._on_close = on_close
+        self._closed = False
+
+    def _stepped(self):
+        if self._on_step is not None and not self._closed:
+            self._on_step()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            close = getattr(self._content, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+
+
+class _SyncStatsStream(_StatsStream):
+
+    def __init__(self, content, stats, on_step=None, on_close=None):
+        super().__init__(content, stats, on_step, on_close)
+        self._iterator = iter(content)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = _query_stats.set(self._stats)
+        try:
+            part = next(self._iterator)
+        except BaseException:
+            self._stepped()
+            self.close()
+            raise
+        finally:
+            _query_stats.reset(token)
+        self._stepped()
+        return part
+
+
+class _AsyncStatsStream(_StatsStream):
+
+    def __init__(self, content, stats, on_step=None, on_close=None):
+        super().__init__(content, stats, on_step, on_close)
+        self._iterator = aiter(content)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # 异步迭代器在线程中执行查询时（sync_to_async）复制当前上下文，同样计入
+        token = _query_stats.set(self._stats)
+        try:
+            part = await anext(self._iterator)
+        except BaseException:
+            self._stepped()
+            self.close()
+            raise
+        finally:
+            _query_stats.reset(token)
+        self._stepped()
+        return part
+
+
+def stream_with_stats(content, stats, on_step=None, on_close=None):
+    """
+    包装 StreamingHttpResponse.streaming_content，使逐块输出时的查询计入 stats（见 _StatsStream）
+
+        response.streaming_content = stream_with_stats(response.streaming_content, stats, on_close=...)
+    """
+    if hasattr(content, '__aiter__'):
+        return _AsyncStatsStream(content, stats, on_step, on_close)
+    return _SyncStatsStream(content, stats, on_step, on_close)
+
+
+# ---- 记录 ----
+
+def observe_service_call(service_name: str, outcome: str, seconds: float):
+    SERVICE_CALL_LATENCY.labels(service_name, outcome).observe(seconds)
+
+
+def count_service_call(service_name: str, outcome: str, seconds: float = 0.0):
+    """记录一次跨服务调用的最终结果，seconds 为调用方等待的总时间（含重试、对冲）"""
+    SERVICE_CALLS.labels(service_name, outcome).inc()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.service_calls += 1
+        stats.service_seconds += seconds
+
+
+def parse_request_start(value: str, now: float):
+    """
+    解析 X-Request-Start 请求头（"t=<时间戳>"，秒 / 毫秒 / 微秒），返回排队秒数，无法解析时返回 None
+
+    nginx: proxy_set_header X-Request-Start "t=${msec}";
+    """
+    try:
+        started = float(value.strip().removeprefix('t='))
+    except ValueError:
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    wait = now - started
+    # 时钟偏差导致的负值按 0 计，明显错误的值忽略
+    if wait > 3600:
+        return None
+    return max(wait, 0.0)
+
+
+def observe_nacos_lookup(service_name: str, outcome: str, seconds: float):
+    NACOS_LOOKUP_LATENCY.labels(service_name, outcome).observe(seconds)
+
+
+def render():
+    """返回 (指标文本, Content-Type)；多进程模式下汇总所有 worker"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """worker 退出后清理其 livesum 类型的指标"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
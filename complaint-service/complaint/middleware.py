@@ -0,0 +1,168 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.urls import Resolver404, resolve
+
+from . import metrics
+from . import query_budget
+from .permissions import IsAdminUser, aget_user_privilege
+
+
+def _resolve_view_class(request):
+    """返回请求将要命中的 DRF 视图类，非 DRF 视图或无法解析时返回 None"""
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    return getattr(match.func, 'cls', None)
+
+
+def _requires_admin(view_cls):
+    permission_classes = getattr(view_cls, 'permission_classes', None) or []
+    return any(isinstance(p, type) and issubclass(p, IsAdminUser) for p in permission_classes)
+
+
+class PrivilegePrefetchMiddleware:
+    """
+    在 ASGI 下异步预取管理员权限
+
+    DRF 的权限检查是同步的，ASGI 下同步调用 UserService 会占住线程直到返回。
+    本中间件在进入视图前用 AsyncServiceClient 异步查询 privilege 并挂到
+    request.prefetched_privilege 上，IsAdminUser 直接使用预取结果；
+    WSGI 下不做任何事情。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        user_id = request.headers.get('UUID')
+        if user_id and _requires_admin(_resolve_view_class(request)):
+            request.prefetched_privilege = await aget_user_privilege(user_id)
+        return await self.get_response(request)
+
+
+def _view_label(request):
+    """指标中的视图名（使用路由名而不是路径，避免标签数量随ID增长）"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """
+    记录每个请求的耗时、进行中请求数、排队时间、数据库查询次数与耗时、等待下游的时间（Prometheus）
+
+    应放在 MIDDLEWARE 的第一位，以统计完整的处理时间
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        view, started, stats, token = self._start(request)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._end(request, response, view, started, stats, token)
+
+    async def __acall__(self, request):
+        view, started, stats, token = self._start(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._end(request, response, view, started, stats, token)
+
+    @staticmethod
+    def _start(request):
+        request_start = request.headers.get('X-Request-Start')
+        if request_start:
+            wait = metrics.parse_request_start(request_start, time.time())
+            if wait is not None:
+                metrics.QUEUE_WAIT.observe(wait)
+        view = _view_label(request)
+        metrics.WORKER_INFLIGHT.inc()
+        metrics.REQUESTS_IN_PROGRESS.labels(view).inc()
+        stats, token = metrics.start_query_stats()
+        return view, time.perf_counter(), stats, token
+
+    @classmethod
+    def _end(cls, request, response, view, started, stats, token):
+        metrics.stop_query_stats(token)
+        status = response.status_code if response is not None else 500
+        if response is not None and response.streaming:
+            # 流式响应（导出）在中间件返回后才输出并查询数据库，输出结束时再记录
+            response.streaming_content = metrics.stream_with_stats(
+                response.streaming_content, stats,
+                on_close=lambda: cls._finish(request, view, started, stats, status),
+            )
+            return
+        cls._finish(request, view, started, stats, status)
+
+    @staticmethod
+    def _finish(request, view, started, stats, status):
+        elapsed = time.perf_counter() - started
+        metrics.WORKER_INFLIGHT.dec()
+        metrics.REQUESTS_IN_PROGRESS.labels(view).dec()
+        metrics.REQUEST_LATENCY.labels(view, request.method, str(status)).observe(elapsed)
+        metrics.DB_QUERIES.labels(view).observe(stats.count)
+        metrics.DB_QUERY_TIME.labels(view).observe(stats.seconds)
+        metrics.DOWNSTREAM_WAIT.labels(view).observe(stats.service_seconds)
+
+
+class QueryBudgetMiddleware:
+    """
+    按视图声明的预算检查每个请求的 SQL 查询次数和跨服务调用次数（见 complaint.query_budget）
+
+    放在 MetricsMiddleware 之后，复用其请求统计；流式响应在内容输出完毕后检查
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = query_budget.begin()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            query_budget.finish(request, stats, token, response)
+
+    async def __acall__(self, request):
+        stats, token = query_budget.begin()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            query_budget.finish(request, stats, token, response)
@@ -0,0 +1,54 @@
+"""
+自定义迁移操作
+"""
+from django.db.migrations.operations import AddConstraint, AddIndex
+from django.db.models import UniqueConstraint
+
+
+class AddIndexOnline(AddIndex):
+    """
+    在线创建索引
+
+    MySQL (InnoDB) 下使用 ALGORITHM=INPLACE, LOCK=NONE 创建索引，建索引期间表仍可正常读写，
+    适用于已有大量数据的表；如果 MySQL 无法在线创建会直接报错，而不是退化为锁表。
+    其他数据库与普通 AddIndex 相同。
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if (schema_editor.connection.vendor != 'mysql'
+                or not self.allow_migrate_model(schema_editor.connection.alias, model)):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        sql = self.index.create_sql(model, schema_editor)
+        schema_editor.execute(f"{sql} ALGORITHM=INPLACE LOCK=NONE", params=None)
+
+    def describe(self):
+        return f"{super().describe()} (online)"
+
+
+class AddConstraintOnline(AddConstraint):
+    """
+    在线创建唯一约束
+
+    MySQL 下以 CREATE UNIQUE INDEX ... ALGORITHM=INPLACE LOCK=NONE 创建（MySQL 的唯一约束就是唯一索引），
+    要求同 AddIndexOnline；带条件、表达式等的约束以及其他数据库与普通 AddConstraint 相同。
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        constraint = self.constraint
+        if (schema_editor.connection.vendor != 'mysql'
+                or not isinstance(constraint, UniqueConstraint)
+                or not constraint.fields
+                or constraint.condition or constraint.include or constraint.opclasses or constraint.deferrable
+                or not self.allow_migrate_model(schema_editor.connection.alias, model)):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        columns = ', '.join(schema_editor.quote_name(model._meta.get_field(name).column) for name in constraint.fields)
+        schema_editor.execute(
+            f"CREATE UNIQUE INDEX {schema_editor.quote_name(constraint.name)} "
+            f"ON {schema_editor.quote_name(model._meta.db_table)} ({columns}) ALGORITHM=INPLACE LOCK=NONE",
+            params=None,
+        )
+
+    def describe(self):
+        return f"{super().describe()} (online)"
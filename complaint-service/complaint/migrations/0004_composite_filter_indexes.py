@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 12:15
+# 索引使用 AddIndexOnline 创建：MySQL 下在线建索引，不阻塞大表读写
+
+from django.db import migrations, models
+
+from complaint.migration_operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    # MySQL 的 DDL 不支持事务，逐个索引执行
+    atomic = False
+
+    dependencies = [
+        ('complaint', '0003_alter_complaintreview_target_id'),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['target_id', 'target_type', 'status', 'created_at'], name='complaint_target_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['complainer_id', 'created_at'], name='complaint_complainer_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'created_at'], name='complaint_status_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['created_at'], name='complaint_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaintreview',
+            index=models.Index(fields=['target_id', 'target_type', 'created_at'], name='review_target_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaintreview',
+            index=models.Index(fields=['reviewer_id', 'created_at'], name='review_reviewer_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaintreview',
+            index=models.Index(fields=['created_at'], name='review_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='transaction',
+            index=models.Index(fields=['created_at'], name='transaction_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaint', '0004_composite_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintTargetSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.SmallIntegerField()),
+                ('target_id', models.UUIDField()),
+                ('open_count', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+                ('last_reported_at', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'complaint_target_summary',
+                'constraints': [models.UniqueConstraint(fields=('target_type', 'target_id'), name='complaint_summary_target_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 12:23
+# 先加可为空的列（不带唯一约束，只改表结构），再用 AddConstraintOnline 在线建唯一索引，不阻塞大表读写
+
+from django.db import migrations, models
+
+from complaint.migration_operations import AddConstraintOnline
+
+
+class Migration(migrations.Migration):
+
+    # MySQL 的 DDL 不支持事务，逐个操作执行
+    atomic = False
+
+    dependencies = [
+        ('complaint', '0005_complaint_target_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='dedupe_key',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        AddConstraintOnline(
+            model_name='complaint',
+            constraint=models.UniqueConstraint(fields=['dedupe_key'], name='complaint_dedupe_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaint', '0006_complaint_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintArchive',
+            fields=[
+                ('complaint_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('complainer_id', models.UUIDField()),
+                ('target_type', models.SmallIntegerField()),
+                ('target_id', models.UUIDField()),
+                ('reason', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('status', models.SmallIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'complaint_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['target_id', 'target_type', 'status', 'created_at'], name='complaint_arch_target_idx'), models.Index(fields=['complainer_id', 'created_at'], name='complaint_arch_complainer_idx'), models.Index(fields=['created_at'], name='complaint_arch_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('log_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('order_id', models.BigIntegerField()),
+                ('event', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'transaction_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='transaction_arch_created_idx')],
+            },
+        ),
+    ]
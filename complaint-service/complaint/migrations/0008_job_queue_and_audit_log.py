@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaint', '0007_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetterJob',
+            fields=[
+                ('job_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('attempts', models.IntegerField()),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField()),
+                ('failed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'job_dead_letter',
+                'ordering': ['-failed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('log_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('review_id', models.BigIntegerField()),
+                ('target_type', models.SmallIntegerField()),
+                ('target_id', models.UUIDField()),
+                ('event', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'audit_log',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['review_id'], name='audit_review_idx'), models.Index(fields=['target_id', 'target_type', 'created_at'], name='audit_target_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('job_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.SmallIntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('run_at', models.DateTimeField()),
+                ('locked_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('locked_at', models.DateTimeField(null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'job',
+                'indexes': [models.Index(fields=['status', 'run_at'], name='job_claim_idx')],
+            },
+        ),
+    ]
@@ -13,10 +13,39 @@ class Complaint(models.Model):
     reason = models.TextField()  # 举报原因
     created_at = models.DateTimeField(auto_now_add=True)  # 创建时间
     status = models.SmallIntegerField(default=0)  # 状态: 0-待处理, 1-已处理
+    # 去重键：举报人 + 目标 + 去重窗口序号的摘要，唯一约束 complaint_dedupe_key_uniq 保证窗口内不重复举报（NULL 不去重）
+    dedupe_key = models.CharField(max_length=40, null=True, blank=True, editable=False)
 
     class Meta:
         db_table = "complaint"
         ordering = ['-created_at']
+        # 与 ComplaintView.filterset_fields 的常用过滤组合对应，末列 created_at 用于按时间排序
+        indexes = [
+            models.Index(fields=['target_id', 'target_type', 'status', 'created_at'], name='complaint_target_idx'),
+            models.Index(fields=['complainer_id', 'created_at'], name='complaint_complainer_idx'),
+            models.Index(fields=['status', 'created_at'], name='complaint_status_idx'),
+            models.Index(fields=['created_at'], name='complaint_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedupe_key'], name='complaint_dedupe_key_uniq'),
+        ]
+
+class ComplaintTargetSummary(models.Model):
+    """
+       被举报对象的举报计数（随举报的创建、处理增量维护，可用 rebuild_complaint_summary 命令重建）
+    """
+    target_type = models.SmallIntegerField()  # 举报目标类型: 0-商品, 1-用户
+    target_id = models.UUIDField()  # 被举报对象ID
+    open_count = models.IntegerField(default=0)  # 待处理举报数
+    total_count = models.IntegerField(default=0)  # 举报总数
+    last_reported_at = models.DateTimeField(null=True)  # 最近一次被举报的时间
+    updated_at = models.DateTimeField(auto_now=True)  # 更新时间
+
+    class Meta:
+        db_table = "complaint_target_summary"
+        constraints = [
+            models.UniqueConstraint(fields=['target_type', 'target_id'], name='complaint_summary_target_uniq'),
+        ]
 
 class ComplaintReview(models.Model):
     """
@@ -34,6 +63,12 @@ class ComplaintReview(models.Model):
     class Meta:
         db_table = "complaint_review"
         ordering = ['-created_at']
+        # 与 ComplaintReviewView.filterset_fields 对应
+        indexes = [
+            models.Index(fields=['target_id', 'target_type', 'created_at'], name='review_target_idx'),
+            models.Index(fields=['reviewer_id', 'created_at'], name='review_reviewer_idx'),
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
 
 class Transaction(models.Model):
     """
@@ -47,6 +82,108 @@ class Transaction(models.Model):
     class Meta:
         db_table = "transaction"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='transaction_created_idx'),
+        ]
+
+class ComplaintArchive(models.Model):
+    """
+       已归档的投诉（archive_old_rows 命令从 complaint 表迁移，字段顺序与 Complaint 保持一致）
+    """
+    complaint_id = models.BigIntegerField(primary_key=True)  # 沿用原投诉ID
+    complainer_id = models.UUIDField()
+    target_type = models.SmallIntegerField()
+    target_id = models.UUIDField()
+    reason = models.TextField()
+    created_at = models.DateTimeField()
+    status = models.SmallIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)  # 归档时间
+
+    class Meta:
+        db_table = "complaint_archive"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['target_id', 'target_type', 'status', 'created_at'], name='complaint_arch_target_idx'),
+            models.Index(fields=['complainer_id', 'created_at'], name='complaint_arch_complainer_idx'),
+            models.Index(fields=['created_at'], name='complaint_arch_created_idx'),
+        ]
+
+class TransactionArchive(models.Model):
+    """
+       已归档的事务日志
+    """
+    log_id = models.BigIntegerField(primary_key=True)  # 沿用原日志ID
+    order_id = models.BigIntegerField()
+    event = models.CharField(max_length=100)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)  # 归档时间
+
+    class Meta:
+        db_table = "transaction_archive"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='transaction_arch_created_idx'),
+        ]
+
+class AuditLog(models.Model):
+    """
+       审核相关的审计事件（审核创建、举报处理、封禁通知），由后台任务写入
+    """
+    log_id = models.BigAutoField(primary_key=True)
+    review_id = models.BigIntegerField()  # 审核ID
+    target_type = models.SmallIntegerField()  # 被举报对象类型
+    target_id = models.UUIDField()  # 被举报对象ID
+    event = models.CharField(max_length=100)  # 事件描述
+    created_at = models.DateTimeField(auto_now_add=True)  # 创建时间
+
+    class Meta:
+        db_table = "audit_log"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['review_id'], name='audit_review_idx'),
+            models.Index(fields=['target_id', 'target_type', 'created_at'], name='audit_target_idx'),
+        ]
+
+class Job(models.Model):
+    """
+       后台任务队列（complaint.jobs，python manage.py run_jobs 执行）
+    """
+    STATUS_PENDING = 0
+    STATUS_RUNNING = 1
+
+    job_id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=50)  # 任务类型，对应 complaint.jobs.HANDLERS
+    payload = models.JSONField(default=dict)  # 任务参数
+    status = models.SmallIntegerField(default=STATUS_PENDING)  # 状态: 0-等待执行, 1-执行中（完成后删除）
+    attempts = models.IntegerField(default=0)  # 已执行次数
+    run_at = models.DateTimeField()  # 最早执行时间（失败后按退避时间推迟）
+    locked_by = models.CharField(max_length=100, null=True, blank=True)  # 领取该任务的 worker
+    locked_at = models.DateTimeField(null=True)  # 领取时间，超过 LOCK_TIMEOUT 视为 worker 已退出
+    last_error = models.TextField(blank=True, default='')  # 最近一次失败原因
+    created_at = models.DateTimeField(auto_now_add=True)  # 创建时间
+
+    class Meta:
+        db_table = "job"
+        indexes = [
+            # worker 按 (状态, 执行时间) 领取任务
+            models.Index(fields=['status', 'run_at'], name='job_claim_idx'),
+        ]
+
+class DeadLetterJob(models.Model):
+    """
+       超过最大重试次数的任务（保留原任务内容，可用 run_jobs --requeue-dead 重新入队）
+    """
+    job_id = models.BigIntegerField(primary_key=True)  # 沿用原任务ID
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    attempts = models.IntegerField()
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField()  # 原任务的创建时间
+    failed_at = models.DateTimeField(auto_now_add=True)  # 进入死信表的时间
+
+    class Meta:
+        db_table = "job_dead_letter"
+        ordering = ['-failed_at']
 
 # 需要注意的微服务改造点：
 
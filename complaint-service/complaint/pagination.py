@@ -0,0 +1,152 @@
+"""
+游标（keyset）分页
+
+页码分页每页都要执行 COUNT(*) 并用 OFFSET 跳过前面的行，越往后翻越慢。
+游标分页按 (created_at, pk) 定位，每页只查询 page_size + 1 行，不做 COUNT：
+
+    WHERE created_at < ? OR (created_at = ? AND pk < ?) ORDER BY created_at DESC, pk DESC
+
+游标对客户端不透明，请求参数 ?pagination=cursor 开启，之后使用响应中的 next / previous 翻页。
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    按 (created_at, pk) 倒序的游标分页
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 1000
+    ordering_field = 'created_at'
+    invalid_cursor_message = '无效的游标'
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.ordering_field)
+        payload = {'v': value.isoformat(), 'p': instance.pk, 'r': int(reverse)}
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            return datetime.fromisoformat(payload['v']), int(payload['p']), bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        field = self.ordering_field
+        reverse = False
+
+        queryset = queryset.order_by(f'-{field}', '-pk')
+        if cursor is not None:
+            value, pk, reverse = cursor
+            if reverse:
+                # 向前翻页：取更新的行，升序查询后再翻转
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+                ).order_by(field, 'pk')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+                )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_link = self.encode_cursor(rows[-1], False) if rows and has_next else None
+        if rows and has_previous:
+            self.previous_link = self.encode_cursor(rows[0], True)
+        elif not rows and cursor is not None:
+            # 越过末页时回到第一页
+            self.previous_link = remove_query_param(self.base_url, self.cursor_query_param)
+        else:
+            self.previous_link = None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetSwitchMixin:
+    """
+    为已有分页类增加可选的游标分页模式
+
+    请求带 ?pagination=cursor 或 cursor 参数时使用 KeysetPagination（沿用本分页类的
+    page_size 配置），否则保持原有分页方式。
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return params.get(self.mode_query_param) == 'cursor' or self.keyset_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if not self.use_keyset(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = self.keyset_class()
+        self.keyset.page_size = self.page_size
+        self.keyset.page_size_query_param = self.page_size_query_param
+        self.keyset.max_page_size = getattr(self, 'max_page_size', None) or self.keyset_class.max_page_size
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,5 +1,68 @@
+import logging
+
 from rest_framework import permissions
 
+from .privilege_cache import get_privilege_cache
+
+logger = logging.getLogger(__name__)
+
+_NOT_PREFETCHED = object()
+
+
+def _fetch_user_privilege(user_id):
+    """
+    从 UserService 查询用户 privilege，查询失败返回 None
+    """
+    from .service_client import ServiceClient
+
+    user_result = ServiceClient.get("UserService", f"/api/v1/user/{user_id}/")
+    if user_result["success"]:
+        return user_result["data"].get("privilege", 0)
+    return None
+
+
+async def _afetch_user_privilege(user_id):
+    """
+    从 UserService 异步查询用户 privilege，查询失败返回 None
+    """
+    from .service_client import AsyncServiceClient
+
+    user_result = await AsyncServiceClient.get("UserService", f"/api/v1/user/{user_id}/")
+    if user_result["success"]:
+        return user_result["data"].get("privilege", 0)
+    return None
+
+
+def get_user_privilege(user_id, request=None):
+    """
+    获取用户 privilege（经过权限缓存），用户ID非法或查询失败返回 None
+
+    如果 request 已经在异步中间件中预取过 privilege，直接使用预取结果。
+    """
+    if request is not None and getattr(request, 'prefetched_privilege', _NOT_PREFETCHED) is not _NOT_PREFETCHED:
+        return request.prefetched_privilege
+    try:
+        return get_privilege_cache().get_or_load(user_id, _fetch_user_privilege)
+    except ValueError:
+        return None
+    except Exception as e:
+        logger.warning("验证用户权限时出错: %s", e)
+        return None
+
+
+async def aget_user_privilege(user_id):
+    """
+    get_user_privilege 的异步版本，等待 UserService 时不占用线程
+    """
+    try:
+        return await get_privilege_cache().aget_or_load(user_id, _afetch_user_privilege)
+    except ValueError:
+        return None
+    except Exception as e:
+        logger.warning("验证用户权限时出错: %s", e)
+        return None
+
+
 class IsAuthenticated(permissions.BasePermission):
     """
     自定义权限类，仅允许已登录的用户访问。
@@ -17,21 +80,19 @@ class IsAdminUser(permissions.BasePermission):
 
     def has_permission(self, request, view):
         # 检查用户是否是认证用户，并且其 privilege 等于 1
-        from .service_client import ServiceClient
+        user_id = request.headers.get('UUID')
+        if not user_id:
+            return False
+        return get_user_privilege(user_id, request) == 1
 
+    async def has_permission_async(self, request, view=None):
+        """
+        has_permission 的异步版本，供 ASGI 下的异步代码路径使用
+        """
         user_id = request.headers.get('UUID')
         if not user_id:
             return False
-        print("用户ID:", user_id)
-        try:
-            user_result = ServiceClient.get("UserService", f"/api/v1/user/{user_id}/")
-            print("用户9999999999999999", user_result)
-            if user_result["success"]:
-                user_data = user_result["data"]
-                return user_data.get("privilege", 0) == 1
-        except Exception as e:
-            print(f"验证用户权限时出错: {e}")
-        return False
+        return await aget_user_privilege(user_id) == 1
 
 class IsComplaintOwner(permissions.BasePermission):
     """
@@ -39,23 +100,14 @@ class IsComplaintOwner(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        from .service_client import ServiceClient
         # 管理员可以访问所有对象
         user_id = request.headers.get('UUID')
         if not user_id:
             return False
 
         # 首先检查是否为管理员
-        try:
-            user_result = ServiceClient.get("UserService", f"/api/v1/user/{user_id}/")
-            if user_result["success"]:
-                user_data = user_result["data"]
-                # 如果是管理员，允许访问
-                if user_data.get("privilege", 0) == 1:
-                    return True
-        except Exception as e:
-            print(f"验证管理员权限时出错: {e}")
-            return False
+        if get_user_privilege(user_id, request) == 1:
+            return True
 
         # 投诉所有者可以访问自己的投诉
         if user_id:
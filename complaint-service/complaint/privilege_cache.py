@@ -0,0 +1,276 @@
+"""
+用户权限（privilege）查询缓存
+
+IsAdminUser / IsComplaintOwner 每次请求都要调用 UserService 查询用户 privilege，
+这里在调用方和 UserService 之间加一层缓存：
+
+- local 后端：进程内有界 LRU + TTL
+- django 后端：Django 缓存框架（配置 Redis/Memcached 后所有 gunicorn worker 共享）
+- 同一用户并发未命中时只发起一次上游调用（single-flight），其余请求等待结果
+- 可选的负缓存：上游查询失败/用户不存在时短时间缓存 None，避免打爆 UserService
+- 命中/未命中等计数，通过 stats() 查看
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# django 后端中表示负缓存的值（缓存框架无法区分 None 与未命中）
+_NEGATIVE_MARKER = '__negative__'
+
+
+class _Flight:
+    """一次进行中的上游查询，供并发的未命中请求共享结果"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PrivilegeCache:
+    """
+    按用户 UUID 缓存 privilege 的缓存
+
+    Args:
+        ttl: 正常结果的缓存时间（秒），0 表示不缓存
+        negative_ttl: 负缓存时间（秒），0 表示不做负缓存
+        max_size: local 后端最多缓存的用户数
+        backend: 'local' 或 'django'
+        cache_alias: django 后端使用的缓存别名
+        key_prefix: django 后端缓存键前缀
+        wait_timeout: 等待其他请求的上游查询结果的最长时间（秒）
+    """
+
+    def __init__(self, ttl: float = 60, negative_ttl: float = 5, max_size: int = 10000,
+                 backend: str = 'local', cache_alias: str = 'default',
+                 key_prefix: str = 'privilege:', wait_timeout: float = 10.0):
+        if backend not in ('local', 'django'):
+            raise ValueError(f"不支持的权限缓存后端: {backend}")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.backend = backend
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.wait_timeout = wait_timeout
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (过期时间, 值)
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[tuple, asyncio.Future] = {}  # (事件循环, key) -> Future
+        self._stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'load_errors': 0,
+            'coalesced': 0,
+            'evictions': 0,
+        }
+
+    @classmethod
+    def from_settings(cls) -> 'PrivilegeCache':
+        """根据 settings.PRIVILEGE_CACHE 创建缓存实例"""
+        conf = getattr(settings, 'PRIVILEGE_CACHE', {})
+        return cls(
+            ttl=conf.get('TTL', 60),
+            negative_ttl=conf.get('NEGATIVE_TTL', 5),
+            max_size=conf.get('MAX_SIZE', 10000),
+            backend=conf.get('BACKEND', 'local'),
+            cache_alias=conf.get('CACHE_ALIAS', 'default'),
+        )
+
+    @staticmethod
+    def normalize_key(user_id: Any) -> str:
+        """将用户ID规范化为 UUID 字符串，非法ID抛出 ValueError"""
+        return str(uuid.UUID(str(user_id)))
+
+    # ---- 存取 ----
+
+    def _get_cached(self, key: str) -> Any:
+        if self.backend == 'django':
+            value = caches[self.cache_alias].get(self.key_prefix + key, _MISSING)
+            if value == _NEGATIVE_MARKER:
+                return None
+            return value
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_cached(self, key: str, value: Any):
+        ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+
+        if self.backend == 'django':
+            stored = _NEGATIVE_MARKER if value is None else value
+            caches[self.cache_alias].set(self.key_prefix + key, stored, ttl)
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    # ---- 对外接口 ----
+
+    def get_or_load(self, user_id: Any, loader: Callable[[str], Optional[Any]]) -> Optional[Any]:
+        """
+        获取用户 privilege，未命中时调用 loader 查询上游
+
+        Args:
+            user_id: 用户UUID
+            loader: 上游查询函数，参数为规范化后的用户ID，查询失败返回 None
+
+        Returns:
+            privilege 值，查询失败（或命中负缓存）返回 None
+        """
+        key = self.normalize_key(user_id)
+
+        value = self._get_cached(key)
+        if value is not _MISSING:
+            self._count('negative_hits' if value is None else 'hits')
+            return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            if flight.event.wait(self.wait_timeout):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            # 等待超时，自己查询一次（不再参与 single-flight）
+            return loader(key)
+
+        try:
+            self._count('loads')
+            flight.value = loader(key)
+            self._set_cached(key, flight.value)
+            return flight.value
+        except Exception as e:
+            self._count('load_errors')
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    async def aget_or_load(self, user_id: Any,
+                           loader: Callable[[str], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """
+        get_or_load 的异步版本，loader 为协程函数
+
+        同一事件循环内并发未命中的请求共享一次上游调用；django 后端的读写放到线程中执行。
+        """
+        key = self.normalize_key(user_id)
+
+        if self.backend == 'django':
+            value = await sync_to_async(self._get_cached, thread_sensitive=False)(key)
+        else:
+            value = self._get_cached(key)
+        if value is not _MISSING:
+            self._count('negative_hits' if value is None else 'hits')
+            return value
+
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self._stats['misses'] += 1
+            future = self._async_flights.get(flight_key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_flights[flight_key] = future
+        try:
+            self._count('loads')
+            value = await loader(key)
+            if self.backend == 'django':
+                await sync_to_async(self._set_cached, thread_sensitive=False)(key, value)
+            else:
+                self._set_cached(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            self._count('load_errors')
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._async_flights.pop(flight_key, None)
+
+    def invalidate(self, user_id: Any):
+        """使某个用户的缓存失效（例如权限变更后）"""
+        key = self.normalize_key(user_id)
+        if self.backend == 'django':
+            caches[self.cache_alias].delete(self.key_prefix + key)
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """清空 local 后端缓存并重置计数"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中/未命中等计数"""
+        with self._lock:
+            data = dict(self._stats)
+            data['size'] = len(self._entries)
+        lookups = data['hits'] + data['negative_hits'] + data['misses']
+        data['hit_ratio'] = (data['hits'] + data['negative_hits']) / lookups if lookups else 0.0
+        data['backend'] = self.backend
+        return data
+
+
+_privilege_cache = None
+_privilege_cache_lock = threading.Lock()
+
+
+def get_privilege_cache() -> PrivilegeCache:
+    """获取进程内共享的权限缓存实例"""
+    global _privilege_cache
+    if _privilege_cache is None:
+        with _privilege_cache_lock:
+            if _privilege_cache is None:
+                _privilege_cache = PrivilegeCache.from_settings()
+    return _privilege_cache
@@ -0,0 +1,251 @@
+"""
+每个请求的 SQL 查询 / 跨服务调用预算与 N+1 检测
+
+视图通过类属性声明预算，键为 action 名，'default' 为其他 action 的预算：
+
+    class ComplaintView(StandartView):
+        query_budget = {'default': 4, 'branch_update': 6}
+        service_call_budget = {'default': 1}
+
+也可以直接写一个整数。没有声明预算的视图不检查。
+
+QueryBudgetMiddleware 统计每个请求的查询次数和 ServiceClient 调用次数（复用 metrics 的请求统计）：
+
+- 超出预算的请求计入 complaint_query_budget_exceeded_total 指标
+- 开发环境（DEBUG）记录每条 SQL，超出预算时把 SQL 写入日志，同一条 SQL 重复
+  N_PLUS_ONE_THRESHOLD 次以上时提示疑似 N+1（即使没有超出预算）
+- 生产环境按 SAMPLE_RATE 抽样记录 SQL，未抽中的请求只计指标、不写日志
+- 流式响应（导出）的查询在中间件返回后、逐块输出内容时执行，次数随行数增长：
+  视图本身和每输出一块的查询分别不能超过预算（导出接口的预算即每块的查询次数）
+- 事务控制语句（BEGIN、SAVEPOINT 等）不计入预算：它们的数量取决于数据库类型和外层事务
+  （测试用例本身在事务中执行，视图中的 atomic() 变为保存点），与视图执行了多少查询无关
+
+测试与 CI：
+- assert_within_budget(client.get(...)) 断言一次测试请求没有超出所属视图的预算
+- manage.py check_query_budgets 检查 config/urls.py 中每个路由接口都声明了预算
+"""
+import contextvars
+import logging
+import random
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 测试中强制记录 SQL（不受抽样影响）
+_force_capture = contextvars.ContextVar('query_budget_force_capture', default=False)
+
+
+def _conf():
+    return getattr(settings, 'QUERY_BUDGET', {})
+
+
+class Budget(NamedTuple):
+    queries: Optional[int]
+    service_calls: Optional[int]
+
+
+class BudgetReport(NamedTuple):
+    """一次请求的预算检查结果（保存在 request.query_budget_report）"""
+    view: str
+    budget: Budget
+    queries: int
+    service_calls: int
+    statements: Optional[List[str]]
+
+    @property
+    def over_queries(self) -> bool:
+        return self.budget.queries is not None and self.queries > self.budget.queries
+
+    @property
+    def over_service_calls(self) -> bool:
+        return self.budget.service_calls is not None and self.service_calls > self.budget.service_calls
+
+    @property
+    def exceeded(self) -> bool:
+        return self.over_queries or self.over_service_calls
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        """重复执行 threshold 次以上的 SQL（参数不同、语句相同，疑似 N+1）"""
+        if not self.statements:
+            return []
+        return [(sql, count) for sql, count in Counter(self.statements).most_common() if count >= threshold]
+
+    def describe(self, threshold: int = 2) -> str:
+        lines = [
+            f"{self.view}: 查询 {self.queries}/{_limit(self.budget.queries)} 次，"
+            f"跨服务调用 {self.service_calls}/{_limit(self.budget.service_calls)} 次"
+        ]
+        if self.statements is not None:
+            repeated = dict(self.repeated_statements(threshold))
+            for sql in dict.fromkeys(self.statements):
+                count = repeated.get(sql)
+                lines.append(f"  [{count}x] {sql}" if count else f"  {sql}")
+        return '\n'.join(lines)
+
+
+def _limit(value) -> str:
+    return '-' if value is None else str(value)
+
+
+def _lookup(declared, action) -> Optional[int]:
+    if declared is None or isinstance(declared, int):
+        return declared
+    return declared.get(action, declared.get('default'))
+
+
+def get_budget(view_class, action: Optional[str]) -> Optional[Budget]:
+    """视图某个 action 的预算，没有声明时返回 None"""
+    queries = _lookup(getattr(view_class, 'query_budget', None), action)
+    service_calls = _lookup(getattr(view_class, 'service_call_budget', None), action)
+    if queries is None and service_calls is None:
+        return None
+    return Budget(queries, service_calls)
+
+
+def resolve_view(request) -> Tuple[Optional[type], Optional[str], str]:
+    """请求对应的 (视图类, action, 视图名)"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None, 'unmatched'
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    actions = getattr(func, 'actions', None) or {}
+    return view_class, actions.get(request.method.lower()), match.view_name
+
+
+# ---- 请求范围的统计 ----
+
+def _should_capture() -> bool:
+    if _force_capture.get() or settings.DEBUG:
+        return True
+    rate = _conf().get('SAMPLE_RATE', 0.01)
+    return rate > 0 and random.random() < rate
+
+
+def begin():
+    """
+    开始统计当前请求（已有 MetricsMiddleware 的统计时复用），返回 (统计对象, token)
+    """
+    stats = metrics.current_query_stats()
+    token = None
+    if stats is None:
+        stats, token = metrics.start_query_stats()
+    if stats.statements is None and _should_capture():
+        stats.statements = []
+    return stats, token
+
+
+def finish(request, stats, token, response=None):
+    """结束统计，按视图预算检查并记录；流式响应在内容输出完毕后检查（见 _StreamCheck）"""
+    if token is not None:
+        metrics.stop_query_stats(token)
+    view_class, action, view_name = resolve_view(request)
+    budget = get_budget(view_class, action) if view_class is not None else None
+    if budget is None:
+        return None
+
+    queries = stats.count - stats.transaction_control
+    report = BudgetReport(view_name, budget, queries, stats.service_calls, stats.statements)
+    if response is not None and response.streaming:
+        check = _StreamCheck(request, stats, report)
+        response.streaming_content = metrics.stream_with_stats(
+            response.streaming_content, stats, on_step=check.step, on_close=check.close,
+        )
+        return None
+    _record(request, report)
+    return report
+
+
+class _StreamCheck:
+    """
+    流式响应（导出）的预算检查
+
+    内容在中间件返回后逐块输出，查询次数随行数增长，因此视图本身和每输出一块分别按预算检查，
+    输出结束后记录其中最差的一段（request.query_budget_report）
+    """
+
+    def __init__(self, request, stats, report):
+        self.request = request
+        self.stats = stats
+        self.worst = report
+        self._mark()
+
+    def _mark(self):
+        stats = self.stats
+        self.count = stats.count - stats.transaction_control
+        self.service_calls = stats.service_calls
+        # 每段单独记录 SQL，不受 MAX_RECORDED_STATEMENTS 的累计限制
+        if stats.statements is not None:
+            stats.statements = []
+
+    def step(self):
+        stats = self.stats
+        report = self.worst._replace(
+            queries=stats.count - stats.transaction_control - self.count,
+            service_calls=stats.service_calls - self.service_calls,
+            statements=stats.statements,
+        )
+        if (report.exceeded, report.queries, report.service_calls) > \
+                (self.worst.exceeded, self.worst.queries, self.worst.service_calls):
+            self.worst = report
+        self._mark()
+
+    def close(self):
+        _record(self.request, self.worst)
+
+
+def _record(request, report):
+    request.query_budget_report = report
+    if report.over_queries:
+        metrics.QUERY_BUDGET_EXCEEDED.labels(report.view, 'queries').inc()
+    if report.over_service_calls:
+        metrics.QUERY_BUDGET_EXCEEDED.labels(report.view, 'service_calls').inc()
+    if report.statements is None:
+        return
+
+    threshold = _conf().get('N_PLUS_ONE_THRESHOLD', 5)
+    if report.exceeded:
+        logger.warning("请求超出查询预算 %s %s\n%s", request.method, request.path, report.describe(threshold))
+    else:
+        for sql, count in report.repeated_statements(threshold):
+            logger.warning("疑似 N+1 查询 %s %s（%s）: 同一条 SQL 执行 %s 次: %s",
+                           request.method, request.path, report.view, count, sql)
+
+
+# ---- 测试辅助 ----
+
+@contextmanager
+def capture_statements():
+    """在该范围内的请求强制记录 SQL（测试中使用，断言失败时输出完整 SQL）"""
+    token = _force_capture.set(True)
+    try:
+        yield
+    finally:
+        _force_capture.reset(token)
+
+
+def assert_within_budget(response) -> BudgetReport:
+    """
+    断言测试客户端的一次请求没有超出视图声明的预算
+
+        with capture_statements():
+            response = client.get('/api/complaints/')
+        assert_within_budget(response)
+
+    流式响应需要先读完内容（response.streaming_content）再断言
+    """
+    request = response.wsgi_request if hasattr(response, 'wsgi_request') else response.asgi_request
+    report = getattr(request, 'query_budget_report', None)
+    if report is None:
+        if response.streaming:
+            raise AssertionError(f"{request.method} {request.path} 是流式响应，需要先读完内容再检查预算")
+        raise AssertionError(f"{request.method} {request.path} 所属视图没有声明查询预算")
+    if report.exceeded:
+        raise AssertionError(f"{request.method} {request.path} 超出查询预算\n{report.describe()}")
+    return report
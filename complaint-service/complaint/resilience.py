@@ -0,0 +1,287 @@
+"""
+跨服务调用的容错组件：熔断器、重试预算、对冲请求的延迟统计
+
+- CircuitBreaker：按服务、按实例各一个。连续失败达到阈值后打开（直接拒绝），
+  经过恢复时间后进入半开状态放行少量探测请求，探测成功则关闭、失败则重新打开
+- RetryBudget：按服务限制重试占比（令牌桶），下游整体故障时重试不会把流量放大数倍
+- LatencyTracker：按服务记录最近的成功调用延迟，用于决定对冲请求的发起时机
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    熔断器（closed / open / half_open）
+
+    Args:
+        name: 名称，用于日志和状态查看
+        failure_threshold: 连续失败多少次后打开
+        recovery_timeout: 打开后多久进入半开状态（秒）
+        half_open_max_calls: 半开状态下最多放行的探测请求数
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_calls = 0
+        self.trips = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _recovery_elapsed(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at >= self.recovery_timeout
+
+    def available(self) -> bool:
+        """当前是否可能放行请求（不改变状态，用于挑选实例）"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return self._recovery_elapsed()
+        return self.half_open_calls < self.half_open_max_calls
+
+    def allow_request(self) -> bool:
+        """判断是否放行本次请求；放行后必须调用 record() 记录结果"""
+        with self._lock:
+            if self.state == self.OPEN and self._recovery_elapsed():
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and self.half_open_calls < self.half_open_max_calls:
+                self.half_open_calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success: bool):
+        """记录一次请求结果"""
+        with self._lock:
+            if success:
+                if self.state == self.HALF_OPEN:
+                    logger.info("熔断器恢复: %s", self.name)
+                self.state = self.CLOSED
+                self.failures = 0
+                self.opened_at = None
+                return
+
+            if self.state == self.HALF_OPEN:
+                self._trip()
+            elif self.state == self.CLOSED:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._trip()
+
+    def release(self):
+        """放行的请求未产生结果（例如被取消）时归还半开状态的探测名额"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.failures = 0
+        self.trips += 1
+        logger.warning("熔断器打开: %s (累计 %s 次)", self.name, self.trips)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'trips': self.trips,
+            'rejected': self.rejected,
+            'open_for': round(time.monotonic() - self.opened_at, 3) if self.opened_at else None,
+        }
+
+
+class RetryBudget:
+    """
+    重试预算（令牌桶）
+
+    每个请求存入 ratio 个令牌，每次重试（或对冲）消耗 1 个令牌；另外每秒固定补充
+    min_per_second 个令牌，保证低流量时也能重试。初始为满桶，进程刚启动时也能重试。
+
+    Args:
+        ratio: 重试占正常请求的最大比例
+        min_per_second: 每秒固定补充的令牌数
+        max_tokens: 令牌上限
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: Optional[float] = None):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens if max_tokens is not None else max(10.0, min_per_second * 10)
+        self.tokens = self.max_tokens
+        self.retries = 0
+        self.exhausted = 0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount: float = 0.0):
+        now = time.monotonic()
+        amount += (now - self._updated_at) * self.min_per_second
+        self._updated_at = now
+        self.tokens = min(self.max_tokens, self.tokens + amount)
+
+    def record_request(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_acquire(self) -> bool:
+        """申请一次重试，预算不足返回 False"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {'tokens': round(self.tokens, 2), 'retries': self.retries, 'exhausted': self.exhausted}
+
+
+class LatencyTracker:
+    """
+    记录最近 window 次成功调用的延迟，计算分位数
+
+    Args:
+        window: 保留的样本数
+        min_samples: 样本少于该值时不给出分位数
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class Resilience:
+    """
+    进程内所有服务的熔断器、重试预算、延迟统计
+    """
+
+    def __init__(self, conf: Dict[str, Any]):
+        self.conf = conf
+        self.max_retries = conf.get('MAX_RETRIES', 1)
+        self.hedge_enabled = conf.get('HEDGE_ENABLED', False)
+        self.hedge_percentile = conf.get('HEDGE_PERCENTILE', 95)
+        self.hedges = 0
+        self._service_breakers: Dict[str, CircuitBreaker] = {}
+        self._instance_breakers: Dict[tuple, CircuitBreaker] = {}
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> 'Resilience':
+        return cls(getattr(settings, 'SERVICE_RESILIENCE', {}))
+
+    def _new_breaker(self, name: str, prefix: str) -> CircuitBreaker:
+        return CircuitBreaker(
+            name,
+            failure_threshold=self.conf.get(f'{prefix}_FAILURE_THRESHOLD', 5),
+            recovery_timeout=self.conf.get(f'{prefix}_RECOVERY_TIMEOUT', 30.0),
+            half_open_max_calls=self.conf.get('BREAKER_HALF_OPEN_MAX_CALLS', 1),
+        )
+
+    def service_breaker(self, service_name: str) -> CircuitBreaker:
+        breaker = self._service_breakers.get(service_name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._service_breakers.get(service_name)
+                if breaker is None:
+                    breaker = self._service_breakers[service_name] = self._new_breaker(service_name, 'SERVICE_BREAKER')
+        return breaker
+
+    def instance_breaker(self, service_name: str, key: str) -> CircuitBreaker:
+        breaker = self._instance_breakers.get((service_name, key))
+        if breaker is None:
+            with self._lock:
+                breaker = self._instance_breakers.get((service_name, key))
+                if breaker is None:
+                    breaker = self._instance_breakers[(service_name, key)] = self._new_breaker(
+                        f"{service_name}@{key}", 'INSTANCE_BREAKER')
+        return breaker
+
+    def retry_budget(self, service_name: str) -> RetryBudget:
+        budget = self._budgets.get(service_name)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.setdefault(service_name, RetryBudget(
+                    ratio=self.conf.get('RETRY_BUDGET_RATIO', 0.2),
+                    min_per_second=self.conf.get('RETRY_BUDGET_MIN_PER_SECOND', 1.0),
+                ))
+        return budget
+
+    def latency(self, service_name: str) -> LatencyTracker:
+        tracker = self._latencies.get(service_name)
+        if tracker is None:
+            with self._lock:
+                tracker = self._latencies.setdefault(service_name, LatencyTracker(
+                    min_samples=self.conf.get('HEDGE_MIN_SAMPLES', 20),
+                ))
+        return tracker
+
+    def hedge_delay(self, service_name: str) -> Optional[float]:
+        """对冲请求的等待时间（该服务成功延迟的分位数），未开启或样本不足时返回 None"""
+        if not self.hedge_enabled:
+            return None
+        return self.latency(service_name).percentile(self.hedge_percentile)
+
+    def status(self) -> Dict[str, Any]:
+        """熔断器状态、跳闸次数、重试预算等，便于排查"""
+        return {
+            'services': {name: b.snapshot() for name, b in list(self._service_breakers.items())},
+            'instances': {b.name: b.snapshot() for b in list(self._instance_breakers.values())},
+            'retry_budgets': {name: b.snapshot() for name, b in list(self._budgets.items())},
+            'hedges': self.hedges,
+        }
+
+
+_resilience = None
+_resilience_lock = threading.Lock()
+
+
+def get_resilience() -> Resilience:
+    """获取进程内共享的容错组件"""
+    global _resilience
+    if _resilience is None:
+        with _resilience_lock:
+            if _resilience is None:
+                _resilience = Resilience.from_settings()
+    return _resilience
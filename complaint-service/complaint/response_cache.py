@@ -0,0 +1,142 @@
+"""
+列表 / 详情接口的条件请求（ETag / Last-Modified）与响应缓存
+
+每个模型有一个"代"（generation），保存在 Django 缓存中，值为最近一次写入的时间戳。
+StandartView 的写接口（create / update / branch_update / 审核创建等）成功后更新相关模型的代，
+归档命令等后台写入也会更新。
+
+- ETag 由代、路径、规范化后的查询参数和响应格式计算，数据没有变化时 ETag 不变，
+  带 If-None-Match 的轮询直接返回 304，不执行查询、COUNT 和序列化
+- 同一 ETag 的响应数据短时间缓存（RESPONSE_CACHE['TTL']），不同客户端的相同查询共享
+- 写入会产生新的代，旧的缓存和 ETag 自然失效，不需要逐个删除
+- 配置了只读副本时，代更新后的 MAX_LAG 秒内不缓存、不返回 ETag，避免把副本上的旧数据缓存到新的代下
+
+缓存使用 CACHES['default']，多 worker 部署时应配置为共享缓存（Redis 等）。
+默认缓存只在本进程内可见（LocMemCache 等）时，其他 worker 的写入不会更新本进程的代，
+此时 ETag 和 Last-Modified 额外按 TTL 分段，旧数据最多沿用一个分段。
+"""
+import hashlib
+import math
+import time
+from typing import Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import db_router
+
+
+def _conf():
+    return getattr(settings, 'RESPONSE_CACHE', {})
+
+
+def _generation_key(model) -> str:
+    return f"gen:{model._meta.label_lower}"
+
+
+def bump(*models):
+    """模型数据发生变化，使相关的缓存和 ETag 失效"""
+    now = time.time()
+    cache.set_many({_generation_key(model): now for model in models}, None)
+
+
+def generations(models) -> List[float]:
+    """各模型当前的代，缓存中没有时以当前时间初始化"""
+    keys = [_generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    result = []
+    for key in keys:
+        value = found.get(key)
+        if value is None:
+            value = time.time()
+            if not cache.add(key, value, None):
+                value = cache.get(key, value)
+        result.append(value)
+    return result
+
+
+def _process_local_cache() -> bool:
+    """默认缓存是否只在本进程（本机）内可见，其他 worker / Pod 的 bump() 在这里看不到"""
+    return isinstance(caches['default'], (LocMemCache, DummyCache, FileBasedCache))
+
+
+def _settle_seconds() -> float:
+    """写入后多久内不缓存（等待副本追上主库）"""
+    if not db_router.replica_aliases():
+        return 0
+    return getattr(settings, 'READ_REPLICA', {}).get('MAX_LAG', 5)
+
+
+def _etag_matches(request, etag) -> bool:
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [tag.strip().removeprefix('W/') for tag in header.split(',')]
+
+
+def cached_response(request, build, models: Iterable = ()):
+    """
+    带条件请求与响应缓存地执行 build()
+
+    Args:
+        request: DRF 请求
+        build: 生成响应的函数
+        models: 响应所依赖的模型
+    """
+    conf = _conf()
+    if not conf.get('ENABLED', True):
+        return build()
+
+    gens = generations(list(models))
+    now = time.time()
+    if now - max(gens) < _settle_seconds():
+        return build()
+
+    ttl = conf.get('TTL', 5)
+    if _process_local_cache():
+        # 代只反映本进程的写入：按 TTL 分段，分段变化时 ETag 和 Last-Modified 也变化
+        window = max(ttl, 1)
+        gens.append(now // window * window)
+    # HTTP 日期精确到秒，向上取整：同一秒内的后续写入不会被当作未修改
+    last_modified = math.ceil(max(gens))
+
+    params = sorted(request.query_params.lists())
+    renderer = getattr(request, 'accepted_media_type', '')
+    raw = repr((request.path, params, renderer, gens))
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    etag = f'"{digest}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    # 这一秒还没过去时不返回 Last-Modified，否则客户端带回后，这一秒内的后续写入无法区分
+    if last_modified <= now:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    # If-None-Match 优先；只有 If-Modified-Since 时按秒比较
+    if _etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if 'If-None-Match' not in request.headers:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if since is not None and last_modified <= since:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache_key = f"resp:{digest}"
+    if ttl > 0:
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data, headers=headers)
+
+    response = build()
+    if response.status_code != status.HTTP_200_OK:
+        return response
+    if ttl > 0:
+        cache.set(cache_key, response.data, ttl)
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -4,7 +4,57 @@ from . import models
 class ComplaintSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Complaint
-        fields = '__all__'
+        exclude = ['dedupe_key']
+
+class ComplaintCreateSerializer(serializers.ModelSerializer):
+    """
+    用户提交举报时的请求体校验（举报人ID来自请求头）
+    """
+    class Meta:
+        model = models.Complaint
+        fields = ['target_type', 'target_id', 'reason']
+
+
+class BranchTargetSerializer(serializers.Serializer):
+    """
+    批量处理的举报目标
+    """
+    target_type = serializers.IntegerField()
+    target_id = serializers.UUIDField()
+
+
+class ReviewCreateOptionsSerializer(BranchTargetSerializer):
+    """
+    创建审核的目标与选项：resolve_complaints 为 true 时在同一事务中将该目标的待处理举报标记为已处理
+    """
+    resolve_complaints = serializers.BooleanField(default=False)
+
+
+class BranchBatchUpdateSerializer(serializers.Serializer):
+    """
+    批量处理多个举报目标的请求体：{"targets": [...], "data": {...}}
+    """
+    targets = BranchTargetSerializer(many=True, allow_empty=False, max_length=1000)
+    data = serializers.DictField()
+
+
+class TargetSummaryLookupSerializer(serializers.Serializer):
+    """
+    批量查询举报计数的请求体：{"targets": [{"target_type": 0, "target_id": "..."}]}
+    """
+    targets = BranchTargetSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class ComplaintTargetSummarySerializer(serializers.Serializer):
+    """
+    被举报对象的举报计数
+    """
+    target_type = serializers.IntegerField()
+    target_id = serializers.UUIDField()
+    open_count = serializers.IntegerField()
+    total_count = serializers.IntegerField()
+    last_reported_at = serializers.DateTimeField(allow_null=True)
+
 
 class ComplaintReviewSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,21 +78,30 @@ class ComplaintDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Complaint
-        fields = '__all__'
+        exclude = ['dedupe_key']
+
+    @staticmethod
+    def collect_references(instances, refs):
+        """
+        收集一页数据需要解析的用户 / 商品ID，由视图统一批量解析后放入 context['refs']
+        """
+        for obj in instances:
+            refs.add_user(obj.complainer_id)
+            refs.add_target(obj.target_type, obj.target_id)
 
     def get_complainer_info(self, obj):
         """
-        获取举报用户信息（需要通过UserService API获取）
+        获取举报用户信息（来自视图批量解析的 UserService 数据）
         """
-        # 在views.py中实现具体的API调用逻辑
-        return None
+        refs = self.context.get('refs')
+        return refs.user(obj.complainer_id) if refs else None
 
     def get_target_info(self, obj):
         """
-        获取被举报对象信息（需要通过 ProductService 或 UserService API获取）
+        获取被举报对象信息（来自视图批量解析的 ProductService 或 UserService 数据）
         """
-        # 在views.py中实现具体的API调用逻辑
-        return None
+        refs = self.context.get('refs')
+        return refs.target(obj.target_type, obj.target_id) if refs else None
 
 
 class ComplaintReviewDetailSerializer(serializers.ModelSerializer):
@@ -55,9 +114,17 @@ class ComplaintReviewDetailSerializer(serializers.ModelSerializer):
         model = models.ComplaintReview
         fields = '__all__'
 
+    @staticmethod
+    def collect_references(instances, refs):
+        """
+        收集一页数据需要解析的审核员ID
+        """
+        for obj in instances:
+            refs.add_user(obj.reviewer_id)
+
     def get_reviewer_info(self, obj):
         """
-        获取审核员信息（需要通过UserService API获取）
+        获取审核员信息（来自视图批量解析的 UserService 数据）
         """
-        # 在views.py中实现具体的API调用逻辑
-        return None
\ No newline at end of file
+        refs = self.context.get('refs')
+        return refs.user(obj.reviewer_id) if refs else None
@@ -1,20 +1,176 @@
 # utils/service_client.py
 
+import asyncio
+import atexit
+import contextvars
+import importlib.util
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
 import httpx
-import random
-from typing import Dict, Any, Optional
-from config.nacos_heartbeat import client
+from typing import Dict, Any, List, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import metrics
+from .discovery import discovery_from_settings
+from .resilience import get_resilience
+from .service_registry import ServiceRegistry, instance_key
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClientPool:
+    """
+    进程内按目标服务复用的 httpx.Client 连接池
+
+    每个目标服务一个长期存在的 httpx.Client，调用之间复用 TCP 连接（keep-alive），
+    避免每次跨服务调用都重新握手。fork 出的子进程（gunicorn 预派生 worker）
+    不会继承父进程的连接，进程退出时统一关闭。
+    """
+
+    _clients: Dict[str, httpx.Client] = {}
+    _lock = threading.Lock()
+    _pid = os.getpid()
+
+    @staticmethod
+    def _options() -> Dict[str, Any]:
+        conf = getattr(settings, 'SERVICE_CLIENT', {})
+        http2 = conf.get('HTTP2', False)
+        if http2 and importlib.util.find_spec('h2') is None:
+            logger.warning("未安装 h2，ServiceClient 回退为 HTTP/1.1")
+            http2 = False
+        return {
+            'limits': httpx.Limits(
+                max_connections=conf.get('MAX_CONNECTIONS', 100),
+                max_keepalive_connections=conf.get('MAX_KEEPALIVE_CONNECTIONS', 20),
+                keepalive_expiry=conf.get('KEEPALIVE_EXPIRY', 30.0),
+            ),
+            'http2': http2,
+        }
+
+    @classmethod
+    def _reset_after_fork(cls):
+        """子进程中丢弃从父进程继承的客户端（连接属于父进程，不能关闭也不能复用）"""
+        cls._lock = threading.Lock()
+        cls._clients = {}
+        cls._pid = os.getpid()
+
+    @classmethod
+    def get_client(cls, service_name: str) -> httpx.Client:
+        """
+        获取目标服务的共享客户端，不存在时创建
+
+        Args:
+            service_name: 目标服务名称
+
+        Returns:
+            httpx.Client 实例
+        """
+        if cls._pid != os.getpid():
+            cls._reset_after_fork()
+
+        http_client = cls._clients.get(service_name)
+        if http_client is None:
+            with cls._lock:
+                http_client = cls._clients.get(service_name)
+                if http_client is None:
+                    http_client = httpx.Client(**cls._options())
+                    cls._clients[service_name] = http_client
+        return http_client
+
+    @classmethod
+    def close_all(cls):
+        """关闭当前进程创建的所有客户端"""
+        if cls._pid != os.getpid():
+            return
+        with cls._lock:
+            clients, cls._clients = cls._clients, {}
+        for http_client in clients.values():
+            try:
+                http_client.close()
+            except Exception as e:
+                logger.warning("关闭服务客户端失败: %s", e)
+
+
+class AsyncHttpClientPool:
+    """
+    按事件循环、按目标服务复用的 httpx.AsyncClient 连接池
+
+    httpx.AsyncClient 绑定在创建它的事件循环上，因此每个事件循环各有一组客户端；
+    事件循环被回收时对应的客户端随之释放。
+    """
+
+    _clients = weakref.WeakKeyDictionary()  # loop -> {service_name: AsyncClient}
+
+    @classmethod
+    def get_client(cls, service_name: str) -> httpx.AsyncClient:
+        """获取当前事件循环中目标服务的共享客户端，不存在时创建"""
+        loop = asyncio.get_running_loop()
+        clients = cls._clients.get(loop)
+        if clients is None:
+            clients = cls._clients[loop] = {}
+        http_client = clients.get(service_name)
+        if http_client is None:
+            http_client = clients[service_name] = httpx.AsyncClient(**HttpClientPool._options())
+        return http_client
+
+    @classmethod
+    async def aclose_all(cls):
+        """关闭当前事件循环中的所有客户端"""
+        clients = cls._clients.pop(asyncio.get_running_loop(), {})
+        for http_client in clients.values():
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                logger.warning("关闭服务客户端失败: %s", e)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=HttpClientPool._reset_after_fork)
+atexit.register(HttpClientPool.close_all)
+
+
+# 可以安全重试（换实例重发）的HTTP方法
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# 单次实例调用的结果类型
+SUCCESS = 'success'
+CLIENT_ERROR = 'client_error'  # 4xx：实例正常，不重试、不计入熔断
+FAILURE = 'failure'  # 连接失败、超时、5xx
+CANCELLED = 'cancelled'  # 对冲请求中较慢的一方被取消
+
+# 对冲请求使用的线程池
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='service-hedge')
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_service_registry() -> ServiceRegistry:
+    """获取进程内共享的服务实例缓存"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry.from_settings(discovery_from_settings().fetch)
+    return _registry
 
 
 class ServiceClient:
     """
-    服务调用客户端，用于调用Nacos注册的其他服务
+    服务调用客户端，用于调用其他服务（实例来自服务发现后端，见 complaint.discovery）
     """
 
     @staticmethod
     def get_service_instance(service_name: str) -> Optional[Dict[str, Any]]:
         """
-        从Nacos获取服务实例信息
+        从本地实例缓存中按负载均衡策略选择服务实例
 
         Args:
             service_name: 服务名称
@@ -23,20 +179,35 @@ class ServiceClient:
             服务实例信息字典或None
         """
         try:
-            instances = client.list_naming_instance(service_name=service_name)
-
-            if 'hosts' in instances and instances['hosts']:
-                # 过滤出健康的实例
-                healthy_hosts = [host for host in instances['hosts'] if host.get('healthy', False)]
-                if healthy_hosts:
-                    # 随机选择一个健康实例（负载均衡）
-                    return random.choice(healthy_hosts)
-
-            return None
+            return ServiceClient.choose_instance(service_name)
         except Exception as e:
-            print(f"获取服务实例失败: {e}")
+            logger.warning("获取服务实例失败: %s", e)
             return None
 
+    @staticmethod
+    def choose_instance(service_name: str, tried: List[str] = ()) -> Optional[Dict[str, Any]]:
+        """
+        选择一个实例：跳过已尝试过的实例和熔断器打开的实例
+
+        返回的实例已通过熔断器放行，调用结束后必须经 _finish() 记录结果
+        """
+        registry = get_service_registry()
+        resilience = get_resilience()
+        exclude = set(tried)
+        for instance in registry.get_instances(service_name):
+            key = instance_key(instance)
+            if not resilience.instance_breaker(service_name, key).available():
+                exclude.add(key)
+
+        while True:
+            instance = registry.choose(service_name, exclude=exclude)
+            if instance is None:
+                return None
+            key = instance_key(instance)
+            if resilience.instance_breaker(service_name, key).allow_request():
+                return instance
+            exclude.add(key)
+
     @staticmethod
     def build_service_url(instance: Dict[str, Any], endpoint: str) -> str:
         """
@@ -51,12 +222,147 @@ class ServiceClient:
         """
         ip = instance.get('ip', '')
         port = instance.get('port', '')
+        scheme = instance.get('scheme') or 'http'
 
         # 确保endpoint以/开头
         if not endpoint.startswith('/'):
             endpoint = '/' + endpoint
 
-        return f"http://{ip}:{port}{endpoint}"
+        return f"{scheme}://{ip}:{port}{endpoint}"
+
+    @staticmethod
+    def build_result(response: httpx.Response) -> Dict[str, Any]:
+        """
+        将HTTP响应转换为服务调用结果，HTTP错误状态抛出 httpx.HTTPStatusError
+        """
+        response.raise_for_status()  # 检查HTTP错误
+
+        # 尝试解析JSON响应
+        try:
+            result = response.json()
+        except:
+            result = {"content": response.text}
+
+        return {
+            "success": True,
+            "data": result,
+            "status_code": response.status_code
+        }
+
+    @staticmethod
+    def build_error(service_name: str, instance: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        """
+        将调用异常转换为服务调用结果
+        """
+        if isinstance(error, httpx.ConnectError):
+            message = f"连接被拒绝: {str(error)}"
+        elif isinstance(error, httpx.TimeoutException):
+            message = f"请求超时: {str(error)}"
+        else:
+            message = f"请求失败: {str(error)}"
+        return {
+            "success": False,
+            "error": message,
+            "service_info": {
+                "service_name": service_name,
+                "ip": instance.get('ip'),
+                "port": instance.get('port')
+            }
+        }
+
+    @staticmethod
+    def classify(error: Exception) -> str:
+        """
+        判断调用异常的结果类型：4xx 说明实例本身工作正常，不计为故障，也不重试
+        """
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code < 500:
+            return CLIENT_ERROR
+        return FAILURE
+
+    @staticmethod
+    def _begin(service_name: str, instance: Dict[str, Any]) -> float:
+        get_service_registry().balancer.on_request_start(service_name, instance)
+        return time.monotonic()
+
+    @staticmethod
+    def _finish(service_name: str, instance: Dict[str, Any], started: float, outcome: str):
+        """记录一次实例调用结果：负载均衡统计、实例熔断器、延迟分位数"""
+        latency = time.monotonic() - started
+        healthy = outcome != FAILURE
+        get_service_registry().balancer.on_request_end(service_name, instance, latency, healthy)
+        metrics.observe_service_call(service_name, outcome, latency)
+        resilience = get_resilience()
+        breaker = resilience.instance_breaker(service_name, instance_key(instance))
+        if outcome == CANCELLED:
+            # 对冲请求中被取消的一方不计入熔断统计
+            breaker.release()
+            return
+        breaker.record(healthy)
+        if healthy:
+            resilience.latency(service_name).record(latency)
+
+    @classmethod
+    def _attempt(cls, service_name: str, instance: Dict[str, Any], method: str, endpoint: str,
+                 params: Dict, data: Dict, json: Dict, timeout: float):
+        """
+        向指定实例发起一次请求，返回 (服务调用结果, 结果类型)
+        """
+        url = cls.build_service_url(instance, endpoint)
+        started = cls._begin(service_name, instance)
+        outcome = FAILURE
+        try:
+            # 发起HTTP请求（复用该服务的连接池）
+            http_client = HttpClientPool.get_client(service_name)
+            response = http_client.request(
+                method=method,
+                url=url,
+                params=params,
+                data=data,
+                json=json,
+                timeout=timeout
+            )
+
+            result = cls.build_result(response)
+            outcome = SUCCESS
+            return result, outcome
+        except Exception as e:
+            outcome = cls.classify(e)
+            return cls.build_error(service_name, instance, e), outcome
+        finally:
+            cls._finish(service_name, instance, started, outcome)
+
+    @classmethod
+    def _hedged_attempt(cls, service_name: str, instance: Dict[str, Any], delay: float,
+                        tried: List[str], *args):
+        """
+        对冲请求：主请求超过 delay 秒（该服务延迟分位数）仍未返回时，
+        向另一个实例再发一次，取先成功的结果
+        """
+        primary = _hedge_executor.submit(contextvars.copy_context().run, cls._attempt, service_name, instance, *args)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+
+        resilience = get_resilience()
+        if not resilience.retry_budget(service_name).try_acquire():
+            return primary.result()
+        backup_instance = cls.choose_instance(service_name, tried)
+        if backup_instance is None:
+            return primary.result()
+        tried.append(instance_key(backup_instance))
+        resilience.hedges += 1
+        backup = _hedge_executor.submit(contextvars.copy_context().run, cls._attempt, service_name, backup_instance, *args)
+
+        pending = {primary, backup}
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result[1] != FAILURE:
+                    return result
+        return result
 
     @classmethod
     def call_service(cls, service_name: str, endpoint: str, method: str = 'GET',
@@ -65,6 +371,9 @@ class ServiceClient:
         """
         调用其他服务的API
 
+        服务熔断时直接返回失败；幂等方法失败后在重试预算内换一个健康实例重试；
+        开启对冲后，GET 请求慢于延迟分位数时向另一个实例发起对冲请求。
+
         Args:
             service_name: 目标服务名称
             endpoint: 服务端点路径
@@ -77,72 +386,49 @@ class ServiceClient:
         Returns:
             服务调用结果
         """
-        # 获取服务实例
-        instance = cls.get_service_instance(service_name)
-        if not instance:
+        resilience = get_resilience()
+        breaker = resilience.service_breaker(service_name)
+        if not breaker.allow_request():
+            metrics.count_service_call(service_name, 'rejected')
             return {
                 "success": False,
-                "error": f"未找到可用的服务实例: {service_name}"
+                "error": f"服务熔断中: {service_name}"
             }
+        budget = resilience.retry_budget(service_name)
+        budget.record_request()
+        call_started = time.monotonic()
 
-        # 构建URL
-        url = cls.build_service_url(instance, endpoint)
+        method = method.upper()
+        retries = resilience.max_retries if method in IDEMPOTENT_METHODS else 0
+        hedge_delay = resilience.hedge_delay(service_name) if method == 'GET' else None
+        args = (method, endpoint, params, data, json, timeout)
 
-        try:
-            # 发起HTTP请求
-            with httpx.Client(timeout=timeout) as client:
-                response = client.request(
-                    method=method,
-                    url=url,
-                    params=params,
-                    data=data,
-                    json=json
-                )
-
-                response.raise_for_status()  # 检查HTTP错误
-
-                # 尝试解析JSON响应
-                try:
-                    result = response.json()
-                except:
-                    result = {"content": response.text}
-
-                return {
-                    "success": True,
-                    "data": result,
-                    "status_code": response.status_code
-                }
-
-        except httpx.ConnectError as e:
-            return {
-                "success": False,
-                "error": f"连接被拒绝: {str(e)}",
-                "service_info": {
-                    "service_name": service_name,
-                    "ip": instance.get('ip'),
-                    "port": instance.get('port')
-                }
-            }
-        except httpx.TimeoutException as e:
-            return {
-                "success": False,
-                "error": f"请求超时: {str(e)}",
-                "service_info": {
-                    "service_name": service_name,
-                    "ip": instance.get('ip'),
-                    "port": instance.get('port')
-                }
-            }
-        except Exception as e:
+        tried = []
+        result, outcome = None, FAILURE
+        for attempt in range(retries + 1):
+            if attempt and not budget.try_acquire():
+                break
+            # 获取服务实例
+            instance = cls.choose_instance(service_name, tried)
+            if not instance:
+                break
+            tried.append(instance_key(instance))
+            if attempt == 0 and hedge_delay is not None:
+                result, outcome = cls._hedged_attempt(service_name, instance, hedge_delay, tried, *args)
+            else:
+                result, outcome = cls._attempt(service_name, instance, *args)
+            if outcome != FAILURE:
+                break
+
+        breaker.record(outcome != FAILURE)
+        metrics.count_service_call(service_name, outcome if result is not None else 'no_instance',
+                                   time.monotonic() - call_started)
+        if result is None:
             return {
                 "success": False,
-                "error": f"请求失败: {str(e)}",
-                "service_info": {
-                    "service_name": service_name,
-                    "ip": instance.get('ip'),
-                    "port": instance.get('port')
-                }
+                "error": f"未找到可用的服务实例: {service_name}"
             }
+        return result
 
     @classmethod
     def get(cls, service_name: str, endpoint: str, params: Dict = None, timeout: float = 5.0):
@@ -163,3 +449,164 @@ class ServiceClient:
     def delete(cls, service_name: str, endpoint: str, timeout: float = 5.0):
         """DELETE请求快捷方法"""
         return cls.call_service(service_name, endpoint, 'DELETE', timeout=timeout)
+
+
+class AsyncServiceClient:
+    """
+    异步服务调用客户端，接口与 ServiceClient 一致
+
+    在 ASGI 下调用其他服务时不占用 worker 线程，一个 worker 可以同时挂起
+    大量慢调用。实例选择、负载均衡与 ServiceClient 共用同一份实例缓存。
+    """
+
+    @staticmethod
+    async def get_service_instance(service_name: str, tried: List[str] = ()) -> Optional[Dict[str, Any]]:
+        """
+        选择服务实例（规则同 ServiceClient.choose_instance），实例缓存未建立时在线程中拉取，避免阻塞事件循环
+
+        Args:
+            service_name: 服务名称
+            tried: 需要跳过的已尝试实例
+
+        Returns:
+            服务实例信息字典或None
+        """
+        try:
+            if get_service_registry().is_cached(service_name):
+                return ServiceClient.choose_instance(service_name, tried)
+            return await sync_to_async(ServiceClient.choose_instance, thread_sensitive=False)(service_name, tried)
+        except Exception as e:
+            logger.warning("获取服务实例失败: %s", e)
+            return None
+
+    @staticmethod
+    async def _attempt(service_name: str, instance: Dict[str, Any], method: str, endpoint: str,
+                       params: Dict, data: Dict, json: Dict, timeout: float):
+        url = ServiceClient.build_service_url(instance, endpoint)
+        started = ServiceClient._begin(service_name, instance)
+        outcome = FAILURE
+        try:
+            http_client = AsyncHttpClientPool.get_client(service_name)
+            response = await http_client.request(
+                method=method,
+                url=url,
+                params=params,
+                data=data,
+                json=json,
+                timeout=timeout
+            )
+
+            result = ServiceClient.build_result(response)
+            outcome = SUCCESS
+            return result, outcome
+        except asyncio.CancelledError:
+            outcome = CANCELLED
+            raise
+        except Exception as e:
+            outcome = ServiceClient.classify(e)
+            return ServiceClient.build_error(service_name, instance, e), outcome
+        finally:
+            ServiceClient._finish(service_name, instance, started, outcome)
+
+    @classmethod
+    async def _hedged_attempt(cls, service_name: str, instance: Dict[str, Any], delay: float,
+                              tried: List[str], *args):
+        primary = asyncio.ensure_future(cls._attempt(service_name, instance, *args))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        resilience = get_resilience()
+        if not resilience.retry_budget(service_name).try_acquire():
+            return await primary
+        backup_instance = await cls.get_service_instance(service_name, tried)
+        if backup_instance is None:
+            return await primary
+        tried.append(instance_key(backup_instance))
+        resilience.hedges += 1
+        backup = asyncio.ensure_future(cls._attempt(service_name, backup_instance, *args))
+
+        pending = {primary, backup}
+        result = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result[1] != FAILURE:
+                        return result
+            return result
+        finally:
+            # 取消较慢的那个请求
+            for task in pending:
+                task.cancel()
+
+    @classmethod
+    async def call_service(cls, service_name: str, endpoint: str, method: str = 'GET',
+                           params: Dict = None, data: Dict = None, json: Dict = None,
+                           timeout: float = 5.0) -> Dict[str, Any]:
+        """
+        异步调用其他服务的API，参数、返回值以及熔断/重试/对冲规则同 ServiceClient.call_service
+        """
+        resilience = get_resilience()
+        breaker = resilience.service_breaker(service_name)
+        if not breaker.allow_request():
+            metrics.count_service_call(service_name, 'rejected')
+            return {
+                "success": False,
+                "error": f"服务熔断中: {service_name}"
+            }
+        budget = resilience.retry_budget(service_name)
+        budget.record_request()
+        call_started = time.monotonic()
+
+        method = method.upper()
+        retries = resilience.max_retries if method in IDEMPOTENT_METHODS else 0
+        hedge_delay = resilience.hedge_delay(service_name) if method == 'GET' else None
+        args = (method, endpoint, params, data, json, timeout)
+
+        tried = []
+        result, outcome = None, FAILURE
+        for attempt in range(retries + 1):
+            if attempt and not budget.try_acquire():
+                break
+            instance = await cls.get_service_instance(service_name, tried)
+            if not instance:
+                break
+            tried.append(instance_key(instance))
+            if attempt == 0 and hedge_delay is not None:
+                result, outcome = await cls._hedged_attempt(service_name, instance, hedge_delay, tried, *args)
+            else:
+                result, outcome = await cls._attempt(service_name, instance, *args)
+            if outcome != FAILURE:
+                break
+
+        breaker.record(outcome != FAILURE)
+        metrics.count_service_call(service_name, outcome if result is not None else 'no_instance',
+                                   time.monotonic() - call_started)
+        if result is None:
+            return {
+                "success": False,
+                "error": f"未找到可用的服务实例: {service_name}"
+            }
+        return result
+
+    @classmethod
+    async def get(cls, service_name: str, endpoint: str, params: Dict = None, timeout: float = 5.0):
+        """GET请求快捷方法"""
+        return await cls.call_service(service_name, endpoint, 'GET', params=params, timeout=timeout)
+
+    @classmethod
+    async def post(cls, service_name: str, endpoint: str, data: Dict = None, json: Dict = None, timeout: float = 5.0):
+        """POST请求快捷方法"""
+        return await cls.call_service(service_name, endpoint, 'POST', data=data, json=json, timeout=timeout)
+
+    @classmethod
+    async def put(cls, service_name: str, endpoint: str, data: Dict = None, json: Dict = None, timeout: float = 5.0):
+        """PUT请求快捷方法"""
+        return await cls.call_service(service_name, endpoint, 'PUT', data=data, json=json, timeout=timeout)
+
+    @classmethod
+    async def delete(cls, service_name: str, endpoint: str, timeout: float = 5.0):
+        """DELETE请求快捷方法"""
+        return await cls.call_service(service_name, endpoint, 'DELETE', timeout=timeout)
@@ -0,0 +1,306 @@
+"""
+服务实例本地缓存与负载均衡
+
+ServiceClient 不再在每次调用时都向注册中心（发现后端，见 complaint.discovery）查询实例列表，而是：
+
+- 首次调用某个服务时同步拉取一次实例列表，之后由后台线程按
+  刷新间隔（带随机抖动，避免所有 worker 同时打到注册中心）定期刷新
+- 注册中心不可达时继续使用上一次成功拉取的实例列表（过期数据）
+- 从缓存的健康实例中按负载均衡策略选择实例：
+  random / round_robin / least_outstanding / ewma
+"""
+import itertools
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+Instance = Dict[str, Any]
+
+
+def instance_key(instance: Instance) -> str:
+    """实例唯一标识 ip:port"""
+    return f"{instance.get('ip', '')}:{instance.get('port', '')}"
+
+
+class LoadBalancer:
+    """
+    负载均衡策略基类
+
+    子类实现 choose()；on_request_start / on_request_end 由 ServiceClient
+    在每次调用前后回调，供需要统计在途请求数或延迟的策略使用。
+    """
+    name = ''
+
+    def choose(self, service_name: str, instances: List[Instance]) -> Instance:
+        raise NotImplementedError
+
+    def on_request_start(self, service_name: str, instance: Instance):
+        pass
+
+    def on_request_end(self, service_name: str, instance: Instance, latency: float, success: bool):
+        pass
+
+
+class RandomBalancer(LoadBalancer):
+    """随机选择"""
+    name = 'random'
+
+    def choose(self, service_name, instances):
+        return random.choice(instances)
+
+
+class RoundRobinBalancer(LoadBalancer):
+    """按服务轮询"""
+    name = 'round_robin'
+
+    def __init__(self):
+        self._counters: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def choose(self, service_name, instances):
+        counter = self._counters.get(service_name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(service_name, itertools.count())
+        ordered = sorted(instances, key=instance_key)
+        return ordered[next(counter) % len(ordered)]
+
+
+class LeastOutstandingBalancer(LoadBalancer):
+    """选择在途请求最少的实例，相同时随机"""
+    name = 'least_outstanding'
+
+    def __init__(self):
+        self._outstanding: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def outstanding(self, instance: Instance) -> int:
+        return self._outstanding.get(instance_key(instance), 0)
+
+    def choose(self, service_name, instances):
+        least = min(self.outstanding(instance) for instance in instances)
+        return random.choice([i for i in instances if self.outstanding(i) == least])
+
+    def on_request_start(self, service_name, instance):
+        key = instance_key(instance)
+        with self._lock:
+            self._outstanding[key] = self._outstanding.get(key, 0) + 1
+
+    def on_request_end(self, service_name, instance, latency, success):
+        key = instance_key(instance)
+        with self._lock:
+            self._outstanding[key] = max(self._outstanding.get(key, 0) - 1, 0)
+
+
+class EwmaBalancer(LeastOutstandingBalancer):
+    """
+    按延迟指数加权移动平均（EWMA）选择实例
+
+    每个实例的得分为 EWMA延迟 * (在途请求数 + 1)，随机取两个实例比较，
+    选择得分较低者（power of two choices）。慢实例分到的流量会自动减少，
+    失败的请求按 failure_penalty 计入延迟；空闲实例的估计值随时间衰减，
+    恢复后会重新分到流量。
+
+    Args:
+        decay: EWMA 时间常数（秒），越小越偏向最近的延迟
+        failure_penalty: 失败请求计入的最小延迟（秒）
+    """
+    name = 'ewma'
+
+    def __init__(self, decay: float = 10.0, failure_penalty: float = 1.0):
+        super().__init__()
+        self.decay = decay
+        self.failure_penalty = failure_penalty
+        self._ewma: Dict[str, tuple] = {}  # key -> (延迟, 更新时间)
+
+    def latency(self, instance: Instance) -> float:
+        """当前延迟估计；长时间没有请求的实例估计值逐渐衰减，使其重新获得探测流量"""
+        entry = self._ewma.get(instance_key(instance))
+        if entry is None:
+            return 0.0
+        value, updated_at = entry
+        return value * math.exp(-(time.monotonic() - updated_at) / self.decay)
+
+    def score(self, instance: Instance) -> float:
+        return self.latency(instance) * (self.outstanding(instance) + 1)
+
+    def choose(self, service_name, instances):
+        if len(instances) == 1:
+            return instances[0]
+        first, second = random.sample(instances, 2)
+        return first if self.score(first) <= self.score(second) else second
+
+    def on_request_end(self, service_name, instance, latency, success):
+        super().on_request_end(service_name, instance, latency, success)
+        if not success:
+            latency = max(latency, self.failure_penalty)
+        key = instance_key(instance)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._ewma.get(key)
+            if entry is None:
+                self._ewma[key] = (latency, now)
+                return
+            previous, updated_at = entry
+            weight = math.exp(-(now - updated_at) / self.decay)
+            self._ewma[key] = (previous * weight + latency * (1 - weight), now)
+
+
+BALANCERS = {
+    RandomBalancer.name: RandomBalancer,
+    RoundRobinBalancer.name: RoundRobinBalancer,
+    LeastOutstandingBalancer.name: LeastOutstandingBalancer,
+    EwmaBalancer.name: EwmaBalancer,
+}
+
+
+class _ServiceEntry:
+    __slots__ = ('instances', 'fetched_at', 'last_error')
+
+    def __init__(self, instances: List[Instance]):
+        self.instances = instances
+        self.fetched_at = time.time()
+        self.last_error = None
+
+
+class ServiceRegistry:
+    """
+    服务实例本地缓存
+
+    Args:
+        fetcher: 拉取某个服务健康实例列表的函数，失败时抛出异常
+        refresh_interval: 后台刷新间隔（秒）
+        jitter: 刷新间隔随机抖动比例（0.2 表示 ±20%）
+        balancer: 负载均衡策略
+    """
+
+    def __init__(self, fetcher: Callable[[str], List[Instance]], refresh_interval: float = 10.0,
+                 jitter: float = 0.2, balancer: Optional[LoadBalancer] = None):
+        self.fetcher = fetcher
+        self.refresh_interval = refresh_interval
+        self.jitter = jitter
+        self.balancer = balancer or RandomBalancer()
+        self._services: Dict[str, _ServiceEntry] = {}
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_pid = None
+
+    @classmethod
+    def from_settings(cls, fetcher: Callable[[str], List[Instance]]) -> 'ServiceRegistry':
+        """根据 settings.SERVICE_REGISTRY 创建实例缓存"""
+        conf = getattr(settings, 'SERVICE_REGISTRY', {})
+        balancer_name = conf.get('LOAD_BALANCER', 'ewma')
+        if balancer_name not in BALANCERS:
+            raise ValueError(f"不支持的负载均衡策略: {balancer_name}")
+        balancer = BALANCERS[balancer_name]()
+        if isinstance(balancer, EwmaBalancer):
+            balancer.decay = conf.get('EWMA_DECAY', balancer.decay)
+        return cls(
+            fetcher,
+            refresh_interval=conf.get('REFRESH_INTERVAL', 10.0),
+            jitter=conf.get('REFRESH_JITTER', 0.2),
+            balancer=balancer,
+        )
+
+    def _fetch(self, service_name: str) -> List[Instance]:
+        return [host for host in self.fetcher(service_name) if host.get('healthy', True)]
+
+    def get_instances(self, service_name: str) -> List[Instance]:
+        """
+        获取服务的健康实例列表（优先使用缓存）
+
+        Args:
+            service_name: 服务名称
+
+        Returns:
+            健康实例列表，首次拉取失败时为空列表
+        """
+        self._ensure_refresher()
+        entry = self._services.get(service_name)
+        if entry is not None:
+            return entry.instances
+
+        try:
+            instances = self._fetch(service_name)
+        except Exception as e:
+            logger.warning("获取服务实例失败: %s %s", service_name, e)
+            return []
+        with self._lock:
+            self._services[service_name] = _ServiceEntry(instances)
+        return instances
+
+    def is_cached(self, service_name: str) -> bool:
+        """服务实例列表是否已在本地缓存中（选择实例时不会访问注册中心）"""
+        return service_name in self._services
+
+    def choose(self, service_name: str, exclude: Iterable[str] = ()) -> Optional[Instance]:
+        """
+        按负载均衡策略选择一个实例
+
+        Args:
+            service_name: 服务名称
+            exclude: 需要排除的实例（instance_key）
+
+        Returns:
+            实例信息字典或None
+        """
+        instances = self.get_instances(service_name)
+        excluded = set(exclude)
+        if excluded:
+            instances = [i for i in instances if instance_key(i) not in excluded]
+        if not instances:
+            return None
+        return self.balancer.choose(service_name, instances)
+
+    def refresh(self, service_name: str) -> bool:
+        """立即刷新某个服务，失败时保留旧数据并返回 False"""
+        try:
+            instances = self._fetch(service_name)
+        except Exception as e:
+            entry = self._services.get(service_name)
+            if entry is not None:
+                entry.last_error = str(e)
+            logger.warning("刷新服务实例失败，继续使用缓存: %s %s", service_name, e)
+            return False
+        with self._lock:
+            self._services[service_name] = _ServiceEntry(instances)
+        return True
+
+    def _ensure_refresher(self):
+        """确保当前进程的后台刷新线程在运行（fork 后的子进程需要重新启动）"""
+        pid = os.getpid()
+        if self._refresher_pid == pid and self._refresher is not None and self._refresher.is_alive():
+            return
+        with self._lock:
+            if self._refresher_pid == pid and self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name='service-registry', daemon=True)
+            self._refresher_pid = pid
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            delay = self.refresh_interval * (1 + random.uniform(-self.jitter, self.jitter))
+            time.sleep(max(delay, 0.1))
+            for service_name in list(self._services):
+                self.refresh(service_name)
+
+    def status(self) -> Dict[str, Any]:
+        """返回各服务缓存状态，便于排查"""
+        now = time.time()
+        return {
+            service_name: {
+                'instances': [instance_key(i) for i in entry.instances],
+                'age': round(now - entry.fetched_at, 3),
+                'last_error': entry.last_error,
+            }
+            for service_name, entry in list(self._services.items())
+        }
@@ -0,0 +1,278 @@
+"""
+被举报对象的举报计数（ComplaintTargetSummary）维护
+
+"某个对象有多少条待处理举报" 原本需要按 target_type / target_id / status 过滤 Complaint
+再 COUNT。这里在举报写入的同一事务中增量维护计数表：
+
+- 新建举报：按目标分组后累加 total_count / open_count，更新 last_reported_at
+- 批量更新 / 删除举报：先对受影响的举报加行锁并按目标统计，执行更新后按差值调整计数
+- 计数只做加减（UPDATE ... SET open_count = open_count + ?），并发写入同一目标不会互相覆盖
+
+rebuild_summary() 从 Complaint（及归档表）全量重建计数表，用于上线初始化和对账。
+计数包含已归档的投诉，归档不会改变计数。
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from . import models
+
+# 举报状态: 0-待处理, 1-已处理
+STATUS_OPEN = 0
+STATUS_HANDLED = 1
+
+
+class _Delta:
+    """一个目标的计数变化"""
+    __slots__ = ('total', 'open', 'last_reported_at')
+
+    def __init__(self):
+        self.total = 0
+        self.open = 0
+        self.last_reported_at = None
+
+    def add(self, total, open_count, reported_at=None):
+        self.total += total
+        self.open += open_count
+        if reported_at is not None and (self.last_reported_at is None or reported_at > self.last_reported_at):
+            self.last_reported_at = reported_at
+
+
+def _target_condition(keys):
+    """[(target_type, target_id), ...] -> (target_type=? AND target_id IN (...)) OR ..."""
+    ids_by_type = defaultdict(list)
+    for target_type, target_id in keys:
+        ids_by_type[target_type].append(target_id)
+    condition = Q()
+    for target_type, ids in ids_by_type.items():
+        condition |= Q(target_type=target_type, target_id__in=ids)
+    return condition
+
+
+def _increment(cases):
+    """每组计数变化量一个 WHEN，只有一组时直接加常量"""
+    if len(cases) == 1:
+        return Value(cases[0][1])
+    return Case(*[When(condition, then=Value(value)) for condition, value in cases],
+                default=Value(0), output_field=IntegerField())
+
+
+def _apply_deltas(deltas):
+    """
+    将 {(target_type, target_id): _Delta} 累加到计数表
+
+    先补齐不存在的目标行，再用一条 UPDATE 累加：按相同的计数变化量分组，每组一个 CASE 分支，
+    语句数与目标数、变化量的种类无关
+    """
+    deltas = {key: delta for key, delta in deltas.items()
+              if delta.total or delta.open or delta.last_reported_at is not None}
+    if not deltas:
+        return
+
+    models.ComplaintTargetSummary.objects.bulk_create(
+        [models.ComplaintTargetSummary(target_type=target_type, target_id=target_id)
+         for target_type, target_id in deltas],
+        ignore_conflicts=True,
+    )
+
+    groups = defaultdict(list)
+    for key, delta in deltas.items():
+        groups[(delta.total, delta.open)].append(key)
+    conditions = {change: _target_condition(keys) for change, keys in groups.items()}
+
+    fields = {
+        'total_count': F('total_count') + _increment([(conditions[change], change[0]) for change in groups]),
+        'open_count': F('open_count') + _increment([(conditions[change], change[1]) for change in groups]),
+    }
+    # 各目标的最近举报时间不同，用 CASE 合并到同一条 UPDATE（避免每个目标一条语句）
+    reported = [When(target_type=target_type, target_id=target_id, then=Value(delta.last_reported_at))
+                for (target_type, target_id), delta in deltas.items() if delta.last_reported_at is not None]
+    if reported:
+        reported_at = Case(*reported, default=F('last_reported_at'), output_field=DateTimeField())
+        fields['last_reported_at'] = Greatest(Coalesce('last_reported_at', reported_at), reported_at)
+    models.ComplaintTargetSummary.objects.filter(_target_condition(deltas)).update(**fields)
+
+
+def record_created(complaints):
+    """
+    新建举报后累加计数，需与举报写入在同一事务中调用
+    """
+    deltas = defaultdict(_Delta)
+    for complaint in complaints:
+        deltas[(complaint.target_type, complaint.target_id)].add(
+            1, int(complaint.status == STATUS_OPEN), complaint.created_at
+        )
+    _apply_deltas(deltas)
+
+
+def record_changed(before, after):
+    """
+    单条举报更新后调整计数（before 为更新前加锁读取的举报），需在同一事务中调用
+    """
+    old_key = (before.target_type, before.target_id)
+    new_key = (after.target_type, after.target_id)
+    was_open = int(before.status == STATUS_OPEN)
+    is_open = int(after.status == STATUS_OPEN)
+    deltas = defaultdict(_Delta)
+    if old_key == new_key:
+        deltas[new_key].add(0, is_open - was_open)
+    else:
+        deltas[old_key].add(-1, -was_open)
+        deltas[new_key].add(1, is_open, after.created_at)
+    _apply_deltas(deltas)
+
+
+def _locked_groups(queryset):
+    """对 queryset 中的举报加行锁，按 (目标, 状态) 统计条数与最近举报时间"""
+    groups = defaultdict(lambda: [0, None])
+    rows = queryset.select_for_update().order_by().values_list('target_type', 'target_id', 'status', 'created_at')
+    for target_type, target_id, complaint_status, created_at in rows.iterator(chunk_size=2000):
+        group = groups[(target_type, target_id, complaint_status)]
+        group[0] += 1
+        if group[1] is None or created_at > group[1]:
+            group[1] = created_at
+    return groups
+
+
+def update_complaints(queryset, updates):
+    """
+    批量更新举报并同步调整计数（状态变化、目标变化）
+
+    Args:
+        queryset: 需要更新的举报
+        updates: QuerySet.update() 的字段
+
+    Returns:
+        更新的行数
+    """
+    if not {'status', 'target_type', 'target_id'} & set(updates):
+        return queryset.update(**updates)
+
+    with transaction.atomic():
+        groups = _locked_groups(queryset)
+        updated = queryset.update(**updates)
+
+        deltas = defaultdict(_Delta)
+        for (target_type, target_id, complaint_status), (count, last_reported_at) in groups.items():
+            new_status = updates.get('status', complaint_status)
+            new_key = (updates.get('target_type', target_type), updates.get('target_id', target_id))
+            was_open = int(complaint_status == STATUS_OPEN)
+            is_open = int(new_status == STATUS_OPEN)
+            if new_key == (target_type, target_id):
+                deltas[new_key].add(0, count * (is_open - was_open))
+            else:
+                deltas[(target_type, target_id)].add(-count, -count * was_open)
+                deltas[new_key].add(count, count * is_open, last_reported_at)
+        _apply_deltas(deltas)
+    return updated
+
+
+def delete_complaints(queryset):
+    """
+    删除举报并扣减计数
+
+    Returns:
+        删除的举报条数
+    """
+    with transaction.atomic():
+        groups = _locked_groups(queryset)
+        deleted, _ = queryset.delete()
+
+        deltas = defaultdict(_Delta)
+        for (target_type, target_id, complaint_status), (count, _) in groups.items():
+            deltas[(target_type, target_id)].add(-count, -count * int(complaint_status == STATUS_OPEN))
+        _apply_deltas(deltas)
+    return deleted
+
+
+def lookup(targets):
+    """
+    批量查询计数
+
+    Args:
+        targets: [(target_type, target_id), ...]
+
+    Returns:
+        与 targets 顺序一致的计数列表，没有举报记录的目标计数为 0
+    """
+    ids_by_type = defaultdict(set)
+    for target_type, target_id in targets:
+        ids_by_type[target_type].add(target_id)
+    condition = Q()
+    for target_type, ids in ids_by_type.items():
+        condition |= Q(target_type=target_type, target_id__in=ids)
+
+    found = {}
+    if ids_by_type:
+        for summary in models.ComplaintTargetSummary.objects.filter(condition):
+            found[(summary.target_type, summary.target_id)] = summary
+
+    result = []
+    for target_type, target_id in targets:
+        summary = found.get((target_type, target_id))
+        result.append({
+            'target_type': target_type,
+            'target_id': target_id,
+            'open_count': summary.open_count if summary else 0,
+            'total_count': summary.total_count if summary else 0,
+            'last_reported_at': summary.last_reported_at if summary else None,
+        })
+    return result
+
+
+def rebuild_summary(batch_size=1000):
+    """
+    从 Complaint 与 ComplaintArchive 全量重建计数表（在一个事务中替换全部数据）
+
+    归档表只包含已处理的投诉，只计入 total_count 与 last_reported_at
+
+    Returns:
+        重建后的目标数
+    """
+    aggregates = (
+        models.Complaint.objects.order_by()
+        .values('target_type', 'target_id')
+        .annotate(
+            total=Count('pk'),
+            open=Count(Case(When(status=STATUS_OPEN, then=1))),
+            last=Max('created_at'),
+        )
+    )
+    archived = {
+        (row['target_type'], row['target_id']): (row['total'], row['last'])
+        for row in models.ComplaintArchive.objects.order_by()
+        .values('target_type', 'target_id')
+        .annotate(total=Count('pk'), last=Max('created_at'))
+        .iterator(chunk_size=batch_size)
+    }
+
+    def rows():
+        for row in aggregates.iterator(chunk_size=batch_size):
+            archived_total, archived_last = archived.pop((row['target_type'], row['target_id']), (0, None))
+            last = row['last'] if archived_last is None else max(row['last'], archived_last)
+            yield row['target_type'], row['target_id'], row['open'], row['total'] + archived_total, last
+        for (target_type, target_id), (total, last) in archived.items():
+            yield target_type, target_id, 0, total, last
+
+    written = 0
+    with transaction.atomic():
+        models.ComplaintTargetSummary.objects.all().delete()
+        batch = []
+        for target_type, target_id, open_count, total_count, last_reported_at in rows():
+            batch.append(models.ComplaintTargetSummary(
+                target_type=target_type,
+                target_id=target_id,
+                open_count=open_count,
+                total_count=total_count,
+                last_reported_at=last_reported_at,
+            ))
+            if len(batch) >= batch_size:
+                models.ComplaintTargetSummary.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            models.ComplaintTargetSummary.objects.bulk_create(batch)
+            written += len(batch)
+    return written
@@ -0,0 +1,52 @@
+"""
+测试用的下游服务替身：复用 benchmarks/stubs.py 的 DownstreamStub，服务发现使用 static 后端指向替身
+"""
+import os
+import sys
+import threading
+
+from complaint import resilience, service_client
+from complaint.service_registry import instance_key
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+BENCH_DIR = os.path.join(REPO_DIR, 'benchmarks')
+if BENCH_DIR not in sys.path:
+    sys.path.append(BENCH_DIR)
+
+from stubs import DownstreamStub  # noqa: E402
+
+DOWNSTREAM_SERVICES = ('UserService', 'ProductService')
+
+
+def start_downstream(**options) -> DownstreamStub:
+    """在后台线程中启动一个下游替身，端口自动分配"""
+    options.setdefault('latency_ms', 0.0)
+    options.setdefault('jitter_ms', 0.0)
+    server = DownstreamStub(('127.0.0.1', 0), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_downstream(*servers):
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def stub_key(server: DownstreamStub) -> str:
+    """替身对应的实例标识（与 service_registry.instance_key 一致）"""
+    host, port = server.server_address[:2]
+    return instance_key({'ip': host, 'port': port})
+
+
+def discovery_settings(*servers):
+    """static 发现后端：UserService / ProductService 都指向这些替身"""
+    urls = ['http://{}:{}'.format(*server.server_address[:2]) for server in servers]
+    return {'BACKEND': 'static', 'SERVICES': {name: urls for name in DOWNSTREAM_SERVICES}}
+
+
+def reset_service_client():
+    """丢弃进程内共享的实例缓存、熔断 / 重试状态和连接池，下次调用时按当前 settings 重新创建"""
+    service_client._registry = None
+    resilience._resilience = None
+    service_client.HttpClientPool.close_all()
@@ -0,0 +1,68 @@
+"""
+批量提交举报：数据库不返回批量 INSERT 的自增ID（MySQL）时，结果、去重缓存和幂等重放仍带有主键
+"""
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from complaint import idempotency, models
+
+
+class BulkCreatePrimaryKeyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # 模拟 MySQL：bulk_create 之后对象没有主键
+        patcher = mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert',
+                                    new_callable=mock.PropertyMock, return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.complainer_id = str(uuid.uuid4())
+        self.client = APIClient(headers={'UUID': self.complainer_id})
+        self.items = [{'target_type': n % 2, 'target_id': str(uuid.uuid4()), 'reason': f'reason {n}'}
+                      for n in range(4)]
+
+    def post(self, data, **headers):
+        return self.client.post('/api/complaints/create/', data, format='json', headers=headers)
+
+    def assert_results_match_rows(self, response):
+        for result, item in zip(response.data['data']['results'], self.items):
+            complaint = models.Complaint.objects.get(pk=result['data']['complaint_id'])
+            self.assertEqual(str(complaint.target_id), item['target_id'])
+            self.assertEqual(complaint.reason, item['reason'])
+
+    def test_results_and_dedupe_cache_have_primary_keys(self):
+        response = self.post(self.items)
+        self.assertEqual(response.status_code, 201)
+        self.assert_results_match_rows(response)
+
+        # 去重窗口内再次提交：来自去重缓存的结果同样带主键
+        again = self.post(self.items)
+        self.assertEqual(again.data['data']['duplicates'], len(self.items))
+        self.assertEqual(
+            [result['data']['complaint_id'] for result in again.data['data']['results']],
+            [result['data']['complaint_id'] for result in response.data['data']['results']],
+        )
+
+    @override_settings(COMPLAINT_IDEMPOTENCY={'TTL': 60, 'LOCK_TTL': 30, 'DEDUPE_WINDOW': 0})
+    def test_without_dedupe_key(self):
+        self.items.append(dict(self.items[0]))
+        response = self.post(self.items, **{'Idempotency-Key': 'bulk-1'})
+        self.assertEqual(response.status_code, 201)
+        self.assert_results_match_rows(response)
+        ids = [result['data']['complaint_id'] for result in response.data['data']['results']]
+        self.assertEqual(len(set(ids)), len(self.items))
+
+        replay = self.post(self.items, **{'Idempotency-Key': 'bulk-1'})
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual([result['data']['complaint_id'] for result in replay.data['data']['results']], ids)
+
+    def test_dedupe_cache_skips_data_without_primary_key(self):
+        idempotency.remember_complaint('key-without-pk', {'complaint_id': None, 'reason': 'x'})
+        self.assertIsNone(idempotency.get_recent_duplicate('key-without-pk'))
+        idempotency.remember_complaint('key-with-pk', {'complaint_id': 1, 'reason': 'x'})
+        self.assertEqual(idempotency.get_recent_duplicate('key-with-pk')['complaint_id'], 1)
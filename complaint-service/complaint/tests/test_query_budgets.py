@@ -0,0 +1,171 @@
+"""
+config/urls.py 路由中每个接口的查询 / 跨服务调用预算（query_budget / service_call_budget）
+
+下游 UserService / ProductService 为本地 DownstreamStub（static 发现后端），管理员权限校验、
+详情列表的信息补全都会真实发出跨服务调用并计入预算。
+"""
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from complaint import metrics, models, privilege_cache, summary, views
+from complaint.query_budget import assert_within_budget, capture_statements
+from complaint.tests.downstream import discovery_settings, reset_service_client, start_downstream, stop_downstream
+from complaint.transaction_log import TransactionLogWriter
+
+ADMIN_ID = str(uuid.uuid4())
+
+
+class EndpointQueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.downstream = start_downstream(privilege=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_downstream(cls.downstream)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.targets = [(target_type, uuid.uuid4()) for target_type in (0, 1, 0)]
+        complaints = [
+            models.Complaint(complainer_id=uuid.uuid4(), target_type=target_type, target_id=target_id,
+                             reason=f'reason {n}')
+            for n in range(3) for target_type, target_id in cls.targets
+        ]
+        models.Complaint.objects.bulk_create(complaints)
+        summary.record_created(complaints)
+        cls.complaint = models.Complaint.objects.first()
+        cls.review = models.ComplaintReview.objects.bulk_create([
+            models.ComplaintReview(target_type=target_type, target_id=target_id, reviewer_id=uuid.uuid4(),
+                                   result='ok', ban_type='none')
+            for target_type, target_id in cls.targets
+        ])[0]
+        cls.transaction = models.Transaction.objects.bulk_create([
+            models.Transaction(order_id=n, event='paid') for n in range(5)
+        ])[0]
+
+    def setUp(self):
+        override = self.settings(SERVICE_DISCOVERY=discovery_settings(self.downstream))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(reset_service_client)
+        reset_service_client()
+        privilege_cache._privilege_cache = None
+        cache.clear()
+
+        # 缓冲写入的事件不落库（写入线程与测试事务互不可见）
+        writer = TransactionLogWriter(flush_interval=0.01)
+        writer._write = lambda batch: None
+        self.addCleanup(writer.close)
+        patcher = mock.patch('complaint.views.get_transaction_writer', return_value=writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient(headers={'UUID': ADMIN_ID})
+
+    def request(self, method, path, data=None, expected=200):
+        with capture_statements():
+            response = getattr(self.client, method)(path, data, format='json')
+        self.assertEqual(response.status_code, expected, getattr(response, 'data', None))
+        # 流式响应的查询在输出内容时执行，读完后才有预算检查结果
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return assert_within_budget(response)
+
+    def target(self, index=0):
+        target_type, target_id = self.targets[index]
+        return {'target_type': target_type, 'target_id': str(target_id)}
+
+    def test_complaint_endpoints(self):
+        complaint_id = self.complaint.complaint_id
+        target = self.target()
+        cases = [
+            ('get', '/api/complaints/', None, 200),
+            ('get', f'/api/complaints/?target_id={target["target_id"]}&status=0', None, 200),
+            ('get', f'/api/complaints/{complaint_id}/', None, 200),
+            ('get', '/api/complaints/detail/', None, 200),
+            ('get', '/api/complaints/export/ndjson/', None, 200),
+            ('get', '/api/complaints/export/csv/', None, 200),
+            ('post', '/api/complaints/', dict(target, complainer_id=str(uuid.uuid4()), reason='admin'), 200),
+            ('patch', f'/api/complaints/{complaint_id}/', {'reason': 'updated'}, 200),
+            ('put', f'/api/complaints/{complaint_id}/',
+             dict(target, complainer_id=str(self.complaint.complainer_id), reason='replaced', status=1), 200),
+            ('patch', f'/api/complaints/branch/{target["target_type"]}/{target["target_id"]}/', {'status': 1}, 202),
+            ('patch', '/api/complaints/branch/', {'targets': [self.target(1), self.target(2)], 'data': {'status': 1}},
+             202),
+            ('delete', f'/api/complaints/{complaint_id}/', None, 204),
+        ]
+        for method, path, data, expected in cases:
+            with self.subTest(method=method, path=path):
+                self.request(method, path, data, expected)
+
+    def test_complaint_create_endpoints(self):
+        items = [dict(self.target(index), reason=f'bulk {index}') for index in range(3)]
+        cases = [
+            ('get', '/api/complaints/create/', None, 200),
+            ('get', f'/api/complaints/create/{self.complaint.complaint_id}/', None, 200),
+            ('post', '/api/complaints/create/', dict(self.target(), reason='single'), 201),
+            # 去重窗口内再次提交同一目标
+            ('post', '/api/complaints/create/', dict(self.target(), reason='single'), 200),
+            ('post', '/api/complaints/create/', items, 201),
+            ('post', '/api/complaints/create/', items + [{'target_type': 0}], 207),
+            ('post', '/api/complaints/summary/', {'targets': [self.target(index) for index in range(3)]}, 200),
+        ]
+        for method, path, data, expected in cases:
+            with self.subTest(method=method, path=path):
+                self.request(method, path, data, expected)
+
+    def test_review_endpoints(self):
+        review_id = self.review.review_id
+        review = dict(self.target(), result='banned', ban_type='temporary', ban_time=7)
+        cases = [
+            ('get', '/api/reviews/', None, 200),
+            ('get', f'/api/reviews/{review_id}/', None, 200),
+            ('get', '/api/reviews/detail/', None, 200),
+            ('get', '/api/reviews/export/ndjson/', None, 200),
+            ('post', '/api/reviews/', review, 201),
+            ('post', '/api/reviews/', dict(review, target_id=str(self.targets[1][1]), target_type=1,
+                                           resolve_complaints=True), 201),
+            ('patch', f'/api/reviews/{review_id}/', {'result': 'warned'}, 200),
+            ('delete', f'/api/reviews/{review_id}/', None, 204),
+        ]
+        for method, path, data, expected in cases:
+            with self.subTest(method=method, path=path):
+                self.request(method, path, data, expected)
+
+    def test_transaction_endpoints(self):
+        log_id = self.transaction.log_id
+        cases = [
+            ('get', '/api/transactions/', None, 200),
+            ('get', f'/api/transactions/{log_id}/', None, 200),
+            ('get', '/api/transactions/export/csv/', None, 200),
+            ('get', '/api/transactions/writer-stats/', None, 200),
+            ('post', '/api/transactions/', {'order_id': 1, 'event': 'paid'}, 202),
+            ('post', '/api/transactions/', [{'order_id': n, 'event': 'shipped'} for n in range(10)], 202),
+            ('patch', f'/api/transactions/{log_id}/', {'event': 'refunded'}, 200),
+            ('delete', f'/api/transactions/{log_id}/', None, 204),
+        ]
+        for method, path, data, expected in cases:
+            with self.subTest(method=method, path=path):
+                self.request(method, path, data, expected)
+
+    def test_export_queries_checked_per_chunk(self):
+        path = '/api/complaints/export/ndjson/'
+        with self.settings(EXPORT={'CHUNK_SIZE': 2}):
+            report = self.request('get', path)
+            # 9 行分 5 块，每块一次查询；总数计入请求的查询指标
+            self.assertEqual(report.queries, 1)
+            observed = metrics.REGISTRY.get_sample_value('complaint_db_queries_per_request_sum', {'view': report.view})
+            self.assertGreaterEqual(observed, 5)
+
+            budget = dict(views.ComplaintView.query_budget, export=0)
+            with mock.patch.object(views.ComplaintView, 'query_budget', budget):
+                with self.assertRaisesMessage(AssertionError, '超出查询预算'):
+                    self.request('get', path)
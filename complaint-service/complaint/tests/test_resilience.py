@@ -0,0 +1,138 @@
+"""
+ServiceClient 的熔断、重试、重试预算与对冲请求，下游为本地 DownstreamStub
+"""
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from complaint.resilience import CircuitBreaker, get_resilience
+from complaint.service_client import ServiceClient
+from complaint.tests.downstream import (
+    discovery_settings, reset_service_client, start_downstream, stop_downstream, stub_key,
+)
+
+ENDPOINT = '/api/v1/user/00000000-0000-0000-0000-000000000001/'
+
+
+class ServiceResilienceTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # 轮询按 instance_key 排序，每个服务的第一次调用总是落在 first 上
+        cls.first, cls.second = sorted([start_downstream(), start_downstream()], key=stub_key)
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_downstream(cls.first, cls.second)
+        super().tearDownClass()
+
+    def setUp(self):
+        for server in (self.first, self.second):
+            server.requests = 0
+            server.error_rate = 0.0
+            server.latency_ms = 0.0
+
+    def configure(self, servers=None, **resilience):
+        """按给定的容错参数和实例重新创建 ServiceClient 的共享状态"""
+        conf = dict(
+            settings.SERVICE_RESILIENCE,
+            SERVICE_BREAKER_FAILURE_THRESHOLD=100,
+            INSTANCE_BREAKER_FAILURE_THRESHOLD=100,
+            HEDGE_ENABLED=False,
+        )
+        conf.update(resilience)
+        override = self.settings(
+            SERVICE_DISCOVERY=discovery_settings(*(servers or (self.first, self.second))),
+            SERVICE_REGISTRY=dict(settings.SERVICE_REGISTRY, LOAD_BALANCER='round_robin'),
+            SERVICE_RESILIENCE=conf,
+        )
+        override.enable()
+        self.addCleanup(reset_service_client)
+        self.addCleanup(override.disable)
+        reset_service_client()
+        return get_resilience()
+
+    def test_breaker_opens_and_recovers_through_half_open(self):
+        resilience = self.configure(servers=[self.first], SERVICE_BREAKER_FAILURE_THRESHOLD=2,
+                                    SERVICE_BREAKER_RECOVERY_TIMEOUT=0.2, MAX_RETRIES=0)
+        breaker = resilience.service_breaker('UserService')
+        self.first.error_rate = 1.0
+
+        for _ in range(2):
+            self.assertFalse(ServiceClient.get('UserService', ENDPOINT)['success'])
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # 打开期间直接拒绝，不访问下游
+        result = ServiceClient.get('UserService', ENDPOINT)
+        self.assertIn('服务熔断中', result['error'])
+        self.assertEqual(self.first.requests, 2)
+
+        # 恢复时间过后放行一个探测请求，成功后关闭
+        self.first.error_rate = 0.0
+        time.sleep(0.25)
+        self.assertTrue(breaker.available())
+        self.assertTrue(ServiceClient.get('UserService', ENDPOINT)['success'])
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.first.requests, 3)
+
+    def test_half_open_probe_failure_reopens(self):
+        resilience = self.configure(servers=[self.first], SERVICE_BREAKER_FAILURE_THRESHOLD=1,
+                                    SERVICE_BREAKER_RECOVERY_TIMEOUT=0.2, MAX_RETRIES=0)
+        breaker = resilience.service_breaker('UserService')
+        self.first.error_rate = 1.0
+
+        ServiceClient.get('UserService', ENDPOINT)
+        time.sleep(0.25)
+        self.assertFalse(ServiceClient.get('UserService', ENDPOINT)['success'])
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.trips, 2)
+        self.assertEqual(self.first.requests, 2)
+
+    def test_retry_goes_to_another_instance(self):
+        self.configure(MAX_RETRIES=1)
+        self.first.error_rate = 1.0
+
+        result = ServiceClient.get('UserService', ENDPOINT)
+        self.assertTrue(result['success'])
+        self.assertEqual(self.first.requests, 1)
+        self.assertEqual(self.second.requests, 1)
+
+    def test_non_idempotent_method_is_not_retried(self):
+        self.configure(MAX_RETRIES=1)
+        self.first.error_rate = 1.0
+
+        result = ServiceClient.post('UserService', '/api/v1/user/batch/', json={'ids': []})
+        self.assertFalse(result['success'])
+        self.assertEqual(self.first.requests + self.second.requests, 1)
+
+    def test_retry_rejected_when_budget_exhausted(self):
+        resilience = self.configure(MAX_RETRIES=1, RETRY_BUDGET_RATIO=0, RETRY_BUDGET_MIN_PER_SECOND=0)
+        budget = resilience.retry_budget('UserService')
+        self.first.error_rate = self.second.error_rate = 1.0
+
+        calls = int(budget.max_tokens) + 2
+        for _ in range(calls):
+            self.assertFalse(ServiceClient.get('UserService', ENDPOINT)['success'])
+
+        # 预算内的调用各重试一次，预算耗尽后的调用只请求一次
+        self.assertEqual(self.first.requests + self.second.requests, calls + int(budget.max_tokens))
+        self.assertEqual(budget.exhausted, 2)
+
+    def test_hedged_request_returns_faster_instance(self):
+        resilience = self.configure(MAX_RETRIES=0, HEDGE_ENABLED=True, HEDGE_MIN_SAMPLES=1, HEDGE_PERCENTILE=50)
+        resilience.latency('UserService').record(0.05)
+        self.first.latency_ms = 500.0
+
+        started = time.monotonic()
+        result = ServiceClient.get('UserService', ENDPOINT)
+        elapsed = time.monotonic() - started
+
+        self.assertTrue(result['success'])
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(resilience.hedges, 1)
+        self.assertEqual(self.first.requests, 1)
+        self.assertEqual(self.second.requests, 1)
+        # 等较慢的主请求结束，它的结果不应记到后续测试的容错状态里
+        time.sleep(0.5)
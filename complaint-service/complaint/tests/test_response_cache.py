@@ -0,0 +1,74 @@
+"""
+条件请求与响应缓存：If-Modified-Since 的秒级比较、进程内缓存的 TTL 分段、后台写入更新代
+"""
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.http import http_date
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from complaint import models, response_cache
+from complaint.transaction_log import TransactionLogWriter
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.now = 2000.0
+        patcher = mock.patch('complaint.response_cache.time')
+        self.clock = patcher.start()
+        self.clock.time.side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+
+    def get(self, **headers):
+        request = Request(self.factory.get('/api/transactions/', **headers))
+        return response_cache.cached_response(request, lambda: Response({'results': []}),
+                                              [models.Transaction])
+
+    def set_generation(self, value):
+        cache.set(response_cache._generation_key(models.Transaction), value, None)
+
+    @mock.patch('complaint.response_cache._process_local_cache', return_value=False)
+    def test_if_modified_since_rounds_generation_up(self, _):
+        self.set_generation(1000.3)
+        response = self.get()
+        self.assertEqual(response['Last-Modified'], http_date(1001))
+
+        # 同一秒内、客户端副本之后的写入：不能按截断后的秒数判为未修改
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=http_date(1000)).status_code, 200)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=http_date(1001)).status_code, 304)
+
+    @mock.patch('complaint.response_cache._process_local_cache', return_value=False)
+    def test_last_modified_omitted_until_second_elapsed(self, _):
+        self.set_generation(self.now + 0.3)
+        self.now += 0.5
+        self.assertNotIn('Last-Modified', self.get())
+
+    @mock.patch('complaint.response_cache._process_local_cache', return_value=True)
+    def test_process_local_cache_etag_expires_with_ttl(self, _):
+        self.set_generation(1000.0)
+        etag = self.get()['ETag']
+
+        self.now += 4.9
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # 其他 worker 的写入看不到，ETag 最多沿用一个 TTL 分段
+        self.now += 0.1
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_transaction_writer_bumps_generation(self):
+        self.set_generation(1000.0)
+        writer = TransactionLogWriter(flush_interval=0.01)
+        self.addCleanup(writer.close)
+
+        writer._write([(1, 'paid', time.monotonic())])
+        self.assertEqual(models.Transaction.objects.filter(order_id=1, event='paid').count(), 1)
+        self.assertEqual(response_cache.generations([models.Transaction]), [self.now])
@@ -0,0 +1,101 @@
+"""
+TransactionLogWriter 的背压：缓冲放不下整批时整批拒绝，重试后不产生重复事件
+"""
+import threading
+from collections import Counter
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from complaint.transaction_log import TransactionLogFull, TransactionLogWriter
+
+
+class StalledWriter:
+    """
+    写入线程停在第一批事件上（不访问数据库），直到 release()；写入的事件记在 written 中
+    """
+
+    def __init__(self, max_pending=4):
+        self.writer = TransactionLogWriter(max_batch=100, flush_interval=0.01, max_pending=max_pending,
+                                           put_timeout=0.05)
+        self.written = []
+        self.stalled = threading.Event()
+        self.gate = threading.Event()
+        self.writer._write = self._write
+
+    def _write(self, batch):
+        self.stalled.set()
+        self.gate.wait(5)
+        self.written.extend((order_id, event) for order_id, event, _ in batch)
+
+    def fill(self, free=0):
+        """让写入线程卡住，再把缓冲填到只剩 free 个空位"""
+        self.writer.submit(0, 'stall')
+        assert self.stalled.wait(5)
+        self.writer.submit_many([(n, 'filler') for n in range(1, self.writer.max_pending - free + 1)])
+
+    def release(self):
+        self.gate.set()
+        assert self.writer.flush(5)
+
+    def close(self):
+        self.gate.set()
+        self.writer.close(5)
+
+
+class TransactionLogBackpressureTests(TestCase):
+
+    def setUp(self):
+        self.stub = StalledWriter()
+        self.addCleanup(self.stub.close)
+        self.batch = [(100 + n, 'paid') for n in range(3)]
+
+    def assert_written_once(self, events):
+        counts = Counter(self.stub.written)
+        for event in events:
+            self.assertEqual(counts[event], 1, event)
+
+    def test_full_buffer_rejects_whole_batch(self):
+        writer = self.stub.writer
+        self.stub.fill()
+
+        with self.assertRaises(TransactionLogFull):
+            writer.submit_many(self.batch)
+        self.assertEqual(writer.stats()['pending'], writer.max_pending)
+        self.assertEqual(writer.stats()['rejected'], 1)
+
+        self.stub.release()
+        writer.submit_many(self.batch)
+        self.assertTrue(writer.flush(5))
+        self.assert_written_once(self.batch)
+        self.assertEqual(writer.stats()['submitted'], 1 + writer.max_pending + len(self.batch))
+
+    def test_partially_free_buffer_rejects_whole_batch(self):
+        writer = self.stub.writer
+        self.stub.fill(free=2)
+
+        with self.assertRaises(TransactionLogFull):
+            writer.submit_many(self.batch)
+        self.assertEqual(writer.stats()['pending'], writer.max_pending - 2)
+
+        self.stub.release()
+        writer.submit_many(self.batch)
+        self.assertTrue(writer.flush(5))
+        self.assert_written_once(self.batch)
+
+    def test_api_retry_after_503_does_not_duplicate(self):
+        client = APIClient()
+        body = [{'order_id': order_id, 'event': event} for order_id, event in self.batch]
+        with mock.patch('complaint.views.get_transaction_writer', return_value=self.stub.writer):
+            self.stub.fill(free=2)
+            response = client.post('/api/transactions/', body, format='json')
+            self.assertEqual(response.status_code, 503)
+
+            self.stub.release()
+            response = client.post('/api/transactions/', body, format='json')
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.data['data']['accepted'], len(body))
+
+        self.assertTrue(self.stub.writer.flush(5))
+        self.assert_written_once(self.batch)
@@ -0,0 +1,298 @@
+"""
+Transaction 事件日志的缓冲批量写入
+
+Transaction 是只追加的事件日志，逐条 INSERT + COMMIT 在订单事件量大时代价很高。
+TransactionLogWriter 在进程内缓冲事件，由后台线程批量写入：
+
+- 缓冲达到 MAX_BATCH 条或距第一条事件超过 FLUSH_INTERVAL 秒时，一次 bulk_create 写入
+- 缓冲队列有上限（MAX_PENDING）。数据库跟不上时 submit() 最多阻塞 PUT_TIMEOUT 秒，
+  仍然写不进去则抛出 TransactionLogFull，由调用方决定重试或返回 503（背压）
+- submit_many() 整批提交：队列放不下整批时一条都不放入，调用方整批重试不会产生重复事件
+- 写入失败时保留本批数据并退避重试，不丢事件
+- 进程退出时（atexit）写完缓冲中的事件；fork 出的子进程重新启动自己的写入线程
+- stats() 返回吞吐量、批次数、刷新耗时、事件从提交到落库的延迟等
+
+用法：
+    from complaint.transaction_log import log_transaction
+    log_transaction(order_id, 'paid')
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+from . import models, response_cache
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionLogFull(Exception):
+    """缓冲队列已满（数据库写入跟不上）"""
+
+
+class _EventQueue(queue.Queue):
+    """支持整批放入的队列"""
+
+    def put_many(self, items, timeout: float):
+        """
+        剩余空间能放下整批时一次放入，最多等待 timeout 秒；否则一条都不放入，抛出 queue.Full
+        """
+        with self.not_full:
+            if self.maxsize > 0:
+                if len(items) > self.maxsize:
+                    raise queue.Full
+                deadline = time.monotonic() + timeout
+                while self.maxsize - self._qsize() < len(items):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Full
+                    self.not_full.wait(remaining)
+            for item in items:
+                self._put(item)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify(len(items))
+
+
+class _FlushRequest:
+    """flush() 请求：写入线程处理完之前的事件后通知调用方"""
+    __slots__ = ('done',)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class TransactionLogWriter:
+    """
+    Transaction 事件的缓冲批量写入器
+
+    Args:
+        max_batch: 每次 bulk_create 的最大条数
+        flush_interval: 事件在缓冲中的最长停留时间（秒）
+        max_pending: 缓冲队列上限
+        put_timeout: 队列满时 submit() 的最长等待时间（秒）
+        retry_backoff: 写入失败后的初始退避时间（秒），之后指数增长，最长 5 秒
+    """
+
+    def __init__(self, max_batch: int = 500, flush_interval: float = 0.2, max_pending: int = 10000,
+                 put_timeout: float = 1.0, retry_backoff: float = 0.1):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.retry_backoff = retry_backoff
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._closing = False
+        self._started_at = time.monotonic()
+        self._stats = {
+            'submitted': 0,
+            'written': 0,
+            'batches': 0,
+            'rejected': 0,
+            'flush_errors': 0,
+            'flush_seconds_total': 0.0,
+            'flush_seconds_max': 0.0,
+            'event_latency_total': 0.0,
+            'event_latency_max': 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls) -> 'TransactionLogWriter':
+        conf = getattr(settings, 'TRANSACTION_LOG', {})
+        return cls(
+            max_batch=conf.get('MAX_BATCH', 500),
+            flush_interval=conf.get('FLUSH_INTERVAL', 0.2),
+            max_pending=conf.get('MAX_PENDING', 10000),
+            put_timeout=conf.get('PUT_TIMEOUT', 1.0),
+        )
+
+    # ---- 写入线程 ----
+
+    def _ensure_worker(self):
+        """确保当前进程的写入线程在运行（fork 后的子进程需要重新启动）"""
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # 父进程缓冲中的事件由父进程负责写入
+                self._queue = _EventQueue(maxsize=self.max_pending)
+                self._pid = pid
+                self._closing = False
+            self._thread = threading.Thread(target=self._run, name='transaction-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        events_queue = self._queue
+        while True:
+            item = events_queue.get()
+            if item is None:
+                return
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+                continue
+
+            batch = [item]
+            flush_requests = []
+            stop = False
+            deadline = item[2] + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = events_queue.get(timeout=remaining) if remaining > 0 else events_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, _FlushRequest):
+                    flush_requests.append(item)
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for request in flush_requests:
+                request.done.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        """写入一批事件，失败时退避重试直到成功（进程退出时只再尝试一次）"""
+        backoff = self.retry_backoff
+        while True:
+            started = time.monotonic()
+            try:
+                connection.close_if_unusable_or_obsolete()
+                models.Transaction.objects.bulk_create(
+                    [models.Transaction(order_id=order_id, event=event) for order_id, event, _ in batch]
+                )
+            except Exception as e:
+                with self._lock:
+                    self._stats['flush_errors'] += 1
+                logger.warning("Transaction 日志批量写入失败（%s 条），%.1f 秒后重试: %s", len(batch), backoff, e)
+                connection.close()
+                if self._closing:
+                    logger.error("进程退出，放弃写入 %s 条 Transaction 日志", len(batch))
+                    return
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+
+            finished = time.monotonic()
+            elapsed = finished - started
+            # 已经写入，缓存不可用时不重试（否则重复写入），只记录
+            try:
+                response_cache.bump(models.Transaction)
+            except Exception as e:
+                logger.warning("Transaction 日志写入后更新缓存代失败: %s", e)
+            with self._lock:
+                stats = self._stats
+                stats['written'] += len(batch)
+                stats['batches'] += 1
+                stats['flush_seconds_total'] += elapsed
+                stats['flush_seconds_max'] = max(stats['flush_seconds_max'], elapsed)
+                for _, _, submitted_at in batch:
+                    latency = finished - submitted_at
+                    stats['event_latency_total'] += latency
+                    if latency > stats['event_latency_max']:
+                        stats['event_latency_max'] = latency
+            return
+
+    # ---- 对外接口 ----
+
+    def submit(self, order_id: int, event: str, timeout: Optional[float] = None):
+        """
+        提交一条事件，缓冲队列满时最多等待 timeout 秒（默认 put_timeout），仍满则抛出 TransactionLogFull
+        """
+        self.submit_many([(order_id, event)], timeout=timeout)
+
+    def submit_many(self, events: Iterable[Tuple[int, str]], timeout: Optional[float] = None):
+        """
+        提交多条事件：整批放入缓冲或整批拒绝（抛出 TransactionLogFull 时没有任何事件被放入）
+        """
+        self._ensure_worker()
+        timeout = self.put_timeout if timeout is None else timeout
+        now = time.monotonic()
+        items = [(order_id, event, now) for order_id, event in events]
+        if not items:
+            return
+        try:
+            self._queue.put_many(items, timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise TransactionLogFull(f"Transaction 日志缓冲已满（{self.max_pending} 条）")
+        with self._lock:
+            self._stats['submitted'] += len(items)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前提交的事件全部写入，返回是否在 timeout 内完成"""
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        self._ensure_worker()
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """写完缓冲中的事件并停止写入线程"""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        self._closing = True
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("关闭 Transaction 日志写入线程超时，仍有 %s 条未写入", self._queue.qsize())
+
+    def stats(self) -> Dict[str, Any]:
+        """吞吐量与延迟统计"""
+        with self._lock:
+            data = dict(self._stats)
+        uptime = time.monotonic() - self._started_at
+        batches, written = data['batches'], data['written']
+        return {
+            'submitted': data['submitted'],
+            'written': written,
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'rejected': data['rejected'],
+            'batches': batches,
+            'flush_errors': data['flush_errors'],
+            'avg_batch_size': round(written / batches, 1) if batches else 0,
+            'rows_per_second': round(written / uptime, 1) if uptime else 0,
+            'flush_ms_avg': round(data['flush_seconds_total'] / batches * 1000, 2) if batches else 0,
+            'flush_ms_max': round(data['flush_seconds_max'] * 1000, 2),
+            'event_latency_ms_avg': round(data['event_latency_total'] / written * 1000, 2) if written else 0,
+            'event_latency_ms_max': round(data['event_latency_max'] * 1000, 2),
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_transaction_writer() -> TransactionLogWriter:
+    """获取进程内共享的 Transaction 日志写入器"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = TransactionLogWriter.from_settings()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def log_transaction(order_id: int, event: str):
+    """记录一条 Transaction 事件（异步批量写入）"""
+    get_transaction_writer().submit(order_id, event)
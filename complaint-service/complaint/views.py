@@ -1,29 +1,86 @@
+import uuid
+
 import django_filters
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 from django.views.generic import CreateView
 from rest_framework.decorators import api_view, action
 from rest_framework import generics, mixins, viewsets, filters, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from . import models
 from . import serializers
+from . import db_router
+from . import idempotency
+from . import jobs
+from . import metrics
+from . import response_cache
+from . import summary
 from rest_framework.views import APIView
+from .archive import ArchiveQueryMixin
+from .enrichment import ReferenceResolver, References
+from .export import ExportMixin
+from .pagination import KeysetSwitchMixin
 from .permissions import IsAdminUser
 from .service_client import ServiceClient
+from .transaction_log import TransactionLogFull, get_transaction_writer
 
 
 
 
-class StandardPagination(PageNumberPagination):
+class StandardPagination(KeysetSwitchMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 1000 # test
 
+
+class TransactionPagination(KeysetSwitchMixin, PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
 class StandartView(viewsets.ModelViewSet):
+    # 读取只读副本的接口（客户端刚写入过时仍读主库）
+    replica_actions = ('list', 'retrieve', 'enriched_list')
+    # list / retrieve 响应依赖的模型（ETag 与响应缓存），以及写入后需要失效的模型，默认为 queryset 的模型
+    cache_models = None
+    invalidates = None
+    # 每个请求的 SQL 查询 / 跨服务调用（权限查询、信息补全）次数上限，见 complaint.query_budget
+    # export 为流式输出每一块的查询次数（每块一次 keyset 查询）
+    query_budget = {'default': 2, 'list': 2, 'retrieve': 1, 'enriched_list': 2, 'export': 1}
+    service_call_budget = {'default': 1, 'enriched_list': 3}
+
+    def get_cache_models(self):
+        return self.cache_models or [self.queryset.model]
+
+    def get_invalidated_models(self):
+        return self.invalidates or [self.queryset.model]
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower()) if hasattr(self, 'action_map') else None
+        if action in self.replica_actions and not db_router.is_sticky(request):
+            with db_router.read_from_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response_cache.bump(*self.get_invalidated_models())
+            db_router.mark_primary(request, response)
+        return response
+
     def list(self, request, *args, **kwargs):
+        return response_cache.cached_response(
+            request, lambda: self.build_list(request, *args, **kwargs), self.get_cache_models()
+        )
+
+    def build_list(self, request, *args, **kwargs):
         list = super().list(request, *args, **kwargs)
 
        # user_result = ServiceClient.get("OrderService", f"/api/orders/")
@@ -33,6 +90,11 @@ class StandartView(viewsets.ModelViewSet):
         return Response({'data': list.data})
 
     def retrieve(self, request, *args, **kwargs):#带路径参数的查询#123
+        return response_cache.cached_response(
+            request, lambda: self.build_retrieve(request, *args, **kwargs), self.get_cache_models()
+        )
+
+    def build_retrieve(self, request, *args, **kwargs):
         retrieve = super().retrieve(request, *args, **kwargs)
         return Response({'data': retrieve.data})
 
@@ -44,70 +106,362 @@ class StandartView(viewsets.ModelViewSet):
         update = super().update(request, *args, **kwargs)
         return Response({'data': update.data})
 
-class ComplaintView(StandartView):
+    def detail_list(self, request, serializer_class):
+        """
+        带关联信息的列表：过滤、分页与 list 相同，一页中引用的用户 / 商品信息
+        按下游服务批量并发解析，而不是逐行调用
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+
+        refs = References()
+        serializer_class.collect_references(rows, refs)
+        ReferenceResolver.from_settings().resolve(refs)
+
+        context = self.get_serializer_context()
+        context['refs'] = refs
+        data = serializer_class(rows, many=True, context=context).data
+        if page is not None:
+            return Response({'data': self.get_paginated_response(data).data})
+        return Response({'data': data})
+
+class ComplaintSummaryMixin:
+    """
+    举报的单条创建、修改、删除同步维护 ComplaintTargetSummary 计数
+    """
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            complaint = serializer.save()
+            summary.record_created([complaint])
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            before = models.Complaint.objects.select_for_update().get(pk=serializer.instance.pk)
+            complaint = serializer.save()
+            summary.record_changed(before, complaint)
+
+    def perform_destroy(self, instance):
+        summary.delete_complaints(models.Complaint.objects.filter(pk=instance.pk))
+
+
+class ComplaintView(ArchiveQueryMixin, ComplaintSummaryMixin, ExportMixin, StandartView):
 
     queryset = models.Complaint.objects.all()
     serializer_class = serializers.ComplaintSerializer
     lookup_field = 'complaint_id'
     pagination_class = StandardPagination
     permission_classes = [IsAdminUser]
+    export_exclude = ['dedupe_key']
+    archive_model = models.ComplaintArchive
+    archive_list_actions = ('list', 'enriched_list')
+    # 写入在同一事务中维护举报计数（加锁统计、补齐计数行、累加）
+    query_budget = {
+        'default': 5, 'list': 2, 'retrieve': 1, 'enriched_list': 2, 'export': 1,
+        'create': 3, 'branch_update': 4, 'branch_batch_update': 4,
+    }
 
 
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['complaint_id','target_id','target_type','status','complainer_id']
     ordering_fields = ['created_at']
 
+    def get_branch_updates(self, data):
+        """
+        校验批量处理的更新内容（只校验一次），返回可直接用于 QuerySet.update() 的字段
+        """
+        serializer = self.get_serializer(data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data:
+            raise ValidationError({'detail': '没有需要更新的字段'})
+        return serializer.validated_data
+
     @action(methods=['patch'], detail=False, url_path='branch/(?P<target_type>\w+)/(?P<target_id>[^/]+)', url_name='branch')
     def branch_update(self, request,target_type, target_id):
-        queryset = self.get_queryset().filter(
-            target_type=target_type,
-            target_id=target_id
-        )
-        if not queryset.exists():
+        target = serializers.BranchTargetSerializer(data={'target_type': target_type, 'target_id': target_id})
+        target.is_valid(raise_exception=True)
+        updates = self.get_branch_updates(request.data)
+
+        # 一条 UPDATE ... WHERE target_type=? AND target_id=? 更新该目标的所有举报（同一事务中调整计数）
+        updated = summary.update_complaints(self.get_queryset().filter(**target.validated_data), updates)
+        if not updated:
             return Response({'detail':'没有对应的举报'},status=status.HTTP_404_NOT_FOUND)
 
-        serializer = self.get_serializer()
-        for complaint in queryset:
-            serializer = self.get_serializer(complaint, data=request.data, partial=True)
-            if serializer.is_valid():
-                serializer.save()
+        return Response({'data': {'updated': updated}}, status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=['patch'], detail=False, url_path='branch', url_name='branch-batch')
+    def branch_batch_update(self, request):
+        """
+        一次处理多个举报目标：{"targets": [{"target_type": 0, "target_id": "..."}], "data": {"status": 1}}
+        """
+        batch = serializers.BranchBatchUpdateSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        updates = self.get_branch_updates(batch.validated_data['data'])
 
-        return Response(status=status.HTTP_202_ACCEPTED)
+        # 按目标类型分组，合并为一条 UPDATE ... WHERE (target_type=? AND target_id IN (...)) OR ...
+        target_ids = {}
+        for target in batch.validated_data['targets']:
+            target_ids.setdefault(target['target_type'], set()).add(target['target_id'])
+        condition = Q()
+        for target_type, ids in target_ids.items():
+            condition |= Q(target_type=target_type, target_id__in=ids)
 
+        updated = summary.update_complaints(self.get_queryset().filter(condition), updates)
 
-class ComplaintUserView(StandartView):
+        return Response({'data': {'updated': updated}}, status=status.HTTP_202_ACCEPTED)
+
+
+    @action(methods=['get'], detail=False, url_path='detail', url_name='detail-list')
+    def enriched_list(self, request):
+        """
+        带举报人、被举报对象信息的投诉列表
+        """
+        return self.detail_list(request, serializers.ComplaintDetailSerializer)
+
+
+class ComplaintUserView(ComplaintSummaryMixin, StandartView):
     queryset = models.Complaint.objects.all()
     serializer_class = serializers.ComplaintSerializer
     permission_classes = []
 
+    max_bulk_size = 1000  # 单次批量提交的最大条数
+    # 批量提交与单条相同：查重、一次 bulk_create、累加计数、读回主键（不返回自增ID的数据库），
+    # 与并发提交冲突时逐条回退不在预算内
+    query_budget = {'default': 2, 'list': 2, 'retrieve': 1, 'create': 6}
+    bulk_chunk_size = 200  # 每条 INSERT 语句写入的行数
+
     def create(self, request, *args, **kwargs):
         complainer_id=request.headers.get('UUID')
-        complaint_data = request.data
-
-        # 创建 Complaint 实例但不保存到数据库
-        complaint = models.Complaint(
-            target_type=complaint_data.get('target_type'),
-            target_id=complaint_data.get('target_id'),
-            reason=complaint_data.get('reason'),
-            complainer_id=complainer_id
-        )
+        if not complainer_id:
+            return Response({
+                'detail': '缺少举报人ID (UUID header)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            complainer_id = uuid.UUID(complainer_id)
+        except ValueError:
+            return Response({
+                'detail': '举报人ID格式错误 (UUID header)'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        # 手动保存到数据库
-        complaint.save()
-        serializer = self.get_serializer(complaint)
+        # 带 Idempotency-Key 的重试直接重放第一次的响应
+        return idempotency.run_idempotent(
+            request, complainer_id, lambda: self.create_complaints(request.data, complainer_id)
+        )
 
+    def create_complaints(self, data, complainer_id):
+        # 客户端离线积攒的举报以列表形式批量提交
+        if isinstance(data, list):
+            return self.create_many(data, complainer_id)
+
+        serializer = serializers.ComplaintCreateSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        complaint = models.Complaint(complainer_id=complainer_id, **serializer.validated_data)
+        complaint.dedupe_key = idempotency.make_dedupe_key(complainer_id, complaint.target_type, complaint.target_id)
+
+        # 去重窗口内的重复举报：返回已有的举报，不再写库
+        duplicate = idempotency.get_recent_duplicate(complaint.dedupe_key)
+        if duplicate is not None:
+            return Response({'data': duplicate, 'duplicate': True}, status=status.HTTP_200_OK)
+        try:
+            with transaction.atomic():
+                complaint.save()
+                summary.record_created([complaint])
+        except IntegrityError:
+            if not complaint.dedupe_key:
+                raise
+            existing = models.Complaint.objects.get(dedupe_key=complaint.dedupe_key)
+            data = self.get_serializer(existing).data
+            idempotency.remember_complaint(complaint.dedupe_key, data)
+            return Response({'data': data, 'duplicate': True}, status=status.HTTP_200_OK)
+
+        data = self.get_serializer(complaint).data
+        idempotency.remember_complaint(complaint.dedupe_key, data)
         return Response({
-            'data': serializer.data
+            'data': data
         }, status=status.HTTP_201_CREATED)
 
+    def insert_many(self, complaints):
+        """
+        写入一批举报并累加计数，返回实际写入的举报
+
+        一次 bulk_create 分块插入；与并发提交的重复举报发生唯一键冲突时，
+        改为逐条在保存点中插入，跳过冲突的举报
+        """
+        try:
+            with transaction.atomic():
+                created = models.Complaint.objects.bulk_create(complaints, batch_size=self.bulk_chunk_size)
+                summary.record_created(created)
+                self.load_primary_keys(created)
+            return created
+        except IntegrityError:
+            pass
+
+        created = []
+        with transaction.atomic():
+            for complaint in complaints:
+                try:
+                    with transaction.atomic():
+                        complaint.save()
+                except IntegrityError:
+                    if not complaint.dedupe_key:
+                        raise
+                    continue
+                created.append(complaint)
+            summary.record_created(created)
+        return created
+
+    @staticmethod
+    def load_primary_keys(complaints):
+        """
+        补齐 bulk_create 后缺失的主键（MySQL 批量 INSERT 不返回自增ID），一次查询读回刚写入的行
+
+        有去重键的按 dedupe_key 对应；没有去重键的按举报人、创建时间、目标和原因对应
+        （内容完全相同的举报按主键顺序依次分配）
+        """
+        missing = [complaint for complaint in complaints if complaint.pk is None]
+        if not missing:
+            return
+        keyed = {complaint.dedupe_key: complaint for complaint in missing if complaint.dedupe_key}
+        unkeyed = [complaint for complaint in missing if not complaint.dedupe_key]
+        condition = Q(dedupe_key__in=list(keyed)) if keyed else Q()
+        if unkeyed:
+            condition |= Q(
+                dedupe_key__isnull=True,
+                complainer_id__in={complaint.complainer_id for complaint in unkeyed},
+                created_at__in={complaint.created_at for complaint in unkeyed},
+            )
+
+        def content(complaint):
+            return (complaint.complainer_id, complaint.created_at, complaint.target_type, complaint.target_id,
+                    complaint.reason)
+
+        waiting = {}
+        for complaint in unkeyed:
+            waiting.setdefault(content(complaint), []).append(complaint)
+        for row in models.Complaint.objects.filter(condition).order_by('pk'):
+            complaint = keyed.get(row.dedupe_key) if row.dedupe_key else None
+            if complaint is None and not row.dedupe_key and waiting.get(content(row)):
+                complaint = waiting[content(row)].pop(0)
+            if complaint is not None:
+                complaint.pk = row.pk
+                complaint._state.adding = False
+
+    def create_many(self, items, complainer_id):
+        """
+        批量提交举报：逐条校验，合法的在一个事务内用 bulk_create 分块插入，
+        返回每一条的结果（成功的数据、重复举报对应的已有举报或校验错误）
+        """
+        if not items:
+            raise ValidationError({'detail': '举报列表不能为空'})
+        if len(items) > self.max_bulk_size:
+            raise ValidationError({'detail': f'单次最多提交 {self.max_bulk_size} 条举报'})
+
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            serializer = serializers.ComplaintCreateSerializer(data=item)
+            if serializer.is_valid():
+                complaint = models.Complaint(complainer_id=complainer_id, **serializer.validated_data)
+                complaint.dedupe_key = idempotency.make_dedupe_key(
+                    complainer_id, complaint.target_type, complaint.target_id
+                )
+                pending.append((index, complaint))
+            else:
+                results[index] = {'index': index, 'success': False, 'errors': serializer.errors}
+
+        # 去重：同一批中的重复项、以及窗口内已提交过的举报（先查缓存，再一次查询数据库）
+        duplicates = {}
+        keys = {complaint.dedupe_key for _, complaint in pending if complaint.dedupe_key}
+        for key in keys:
+            data = idempotency.get_recent_duplicate(key)
+            if data is not None:
+                duplicates[key] = data
+        missing = keys - set(duplicates)
+        if missing:
+            for existing in models.Complaint.objects.filter(dedupe_key__in=missing):
+                duplicates[existing.dedupe_key] = self.get_serializer(existing).data
+
+        to_insert = []
+        seen = set()
+        for index, complaint in pending:
+            key = complaint.dedupe_key
+            if key and (key in duplicates or key in seen):
+                continue
+            if key:
+                seen.add(key)
+            to_insert.append(complaint)
+
+        created = {id(complaint) for complaint in self.insert_many(to_insert)}
+        inserted = {}
+        for _, complaint in pending:
+            if id(complaint) in created:
+                inserted[id(complaint)] = self.get_serializer(complaint).data
+                if complaint.dedupe_key:
+                    duplicates.setdefault(complaint.dedupe_key, inserted[id(complaint)])
+                    idempotency.remember_complaint(complaint.dedupe_key, inserted[id(complaint)])
+
+        duplicate_count = 0
+        for index, complaint in pending:
+            if id(complaint) in inserted:
+                results[index] = {'index': index, 'success': True, 'data': inserted[id(complaint)]}
+            elif complaint.dedupe_key:
+                data = duplicates.get(complaint.dedupe_key)
+                if data is None:
+                    # 与并发提交冲突、被跳过的举报
+                    existing = models.Complaint.objects.filter(dedupe_key=complaint.dedupe_key).first()
+                    data = self.get_serializer(existing).data if existing else None
+                results[index] = {'index': index, 'success': True, 'duplicate': True, 'data': data}
+                duplicate_count += 1
+
+        failed = len(items) - len(inserted) - duplicate_count
+        if not failed:
+            response_status = status.HTTP_201_CREATED if inserted else status.HTTP_200_OK
+        elif inserted or duplicate_count:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'data': {
+                'created': len(inserted),
+                'duplicates': duplicate_count,
+                'failed': failed,
+                'results': results,
+            }
+        }, status=response_status)
+
+
+class ComplaintTargetSummaryView(viewsets.GenericViewSet):
+    """
+    被举报对象的举报计数批量查询
+
+    POST {"targets": [{"target_type": 0, "target_id": "..."}, ...]}
+    """
+    queryset = models.ComplaintTargetSummary.objects.all()
+    serializer_class = serializers.ComplaintTargetSummarySerializer
+    permission_classes = []
+    query_budget = 1
+    service_call_budget = 0
+
+    def create(self, request, *args, **kwargs):
+        lookup = serializers.TargetSummaryLookupSerializer(data=request.data)
+        lookup.is_valid(raise_exception=True)
+        targets = [(target['target_type'], target['target_id']) for target in lookup.validated_data['targets']]
+        serializer = self.get_serializer(summary.lookup(targets), many=True)
+        return Response({'data': serializer.data})
+
 
-class ComplaintReviewView(StandartView):
+class ComplaintReviewView(ExportMixin, StandartView):
 
     queryset = models.ComplaintReview.objects.all()
     serializer_class = serializers.ComplaintReviewSerializer
     lookup_field = 'review_id'
     pagination_class = StandardPagination
     permission_classes = [IsAdminUser]
+    # 审核结果会影响投诉的处理状态，创建审核后投诉列表的缓存同样失效
+    invalidates = [models.ComplaintReview, models.Complaint]
+    # 创建审核：审核与后续任务各一条 INSERT；resolve_complaints 时另有加锁查询、UPDATE、补齐计数行与累加
+    query_budget = dict(StandartView.query_budget, create=6)
 
 
     # filter_class = ComplaintReviewFilter
@@ -115,6 +469,13 @@ class ComplaintReviewView(StandartView):
     filterset_fields = ['target_id', 'target_type','reviewer_id']
     ordering_fields = ['created_at']
 
+    @action(methods=['get'], detail=False, url_path='detail', url_name='detail-list')
+    def enriched_list(self, request):
+        """
+        带审核员信息的审核列表
+        """
+        return self.detail_list(request, serializers.ComplaintReviewDetailSerializer)
+
     def create(self, request, *args, **kwargs):
         # 从请求头获取审核员ID
         reviewer_id = request.headers.get('UUID')
@@ -125,31 +486,114 @@ class ComplaintReviewView(StandartView):
 
         # 从请求体获取数据
         review_data = request.data
+        options = serializers.ReviewCreateOptionsSerializer(data=review_data)
+        options.is_valid(raise_exception=True)
+        target = {key: options.validated_data[key] for key in ('target_type', 'target_id')}
+        resolve_complaints = options.validated_data['resolve_complaints']
         # 创建 ComplaintReview 实例
         review = models.ComplaintReview(
-            target_id=review_data.get('target_id'),
-            target_type=review_data.get('target_type'),
+            **target,
             reviewer_id=reviewer_id,
             result=review_data.get('result'),
             ban_type=review_data.get('ban_type'),
             ban_time=review_data.get('ban_time')
         )
 
-        # 保存到数据库
-        review.save()
+        # 保存到数据库，后续处理（举报标记为已处理、封禁通知、审计日志）写入任务队列，
+        # 与审核在同一事务中提交，由 run_jobs worker 执行
+        resolved_count = None
+        with transaction.atomic():
+            review.save()
+            if resolve_complaints:
+                # 一条 UPDATE ... WHERE target_type=? AND target_id=? AND status=0，与审核一起提交或回滚
+                resolved_count = summary.update_complaints(
+                    models.Complaint.objects.filter(**target, status=summary.STATUS_OPEN),
+                    {'status': summary.STATUS_HANDLED},
+                )
+            jobs.enqueue_review_jobs(review, resolved_count)
         serializer = self.get_serializer(review)
 
-        return Response({
-            'data': serializer.data
-        }, status=status.HTTP_201_CREATED)
+        data = {'data': serializer.data}
+        if resolve_complaints:
+            data['resolved_count'] = resolved_count
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ArchiveQueryMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = models.Transaction.objects.all()
     serializer_class = serializers.TransactionSerializer
+    pagination_class = TransactionPagination
+    archive_model = models.TransactionArchive
     filter_backends = [DjangoFilterBackend]
     ordering_fields = ['created_at']
     lookup_field = 'log_id'
+    # create 只进入缓冲，由后台线程批量写入；export 为每块的查询次数
+    query_budget = {'default': 2, 'list': 2, 'retrieve': 1, 'create': 0, 'writer_stats': 0, 'export': 1}
+    service_call_budget = 0
 
-
+    def create(self, request, *args, **kwargs):
+        """
+        记录事件：单条 {"order_id": ..., "event": ...} 或列表
+
+        开启 TRANSACTION_LOG['BUFFERED'] 时事件进入进程内缓冲批量写入，返回 202；
+        缓冲放不下整批（数据库写入跟不上）时整批拒绝并返回 503，客户端稍后重试整批
+        """
+        if not getattr(settings, 'TRANSACTION_LOG', {}).get('BUFFERED', True):
+            return super().create(request, *args, **kwargs)
+
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data if many else [serializer.validated_data]
+        writer = get_transaction_writer()
+        if len(rows) > writer.max_pending:
+            return Response({'detail': f'单次最多提交 {writer.max_pending} 条事件'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # 整批进入缓冲或整批拒绝，客户端收到 503 后重试整批不会重复记录
+            writer.submit_many((row['order_id'], row['event']) for row in rows)
+        except TransactionLogFull:
+            return Response({'detail': '事件写入繁忙，请稍后重试'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+        return Response({'data': {'accepted': len(rows)}}, status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=['get'], detail=False, url_path='writer-stats', url_name='writer-stats')
+    def writer_stats(self, request):
+        """
+        缓冲写入的吞吐量、批次、刷新耗时与延迟
+        """
+        return Response({'data': get_transaction_writer().stats()})
+
+
+def prometheus_metrics(request):
+    """
+    Prometheus 抓取接口：请求耗时、数据库查询、跨服务调用、Nacos 查询等指标
+    """
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
+
+
+def liveness(request):
+    """
+    存活检查：进程能处理请求即可，不检查依赖
+    """
+    return JsonResponse({'status': 'alive'})
+
+
+def readiness(request):
+    """
+    就绪检查：数据库可用即就绪；同时报告 Nacos 注册状态（注册在后台进行，不影响就绪）
+    """
+    from config.nacos_heartbeat import registration_status
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        database = 'ok'
+    except Exception as e:
+        database = str(e)
+    ready = database == 'ok'
+    return JsonResponse(
+        {'status': 'ready' if ready else 'not_ready', 'database': database, 'nacos': registration_status()},
+        status=200 if ready else 503,
+    )
@@ -0,0 +1,28 @@
+# config/asgi.py
+"""
+ASGI config for complaint service project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+调用其他服务的代码路径（如管理员权限检查）在 ASGI 下异步执行，不占用 worker 线程。
+启动示例：
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --workers 3
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+from config.nacos_heartbeat import mark_serving
+
+# 设置默认的 Django 配置模块
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+# 当前进程对外提供服务，启动后在后台注册到 Nacos
+mark_serving()
+
+# 获取 ASGI 应用实例
+application = get_asgi_application()
@@ -1,32 +1,63 @@
-import logging
-import random
+"""
+Nacos 客户端与服务注册
 
-import nacos
+- NacosClient 在第一次使用时才创建（构造时会向 Nacos 登录），
+  导入本模块、执行 manage.py 命令、迁移和测试都不会访问网络
+- 只有对外提供服务的进程（gunicorn / uvicorn worker、runserver）才注册，
+  注册和心跳在后台线程中进行：等本地端口可以接受连接后再注册，Nacos 慢或不可达不影响启动
+- 同一实例（IP:端口）的多个 worker 通过文件锁选出一个负责注册和心跳，
+  该 worker 退出后由其他 worker 接管
+- 注册状态写入状态文件，readiness 接口（/health/ready）读取并报告
+"""
+import atexit
+import json
+import logging
+import os
 import socket
+import sys
+import tempfile
 import threading
 import time
-import os
-import sys
 
-SERVER_ADDRESSES = "123.57.145.79:8848"
-NAMESPACE = "public"  # 或者你的 namespace ID
-USERNAME = "nacos"
-PASSWORD = "no5groupnacos"
+try:
+    import fcntl
+except ImportError:  # Windows 本地开发：没有文件锁，每个进程各自注册
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 可用环境变量覆盖（本地压测时指向 benchmarks/stubs.py 的 Nacos 替身）
+SERVER_ADDRESSES = os.getenv("NACOS_SERVER_ADDRESSES", "123.57.145.79:8848")
+NAMESPACE = os.getenv("NACOS_NAMESPACE", "public")  # 或者你的 namespace ID
+USERNAME = os.getenv("NACOS_USERNAME", "nacos")
+PASSWORD = os.getenv("NACOS_PASSWORD", "no5groupnacos")
 SERVICE_NAME = "ComplaintService"
 
-logging.getLogger('nacos').setLevel(logging.WARNING)
+# auto: 只在服务进程中注册; always / never: 强制注册 / 不注册
+REGISTER_MODE = os.getenv("NACOS_REGISTER", "auto")
+HEARTBEAT_INTERVAL = float(os.getenv("NACOS_HEARTBEAT_INTERVAL", 5))  # 秒，应小于 Nacos 的心跳超时
+
 
-#随机生成30000到32767的随机端口
+def _bind_port(default=8000) -> int:
+    """本地服务端口：gunicorn.conf.py 的绑定地址（GUNICORN_BIND）或 runserver 的地址参数中的端口"""
+    bind = os.getenv("GUNICORN_BIND", "")
+    argv = sys.argv[1:]
+    if argv and argv[0] == 'runserver':
+        bind = next((arg for arg in argv[1:] if not arg.startswith('-')), bind)
+    port = bind.rpartition(':')[2]
+    return int(port) if port.isdigit() else default
 
 
-PORT = os.getenv("NODE_PORT", random.randint(30000, 32767))
+# 注册前等待本地端口可以接受连接（容器内的服务端口），超时后仍然注册
+READY_CHECK_PORT = int(os.getenv("NACOS_READY_CHECK_PORT") or _bind_port())
+READY_CHECK_TIMEOUT = float(os.getenv("NACOS_READY_CHECK_TIMEOUT", 30))
+STATE_DIR = os.getenv("NACOS_STATE_DIR", tempfile.gettempdir())
 
-client = nacos.NacosClient(
-    SERVER_ADDRESSES,
-    namespace=NAMESPACE,
-    username=USERNAME,
-    password=PASSWORD
-)
+logging.getLogger('nacos').setLevel(logging.WARNING)
+
+# 注册到 Nacos 的端口：NodePort 部署时为 NODE_PORT，否则为本地服务端口。
+# 同一 Pod 的所有 worker 必须得到相同的端口，文件锁和状态文件按 IP:端口区分实例
+PORT = int(os.getenv("NODE_PORT") or READY_CHECK_PORT)
 
 
 # 获取本机 IP
@@ -44,47 +75,213 @@ def get_host_ip():
 IP = os.getenv("NODE_IP", "101.132.163.45") # 替换为您的公网IP
 
 
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """获取 NacosClient（第一次调用时创建并登录）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import nacos
+                _client = nacos.NacosClient(
+                    SERVER_ADDRESSES,
+                    namespace=NAMESPACE,
+                    username=USERNAME,
+                    password=PASSWORD
+                )
+    return _client
+
+
 def register_service():
     # 注册实例
-    client.add_naming_instance(
+    get_client().add_naming_instance(
         service_name=SERVICE_NAME,
         ip=IP,
         port=PORT,
         cluster_name="DEFAULT"
     )
-    print(f"已注册到 Nacos: {SERVICE_NAME} {IP}:{PORT}")
+    logger.info("已注册到 Nacos: %s %s:%s", SERVICE_NAME, IP, PORT)
 
 def deregister_service():
     """从Nacos注销服务实例"""
     try:
-        client.remove_naming_instance(
+        get_client().remove_naming_instance(
             service_name=SERVICE_NAME,
             ip=IP,
             port=PORT,
             cluster_name="DEFAULT"
         )
-        print(f"已从Nacos注销: {SERVICE_NAME} {IP}:{PORT}")
+        logger.info("已从Nacos注销: %s %s:%s", SERVICE_NAME, IP, PORT)
     except Exception as e:
-        print(f"服务注销失败: {e}")
+        logger.warning("服务注销失败: %s", e)
 
 
 def send_heartbeat():
-    while True:
+    """发送一次心跳，返回 Nacos 是否认识该实例"""
+    result = get_client().send_heartbeat(
+        service_name=SERVICE_NAME,
+        ip=IP,
+        port=PORT,
+        cluster_name="DEFAULT"
+    )
+    # 20404: Nacos 上没有该实例（例如 Nacos 重启后），需要重新注册
+    return not (isinstance(result, dict) and result.get('code') == 20404)
+
+
+# ---- 服务进程判断 ----
+
+_serving = False
+
+
+def mark_serving():
+    """由 config/wsgi.py、config/asgi.py 在加载应用前调用：当前进程会对外提供服务"""
+    global _serving
+    _serving = True
+
+
+def is_serving_process() -> bool:
+    if REGISTER_MODE == 'always':
+        return True
+    if REGISTER_MODE == 'never':
+        return False
+    if _serving:
+        return True
+    argv = sys.argv[1:]
+    if argv and argv[0] == 'runserver':
+        # 自动重载时外层进程只负责监视文件，由子进程（RUN_MAIN=true）提供服务
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in argv
+    return False
+
+
+# ---- 注册状态（多个 worker 共享的状态文件） ----
+
+def _state_path(suffix):
+    return os.path.join(STATE_DIR, f"complaint-nacos-{IP}-{PORT}.{suffix}")
+
+
+def _write_state(**state):
+    state.update(pid=os.getpid(), ip=IP, port=PORT, updated_at=time.time())
+    path = _state_path('state')
+    tmp = f"{path}.{os.getpid()}"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("写入 Nacos 注册状态失败: %s", e)
+
+
+def registration_status():
+    """
+    当前实例的 Nacos 注册状态（任一 worker 负责注册即可）
+
+    Returns:
+        {"enabled", "registered", "last_heartbeat", "error", ...}
+    """
+    if not is_serving_process():
+        return {'enabled': False, 'registered': False}
+    try:
+        with open(_state_path('state')) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {'enabled': True, 'registered': False, 'error': '尚未注册'}
+    last_heartbeat = state.get('last_heartbeat')
+    if state.get('registered') and (last_heartbeat is None or time.time() - last_heartbeat > HEARTBEAT_INTERVAL * 3):
+        state['registered'] = False
+        state['error'] = state.get('error') or '心跳已停止'
+    state['enabled'] = True
+    return state
+
+
+# ---- 后台注册 ----
+
+class _Registrar:
+    """后台注册与心跳（每个进程一个线程，持有文件锁的进程实际执行）"""
+
+    def __init__(self):
+        self.lock_file = None
+        self.registered = False
+        self.registered_at = None
+
+    def acquire(self) -> bool:
+        if self.lock_file is not None:
+            return True
+        if fcntl is None:
+            self.lock_file = True
+            return True
+        lock_file = open(_state_path('lock'), 'a')
         try:
-            client.send_heartbeat(
-                service_name=SERVICE_NAME,
-                ip=IP,
-                port=PORT,
-                cluster_name="DEFAULT"
-            )
-            # 心跳周期建议小于 Nacos 配置的超时（默认 5s-10s 一次）
-            time.sleep(5)
-        except Exception as e:
-            print(f"心跳发送失败: {e}")
-            time.sleep(5)
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    @staticmethod
+    def wait_until_listening():
+        """等待本地服务端口可以接受连接（应用可以处理请求后再注册）"""
+        deadline = time.monotonic() + READY_CHECK_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', READY_CHECK_PORT), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.5)
+        logger.warning("本地端口 %s 在 %s 秒内未就绪，仍然注册到 Nacos", READY_CHECK_PORT, READY_CHECK_TIMEOUT)
+
+    def run(self):
+        self.wait_until_listening()
+        backoff = 1.0
+        while True:
+            if not self.acquire():
+                # 其他 worker 负责注册；定期重试，该 worker 退出后接管
+                time.sleep(HEARTBEAT_INTERVAL * 2)
+                continue
+            try:
+                if not self.registered:
+                    register_service()
+                    if self.registered_at is None:
+                        atexit.register(self.shutdown)
+                    self.registered = True
+                    self.registered_at = time.time()
+                    _write_state(registered=True, registered_at=self.registered_at, last_heartbeat=time.time(), error=None)
+                elif send_heartbeat():
+                    _write_state(registered=True, registered_at=self.registered_at, last_heartbeat=time.time(), error=None)
+                else:
+                    logger.warning("Nacos 中没有本实例，重新注册")
+                    self.registered = False
+                    continue
+                backoff = 1.0
+                time.sleep(HEARTBEAT_INTERVAL)
+            except Exception as e:
+                logger.warning("Nacos %s失败，%.0f 秒后重试: %s", '心跳' if self.registered else '注册', backoff, e)
+                _write_state(registered=self.registered, registered_at=self.registered_at, error=str(e))
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+    def shutdown(self):
+        if self.registered:
+            deregister_service()
+            self.registered = False
+            _write_state(registered=False, error='已注销')
+
+
+_registrar = None
+_registrar_lock = threading.Lock()
+
 
 def start_nacos_heartbeat():
-    register_service()
-    # 开一个后台线程发心跳
-    t = threading.Thread(target=send_heartbeat, daemon=True)
-    t.start()
+    """在后台线程中注册到 Nacos 并发送心跳（不阻塞启动）；非服务进程不注册"""
+    global _registrar
+    if not is_serving_process():
+        return False
+    with _registrar_lock:
+        if _registrar is not None:
+            return True
+        _registrar = _Registrar()
+    threading.Thread(target=_registrar.run, name='nacos-registrar', daemon=True).start()
+    return True
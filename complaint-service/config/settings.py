@@ -22,6 +22,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'complaint.middleware.MetricsMiddleware',  # 放在第一位，统计完整的请求耗时
+    'complaint.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -29,6 +31,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'complaint.middleware.PrivilegePrefetchMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -50,6 +53,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database
 DATABASES = {
@@ -73,6 +77,28 @@ DATABASES = {
     }
 }
 
+# 只读副本：DB_REPLICA_HOSTS=host1:3306,host2:3306（账号、库名与主库相同，可用 DB_REPLICA_USER / DB_REPLICA_PASSWORD 覆盖）
+# StandartView 的列表 / 详情查询读取副本，写入与其他查询走主库（complaint.db_router）
+for _index, _replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    _host, _, _port = _replica.strip().partition(':')
+    DATABASES[f'replica_{_index}'] = dict(
+        DATABASES['default'],
+        HOST=_host,
+        PORT=_port or DATABASES['default']['PORT'],
+        USER=os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        PASSWORD=os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['complaint.db_router.ReplicaRouter']
+
+READ_REPLICA = {
+    'ALIASES': [alias for alias in DATABASES if alias.startswith('replica_')],
+    'MAX_LAG': float(os.environ.get('DB_REPLICA_MAX_LAG', 5)),  # 秒，超过该延迟的副本不读取
+    'CHECK_INTERVAL': float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5)),  # 秒，副本延迟检查间隔
+    'STICKY_SECONDS': int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5)),  # 秒，客户端写入后读取主库的时间
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -118,6 +144,144 @@ USER_SERVICE_URL = os.environ.get('USER_SERVICE_URL', 'http://localhost:8001')
 PRODUCT_SERVICE_URL = os.environ.get('PRODUCT_SERVICE_URL', 'http://localhost:8002')
 ORDER_SERVICE_URL = os.environ.get('ORDER_SERVICE_URL', 'http://localhost:8003')
 
+# 服务发现后端（complaint.discovery）: nacos / static / dns / file
+SERVICE_DISCOVERY = {
+    'BACKEND': os.environ.get('SERVICE_DISCOVERY_BACKEND', 'nacos'),
+    # static: 服务名 -> 地址（多个地址用逗号分隔）
+    'SERVICES': {
+        'UserService': USER_SERVICE_URL.split(','),
+        'ProductService': PRODUCT_SERVICE_URL.split(','),
+        'OrderService': ORDER_SERVICE_URL.split(','),
+    },
+    # dns: 未在 DNS_HOSTS 中配置的服务按模板生成域名，{name} 为 kebab-case 服务名（UserService -> user-service）
+    'DNS_HOSTS': {},
+    'DNS_TEMPLATE': os.environ.get('SERVICE_DISCOVERY_DNS_TEMPLATE', '{name}'),
+    'DNS_PORT': int(os.environ.get('SERVICE_DISCOVERY_DNS_PORT', 8000)),
+    'DNS_RESOLVE': os.environ.get('SERVICE_DISCOVERY_DNS_RESOLVE', '') in ('1', 'true', 'True'),  # headless Service
+    # file: JSON 文件 {服务名: ["http://host:port", ...]}，修改后在下一次刷新（REFRESH_INTERVAL）时生效
+    'FILE': os.environ.get('SERVICE_DISCOVERY_FILE', ''),
+}
+
+# ServiceClient 连接池（每个目标服务一个长连接客户端）
+SERVICE_CLIENT = {
+    'MAX_CONNECTIONS': int(os.environ.get('SERVICE_CLIENT_MAX_CONNECTIONS', 100)),
+    'MAX_KEEPALIVE_CONNECTIONS': int(os.environ.get('SERVICE_CLIENT_MAX_KEEPALIVE', 20)),
+    'KEEPALIVE_EXPIRY': float(os.environ.get('SERVICE_CLIENT_KEEPALIVE_EXPIRY', 30)),  # 秒
+    'HTTP2': os.environ.get('SERVICE_CLIENT_HTTP2', 'False').lower() in ('1', 'true', 'yes'),  # 需要安装 h2
+}
+
+# 服务实例本地缓存与负载均衡
+SERVICE_REGISTRY = {
+    'REFRESH_INTERVAL': float(os.environ.get('SERVICE_REGISTRY_REFRESH_INTERVAL', 10)),  # 秒
+    'REFRESH_JITTER': float(os.environ.get('SERVICE_REGISTRY_REFRESH_JITTER', 0.2)),  # 刷新间隔抖动比例
+    # random / round_robin / least_outstanding / ewma
+    'LOAD_BALANCER': os.environ.get('SERVICE_LOAD_BALANCER', 'ewma'),
+    'EWMA_DECAY': float(os.environ.get('SERVICE_LOAD_BALANCER_EWMA_DECAY', 10)),  # 秒
+}
+
+# 跨服务调用容错：熔断、重试预算、对冲请求
+SERVICE_RESILIENCE = {
+    # 服务级熔断：整个服务连续失败（含重试后仍失败）达到阈值后直接拒绝调用
+    'SERVICE_BREAKER_FAILURE_THRESHOLD': int(os.environ.get('SERVICE_BREAKER_FAILURE_THRESHOLD', 10)),
+    'SERVICE_BREAKER_RECOVERY_TIMEOUT': float(os.environ.get('SERVICE_BREAKER_RECOVERY_TIMEOUT', 15)),  # 秒
+    # 实例级熔断：单个实例连续失败后暂时不再选择该实例
+    'INSTANCE_BREAKER_FAILURE_THRESHOLD': int(os.environ.get('INSTANCE_BREAKER_FAILURE_THRESHOLD', 3)),
+    'INSTANCE_BREAKER_RECOVERY_TIMEOUT': float(os.environ.get('INSTANCE_BREAKER_RECOVERY_TIMEOUT', 30)),  # 秒
+    'BREAKER_HALF_OPEN_MAX_CALLS': int(os.environ.get('BREAKER_HALF_OPEN_MAX_CALLS', 1)),
+    # 幂等方法失败后换实例重试的次数，以及重试预算（重试最多占请求的比例 + 每秒保底次数）
+    'MAX_RETRIES': int(os.environ.get('SERVICE_MAX_RETRIES', 1)),
+    'RETRY_BUDGET_RATIO': float(os.environ.get('SERVICE_RETRY_BUDGET_RATIO', 0.2)),
+    'RETRY_BUDGET_MIN_PER_SECOND': float(os.environ.get('SERVICE_RETRY_BUDGET_MIN_PER_SECOND', 1)),
+    # GET 请求超过该服务延迟分位数仍未返回时向另一实例发起对冲请求（消耗重试预算）
+    'HEDGE_ENABLED': os.environ.get('SERVICE_HEDGE_ENABLED', 'False').lower() in ('1', 'true', 'yes'),
+    'HEDGE_PERCENTILE': float(os.environ.get('SERVICE_HEDGE_PERCENTILE', 95)),
+    'HEDGE_MIN_SAMPLES': int(os.environ.get('SERVICE_HEDGE_MIN_SAMPLES', 20)),
+}
+
+# Cache
+# 默认使用进程内缓存；多 worker 共享时可配置为 Redis，例如
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://redis:6379/0
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'complaint-service'),
+    }
+}
+
+# 详情列表关联信息批量解析（ComplaintDetailSerializer / ComplaintReviewDetailSerializer）
+# 批量接口约定：POST {"ids": [...]}，返回对象列表（含 id 字段）或 {id: 对象}
+REFERENCE_ENRICHMENT = {
+    'USER_BATCH_ENDPOINT': os.environ.get('USER_BATCH_ENDPOINT', '/api/v1/user/batch/'),
+    'PRODUCT_BATCH_ENDPOINT': os.environ.get('PRODUCT_BATCH_ENDPOINT', '/api/v1/product/batch/'),
+    'TIMEOUT': float(os.environ.get('REFERENCE_ENRICHMENT_TIMEOUT', 1.0)),  # 秒，超时的字段返回 null
+    'CACHE_TTL': int(os.environ.get('REFERENCE_ENRICHMENT_CACHE_TTL', 60)),  # 秒，0 表示不缓存
+}
+
+# 举报提交的幂等与去重（ComplaintUserView.create）
+COMPLAINT_IDEMPOTENCY = {
+    'TTL': int(os.environ.get('IDEMPOTENCY_TTL', 86400)),  # 秒，Idempotency-Key 响应的保留时间
+    'LOCK_TTL': int(os.environ.get('IDEMPOTENCY_LOCK_TTL', 30)),  # 秒，同一 Key 处理中的锁
+    'DEDUPE_WINDOW': int(os.environ.get('COMPLAINT_DEDUPE_WINDOW', 3600)),  # 秒，同一举报人对同一目标的去重窗口，0 表示不去重
+}
+
+# Transaction 事件日志缓冲批量写入（TransactionViewSet.create、complaint.transaction_log.log_transaction）
+TRANSACTION_LOG = {
+    'BUFFERED': os.environ.get('TRANSACTION_LOG_BUFFERED', 'True').lower() in ('1', 'true', 'yes'),
+    'MAX_BATCH': int(os.environ.get('TRANSACTION_LOG_MAX_BATCH', 500)),  # 每次 bulk_create 的最大条数
+    'FLUSH_INTERVAL': float(os.environ.get('TRANSACTION_LOG_FLUSH_INTERVAL', 0.2)),  # 秒，事件最长缓冲时间
+    'MAX_PENDING': int(os.environ.get('TRANSACTION_LOG_MAX_PENDING', 10000)),  # 缓冲上限，超过后背压
+    'PUT_TIMEOUT': float(os.environ.get('TRANSACTION_LOG_PUT_TIMEOUT', 1.0)),  # 秒，缓冲满时提交的最长等待
+}
+
+# 冷数据归档（python manage.py archive_old_rows，k8s/archive-cronjob.yaml 每天执行）
+ARCHIVE = {
+    'COMPLAINT_AGE_DAYS': int(os.environ.get('ARCHIVE_COMPLAINT_AGE_DAYS', 180)),  # 已处理投诉的保留天数
+    'TRANSACTION_AGE_DAYS': int(os.environ.get('ARCHIVE_TRANSACTION_AGE_DAYS', 90)),  # 事务日志的保留天数
+    'BATCH_SIZE': int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000)),  # 每批迁移的行数（每批一个短事务）
+    'BATCH_SLEEP': float(os.environ.get('ARCHIVE_BATCH_SLEEP', 0.1)),  # 秒，批与批之间的暂停
+}
+
+# 数据库任务队列（complaint.jobs，python manage.py run_jobs 执行）：审核后的举报处理、封禁通知、审计日志
+JOB_QUEUE = {
+    'BATCH_SIZE': int(os.environ.get('JOB_BATCH_SIZE', 100)),  # 每次领取的最大任务数
+    'POLL_INTERVAL': float(os.environ.get('JOB_POLL_INTERVAL', 1.0)),  # 秒，没有任务时的轮询间隔
+    'MAX_POLL_INTERVAL': float(os.environ.get('JOB_MAX_POLL_INTERVAL', 5.0)),  # 秒，连续空闲时轮询间隔的上限
+    'LOCK_TIMEOUT': float(os.environ.get('JOB_LOCK_TIMEOUT', 300)),  # 秒，执行中的任务超过该时间可被重新领取
+    'MAX_ATTEMPTS': int(os.environ.get('JOB_MAX_ATTEMPTS', 8)),  # 超过后移入死信表
+    'RETRY_BASE': float(os.environ.get('JOB_RETRY_BASE', 5)),  # 秒，第一次重试的退避时间，之后指数增长
+    'RETRY_MAX': float(os.environ.get('JOB_RETRY_MAX', 600)),  # 秒，退避时间上限
+    'NOTIFY_TIMEOUT': float(os.environ.get('JOB_NOTIFY_TIMEOUT', 5.0)),  # 秒，封禁通知请求的超时
+    # 封禁通知批量接口约定：POST {"bans": [{"review_id", "target_id", "ban_type", "ban_time"}, ...]}
+    'USER_BAN_ENDPOINT': os.environ.get('USER_BAN_ENDPOINT', '/api/v1/user/ban/batch/'),
+    'PRODUCT_BAN_ENDPOINT': os.environ.get('PRODUCT_BAN_ENDPOINT', '/api/v1/product/ban/batch/'),
+}
+
+# 列表 / 详情接口的 ETag 与响应缓存（写入后按模型的"代"失效）
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() in ('1', 'true', 'yes'),
+    'TTL': int(os.environ.get('RESPONSE_CACHE_TTL', 5)),  # 秒，0 表示只做条件请求不缓存响应
+}
+
+# 流式导出（/export/ndjson/、/export/csv/）
+EXPORT = {
+    'CHUNK_SIZE': int(os.environ.get('EXPORT_CHUNK_SIZE', 2000)),  # 每次查询的行数
+}
+
+# 每个请求的查询 / 跨服务调用预算（视图的 query_budget / service_call_budget）
+QUERY_BUDGET = {
+    'SAMPLE_RATE': float(os.environ.get('QUERY_BUDGET_SAMPLE_RATE', 0.01)),  # 非 DEBUG 时记录 SQL 的请求比例
+    'N_PLUS_ONE_THRESHOLD': int(os.environ.get('QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', 5)),  # 同一条 SQL 重复次数
+}
+
+# 用户权限查询缓存（IsAdminUser / IsComplaintOwner）
+PRIVILEGE_CACHE = {
+    'BACKEND': os.environ.get('PRIVILEGE_CACHE_BACKEND', 'local'),  # local: 进程内LRU, django: 使用 CACHES
+    'CACHE_ALIAS': os.environ.get('PRIVILEGE_CACHE_ALIAS', 'default'),
+    'TTL': int(os.environ.get('PRIVILEGE_CACHE_TTL', 60)),  # 秒, 0 表示不缓存
+    'NEGATIVE_TTL': int(os.environ.get('PRIVILEGE_CACHE_NEGATIVE_TTL', 5)),  # 秒, 0 表示不做负缓存
+    'MAX_SIZE': int(os.environ.get('PRIVILEGE_CACHE_MAX_SIZE', 10000)),
+}
+
 # Logging configuration
 LOGGING = {
     'version': 1,
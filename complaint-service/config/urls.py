@@ -5,6 +5,7 @@ from complaint import views
 
 router = DefaultRouter()
 router.register(r'complaints/create',views.ComplaintUserView,basename='complaint-create')
+router.register(r'complaints/summary', views.ComplaintTargetSummaryView, basename='complaint-summary')
 router.register(r'complaints', views.ComplaintView)
 router.register(r'reviews', views.ComplaintReviewView)
 router.register(r'transactions', views.TransactionViewSet)
@@ -14,5 +15,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
     # 可以添加自定义路径
+    path('metrics', views.prometheus_metrics, name='metrics'),
+    path('health/live', views.liveness, name='health-live'),
+    path('health/ready', views.readiness, name='health-ready'),
 
 ]
\ No newline at end of file
@@ -9,10 +9,16 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
 import os
+
 from django.core.wsgi import get_wsgi_application
 
+from config.nacos_heartbeat import mark_serving
+
 # 设置默认的 Django 配置模块
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# 当前进程对外提供服务，启动后在后台注册到 Nacos
+mark_serving()
+
 # 获取 WSGI 应用实例
 application = get_wsgi_application()
\ No newline at end of file
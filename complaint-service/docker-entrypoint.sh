@@ -0,0 +1,12 @@
+#!/bin/sh
+# 容器启动入口：准备多进程 Prometheus 指标目录后执行 CMD
+set -e
+
+# 目录中残留的上次运行的 worker 指标文件会被 /metrics 一起汇总，每次启动前清空
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    # 目录可能是 emptyDir 挂载点，只删除其中的内容
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    find "$PROMETHEUS_MULTIPROC_DIR" -mindepth 1 -delete
+fi
+
+exec "$@"
@@ -0,0 +1,23 @@
+"""
+gunicorn 配置（在 /app 下启动时自动加载）
+
+    gunicorn config.wsgi:application
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+PROMETHEUS_MULTIPROC_DIR 由 docker-entrypoint.sh 在启动前清空并创建，
+worker 退出时在 child_exit 中清理其多进程指标（进行中请求数等 livesum 指标）。
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+accesslog = '-'
+
+
+def child_exit(server, worker):
+    # 只依赖 prometheus_client，不需要加载 Django
+    from complaint import metrics
+
+    metrics.mark_process_dead(worker.pid)
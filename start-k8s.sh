@@ -65,6 +65,18 @@ $KUBECTL exec deployment/complaint-service -- python manage.py migrate
 # 应用HPA配置
 echo "应用HPA配置..."
 $KUBECTL apply -f k8s/hpa.yaml
+# 应用层扩缩容指标的 prometheus-adapter 规则（集群中已部署监控时）
+if $KUBECTL get namespace monitoring >/dev/null 2>&1; then
+    $KUBECTL apply -f k8s/prometheus-adapter-rules.yaml
+fi
+
+# 后台任务 worker（审核后的举报处理、封禁通知、审计日志）
+echo "部署后台任务 worker..."
+$KUBECTL apply -f k8s/job-worker.yaml
+
+# 冷数据归档定时任务
+echo "应用归档定时任务..."
+$KUBECTL apply -f k8s/archive-cronjob.yaml
 
 # 等待HPA准备就绪
 echo "等待HPA准备就绪..."
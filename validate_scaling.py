@@ -1,110 +1,350 @@
 #!/usr/bin/env python3
 # validate_scaling.py
 # coding=utf-8
-import subprocess
-import time
+"""
+验证自动扩缩容：按阶段对服务施加负载，同时记录副本数、HPA 状态与请求延迟 / 吞吐量随时间的变化，
+用于判断扩容后延迟是否真正恢复。
+
+    python validate_scaling.py --url http://127.0.0.1:30008 \
+        --stages 5:60,40:300,5:120 --header "UUID: <管理员ID>" --slo-p95 500 --output scaling.json
+
+--stages 为 "并发数:秒数" 列表，依次执行；--monitor-only 只监控不施加负载（原来的行为）。
+每个采样周期输出一行：时间、阶段并发数、副本数（当前 / 期望）、该周期的 rps、p50 / p95 / p99 和错误数，
+结束后按副本数汇总，并给出扩容后 p95 回到 SLO 以内所用的时间。
+--output 以 .csv 结尾时输出每个采样周期的 CSV，否则输出包含采样与汇总的 JSON。
+
+兼容 Python 3.6（不使用 capture_output），只依赖标准库。
+"""
+import argparse
+import csv
 import json
+import os
+import shlex
+import subprocess
 import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+KUBECTL = shlex.split(os.environ.get("KUBECTL", "kubectl"))
+DEPLOYMENT = "complaint-service"
+HPA = "complaint-service-hpa"
+
+
+def run_kubectl(args):
+    result = subprocess.run(KUBECTL + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout
+
 
 def get_pod_count():
     """获取当前Pod数量"""
     try:
-        # Python 3.6.8 兼容版本，不使用 capture_output
-        result = subprocess.run([
-            "kubectl", "get", "deployment", "complaint-service",
-            "-o", "jsonpath={.status.replicas}"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        if result.returncode == 0:
-            return int(result.stdout.strip())
-        else:
-            print("获取Pod数量失败: " + result.stderr.strip())
-            return 0
+        output = run_kubectl(["get", "deployment", DEPLOYMENT, "-o", "jsonpath={.status.replicas}"])
+        return int(output.strip() or 0)
     except Exception as e:
         print("获取Pod数量失败: " + str(e))
         return 0
 
+
 def get_hpa_status():
     """获取HPA状态"""
     try:
-        # Python 3.6.8 兼容版本
-        result = subprocess.run([
-            "kubectl", "get", "hpa", "complaint-service-hpa",
-            "-o", "json"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        else:
-            print("获取HPA状态失败: " + result.stderr.strip())
-            return None
+        return json.loads(run_kubectl(["get", "hpa", HPA, "-o", "json"]))
     except Exception as e:
         print("获取HPA状态失败: " + str(e))
         return None
 
+
 def get_pod_metrics():
     """获取Pod资源使用情况"""
     try:
-        # Python 3.6.8 兼容版本
-        result = subprocess.run([
-            "kubectl", "top", "pods", "-l", "app=complaint-service"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        if result.returncode == 0:
-            return result.stdout
-        else:
-            print("获取Pod指标失败: " + result.stderr.strip())
-            return ""
+        return run_kubectl(["top", "pods", "-l", "app=" + DEPLOYMENT])
     except Exception as e:
         print("获取Pod指标失败: " + str(e))
         return ""
 
 
-def main():
-    print("开始验证自动扩缩容功能...")
-    print("=" * 50)
+def describe_hpa_metrics(hpa_status):
+    """HPA 当前的各项指标值：{"cpu": "35%", "complaint_worker_inflight_requests": "650m", ...}"""
+    values = {}
+    for metric in hpa_status.get('status', {}).get('currentMetrics') or []:
+        if metric.get('type') == 'Resource':
+            resource = metric['resource']
+            current = resource.get('current', {})
+            if 'averageUtilization' in current:
+                values[resource['name']] = "{0}%".format(current['averageUtilization'])
+            else:
+                values[resource['name']] = current.get('averageValue')
+        elif metric.get('type') == 'Pods':
+            pods = metric['pods']
+            values[pods['metric']['name']] = pods.get('current', {}).get('averageValue')
+    return values
 
-    # 初始状态
-    print("初始Pod数量: {0}".format(get_pod_count()))
-    print("初始HPA状态:")
+
+# ---- 负载 ----
+
+def parse_stages(value):
+    """ "5:60,40:300" -> [(5, 60.0), (40, 300.0)] """
+    stages = []
+    for item in value.split(','):
+        concurrency, seconds = item.split(':')
+        stages.append((int(concurrency), float(seconds)))
+    return stages
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+class Recorder:
+    """收集请求结果，采样线程定期取走一个周期内的数据"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            if not ok:
+                self.errors += 1
+
+    def drain(self):
+        with self.lock:
+            latencies, errors = self.latencies, self.errors
+            self.latencies, self.errors = [], 0
+        return latencies, errors
+
+
+class LoadGenerator:
+    """闭环负载：concurrency 个线程各自连续发送请求，并发数可以在运行中调整"""
+
+    def __init__(self, url, method, data, headers, timeout, recorder):
+        self.url = url
+        self.method = method
+        self.data = data.encode('utf-8') if data else None
+        self.headers = headers
+        self.timeout = timeout
+        self.recorder = recorder
+        self.concurrency = 0
+        self.stopped = False
+        self.threads = []
+
+    def set_concurrency(self, concurrency):
+        self.concurrency = concurrency
+        while len(self.threads) < concurrency:
+            thread = threading.Thread(target=self.worker, args=(len(self.threads),), daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def stop(self):
+        self.stopped = True
+
+    def request(self):
+        request = urllib.request.Request(self.url, data=self.data, method=self.method, headers=self.headers)
+        started = time.monotonic()
+        ok = False
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                ok = response.status < 500
+        except urllib.error.HTTPError as e:
+            # 4xx 说明服务正常处理了请求（例如参数错误），只把 5xx 计为错误
+            ok = e.code < 500
+        except Exception:
+            ok = False
+        self.recorder.record(time.monotonic() - started, ok)
+
+    def worker(self, index):
+        while not self.stopped:
+            # 编号超过当前并发数的线程暂停（阶段并发数降低时）
+            if index >= self.concurrency:
+                time.sleep(0.2)
+                continue
+            self.request()
+
+
+# ---- 采样与汇总 ----
+
+def take_sample(started, concurrency, recorder, interval, with_pod_metrics):
+    latencies, errors = recorder.drain()
+    sample = {
+        'time': round(time.monotonic() - started, 1),
+        'concurrency': concurrency,
+        'replicas': get_pod_count(),
+        'hpa_current': None,
+        'hpa_desired': None,
+        'hpa_metrics': {},
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / max(interval, 0.001), 1),
+        'p50_ms': None,
+        'p95_ms': None,
+        'p99_ms': None,
+    }
+    for pct in (50, 95, 99):
+        value = percentile(latencies, pct)
+        sample['p{0}_ms'.format(pct)] = round(value * 1000, 1) if value is not None else None
     hpa_status = get_hpa_status()
     if hpa_status:
-        current_replicas = hpa_status.get('status', {}).get('currentReplicas', 'N/A')
-        desired_replicas = hpa_status.get('status', {}).get('desiredReplicas', 'N/A')
-        print("  当前副本数: {0}".format(current_replicas))
-        print("  期望副本数: {0}".format(desired_replicas))
+        status = hpa_status.get('status', {})
+        sample['hpa_current'] = status.get('currentReplicas')
+        sample['hpa_desired'] = status.get('desiredReplicas')
+        sample['hpa_metrics'] = describe_hpa_metrics(hpa_status)
+    if with_pod_metrics:
+        sample['pod_metrics'] = get_pod_metrics()
+    return sample
+
+
+def print_sample(sample):
+    print("{time:>7.1f}s  并发 {concurrency:>3}  副本 {replicas:>2} (HPA {hpa_current}/{hpa_desired})  "
+          "rps {rps:>7}  p50 {p50_ms}  p95 {p95_ms}  p99 {p99_ms}  错误 {errors}  {metrics}".format(
+              metrics=' '.join('{0}={1}'.format(name, value) for name, value in sorted(sample['hpa_metrics'].items())),
+              **sample))
+    if sample.get('pod_metrics'):
+        print(sample['pod_metrics'])
+    sys.stdout.flush()
+
+
+def summarize(samples, slo_p95):
+    """按副本数汇总延迟与吞吐量，并计算扩容后 p95 回到 SLO 以内所用的时间"""
+    by_replicas = {}
+    for sample in samples:
+        if not sample['requests']:
+            continue
+        group = by_replicas.setdefault(sample['replicas'], {'samples': 0, 'requests': 0, 'errors': 0, 'p95': []})
+        group['samples'] += 1
+        group['requests'] += sample['requests']
+        group['errors'] += sample['errors']
+        group['p95'].append(sample['p95_ms'])
+    replicas_summary = []
+    for replicas in sorted(by_replicas):
+        group = by_replicas[replicas]
+        replicas_summary.append({
+            'replicas': replicas,
+            'samples': group['samples'],
+            'avg_rps': round(sum(s['rps'] for s in samples if s['replicas'] == replicas and s['requests'])
+                             / group['samples'], 1),
+            'median_p95_ms': percentile(group['p95'], 50),
+            'worst_p95_ms': max(group['p95']),
+            'error_rate': round(group['errors'] / float(group['requests']), 4),
+        })
 
-    print("\n开始监控 (每10秒更新一次)...")
+    scale_ups = []
+    for index in range(1, len(samples)):
+        previous, sample = samples[index - 1], samples[index]
+        if sample['replicas'] <= previous['replicas']:
+            continue
+        event = {'time': sample['time'], 'from': previous['replicas'], 'to': sample['replicas'],
+                 'p95_before_ms': previous['p95_ms'], 'recovered_after_s': None}
+        if slo_p95 is not None:
+            for later in samples[index:]:
+                if later['p95_ms'] is not None and later['p95_ms'] <= slo_p95:
+                    event['recovered_after_s'] = round(later['time'] - sample['time'], 1)
+                    break
+        scale_ups.append(event)
+
+    slo_violations = None
+    if slo_p95 is not None:
+        slo_violations = sum(1 for s in samples if s['p95_ms'] is not None and s['p95_ms'] > slo_p95)
+    return {'by_replicas': replicas_summary, 'scale_ups': scale_ups, 'slo_p95_ms': slo_p95,
+            'slo_violation_samples': slo_violations}
+
+
+def print_summary(summary):
+    print("\n按副本数汇总:")
+    print("{0:>6}{1:>8}{2:>10}{3:>14}{4:>14}{5:>10}".format('副本', '采样', 'rps', 'p95中位数ms', 'p95最差ms', '错误率'))
+    for row in summary['by_replicas']:
+        print("{replicas:>6}{samples:>8}{avg_rps:>10}{median_p95_ms:>14}{worst_p95_ms:>14}{error_rate:>10}".format(**row))
+    if not summary['scale_ups']:
+        print("\n期间没有发生扩容")
+    for event in summary['scale_ups']:
+        recovered = event['recovered_after_s']
+        print("扩容 {from} -> {to} (第 {time}s，扩容前 p95 {p95_before_ms}ms): {result}".format(
+            result=('{0}s 后 p95 回到 SLO 以内'.format(recovered) if recovered is not None
+                    else ('p95 未回到 SLO 以内' if summary['slo_p95_ms'] is not None else '未设置 --slo-p95')),
+            **event))
+    if summary['slo_violation_samples'] is not None:
+        print("p95 超过 SLO ({0}ms) 的采样周期: {1}".format(summary['slo_p95_ms'], summary['slo_violation_samples']))
+
+
+def write_output(path, samples, summary, args):
+    if path.endswith('.csv'):
+        fields = ['time', 'concurrency', 'replicas', 'hpa_current', 'hpa_desired', 'requests', 'errors',
+                  'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'hpa_metrics']
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for sample in samples:
+                writer.writerow(dict(sample, hpa_metrics=json.dumps(sample['hpa_metrics'])))
+    else:
+        with open(path, 'w') as f:
+            json.dump({'args': vars(args), 'samples': samples, 'summary': summary}, f, ensure_ascii=False, indent=2)
+    print("结果已写入 " + path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='施加负载并记录副本数、延迟与吞吐量随时间的变化')
+    parser.add_argument('--url', default=os.environ.get('COMPLAINT_URL', 'http://127.0.0.1:30008'),
+                        help='服务地址')
+    parser.add_argument('--path', default='/api/complaints/?status=0', help='压测的接口路径')
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--data', help='请求体（JSON）')
+    parser.add_argument('--header', action='append', default=[], help='请求头，如 "UUID: <管理员ID>"，可重复')
+    parser.add_argument('--stages', default='5:60,40:300,5:120', help='负载阶段 "并发数:秒数,..."')
+    parser.add_argument('--interval', type=float, default=10.0, help='采样周期（秒）')
+    parser.add_argument('--timeout', type=float, default=10.0, help='单个请求超时（秒）')
+    parser.add_argument('--slo-p95', type=float, help='p95 延迟目标（毫秒），用于判断扩容后延迟是否恢复')
+    parser.add_argument('--pod-metrics', action='store_true', help='每个采样周期输出 kubectl top pods')
+    parser.add_argument('--monitor-only', action='store_true', help='不施加负载，只监控副本数与 HPA 状态')
+    parser.add_argument('--output', help='结果文件（.json 或 .csv）')
+    args = parser.parse_args()
+
+    headers = {'Content-Type': 'application/json'}
+    for header in args.header:
+        name, _, value = header.partition(':')
+        headers[name.strip()] = value.strip()
+    stages = [(0, seconds) for _, seconds in parse_stages(args.stages)] if args.monitor_only \
+        else parse_stages(args.stages)
+
+    print("开始验证自动扩缩容: {0}{1}，阶段 {2}".format(args.url, args.path, args.stages))
+    print("初始Pod数量: {0}".format(get_pod_count()))
     print("=" * 50)
 
-    # 监控5分钟
-    for i in range(30):
-        print("\n[{0}/{1}] 监控状态:".format(i + 1, 30))
-        print("  Pod数量: {0}".format(get_pod_count()))
-        print("  Pod资源使用情况:")
-        metrics = get_pod_metrics()
-        if metrics:
-            print(metrics)
-        else:
-            print("  暂无数据")
-
-        hpa_status = get_hpa_status()
-        if hpa_status:
-            current = hpa_status.get('status', {}).get('currentReplicas', 'N/A')
-            desired = hpa_status.get('status', {}).get('desiredReplicas', 'N/A')
-            print("  HPA状态 - 当前副本: {0}, 期望副本: {1}".format(current, desired))
-
-            # 检查是否有指标
-            if 'currentMetrics' in hpa_status.get('status', {}):
-                metrics = hpa_status['status']['currentMetrics']
-                for metric in metrics:
-                    if 'resource' in metric:
-                        name = metric['resource'].get('name', 'N/A')
-                        current_value = metric['resource'].get('current', {}).get('averageUtilization', 'N/A')
-                        print("    {0} 使用率: {1}%".format(name, current_value))
-
-        if i < 29:  # 避免最后一次sleep
-            time.sleep(10)
-
-    print("\n" + "=" * 50)
-    print("监控完成!")
+    recorder = Recorder()
+    generator = LoadGenerator(args.url.rstrip('/') + args.path, args.method.upper(), args.data, headers,
+                              args.timeout, recorder)
+    samples = []
+    started = time.monotonic()
+    try:
+        for concurrency, seconds in stages:
+            generator.set_concurrency(concurrency)
+            stage_end = time.monotonic() + seconds
+            while time.monotonic() < stage_end:
+                period_start = time.monotonic()
+                time.sleep(max(0.0, min(args.interval, stage_end - period_start)))
+                sample = take_sample(started, concurrency, recorder, time.monotonic() - period_start,
+                                     args.pod_metrics)
+                samples.append(sample)
+                print_sample(sample)
+    except KeyboardInterrupt:
+        print("\n已中断")
+    finally:
+        generator.stop()
+
+    summary = summarize(samples, args.slo_p95)
+    print_summary(summary)
+    if args.output:
+        write_output(args.output, samples, summary, args)
 
 
 if __name__ == "__main__":